@@ -0,0 +1,55 @@
+# compares summing a 100k element array in TBD against the native `sum` builtin.
+# run with: python3 -m benchmarks.bench_builtins
+
+from src.__main__ import get_default_scope
+from src.builtin_models import Array, Number
+from src.interpreter import Interpreter
+import timeit
+
+SIZE = 100_000
+REPEAT = 5
+
+TBD_SUM = """
+{reduce items=nums, fn=tag {return acc + item}, initial=0}
+"""
+
+TBD_LOOP_SUM = """
+let total = 0
+loop nums {
+    total = total + item
+}
+total
+"""
+
+NATIVE_SUM = """
+{sum items=nums}
+"""
+
+
+def run(source: str, nums: Array):
+    scope = get_default_scope()
+    scope.declare_var("nums", nums)
+    return list(Interpreter(source, scope).evaluate())
+
+
+def bench(name: str, source: str, nums: Array):
+    number = 1
+    best = min(timeit.repeat(lambda: run(source, nums), number=number, repeat=REPEAT)) / number
+    print(f"{name:<28} {best * 1000:>10.2f} ms")
+    return best
+
+
+def main():
+    boxed = Array([Number(i) for i in range(SIZE)])
+    packed = Array.pack(list(boxed))
+
+    print(f"sum of {SIZE} numbers, best of {REPEAT}")
+    tbd = bench("TBD reduce (boxed)", TBD_SUM, boxed)
+    bench("TBD loop (boxed)", TBD_LOOP_SUM, boxed)
+    native_boxed = bench("native sum (boxed)", NATIVE_SUM, boxed)
+    native_packed = bench(f"native sum ({type(packed).__name__})", NATIVE_SUM, packed)
+    print(f"speedup: {tbd / native_boxed:.1f}x boxed, {tbd / native_packed:.1f}x packed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# measures what execution hooks cost.
+# hooks are installed by shadowing interpreter methods, so an interpreter that never had a hook and
+# one whose hooks were all removed again should run at the same speed.
+# run with: python3 -m benchmarks.bench_hooks
+
+from src.__main__ import get_default_scope
+from src.interpreter import Interpreter
+import timeit
+
+REPEAT = 15
+
+SOURCE = """
+tag step {
+    let doubled = n * 2
+    return doubled + 1
+}
+{impure step}
+let total = 0
+loop 3000 times {
+    total = total + {step n=index}
+}
+total
+"""
+
+
+def run(setup=None):
+    ip = Interpreter(SOURCE, get_default_scope())
+    if setup is not None:
+        setup(ip)
+    return list(ip.evaluate())
+
+
+def added_and_removed(ip: Interpreter):
+    callback = lambda *args: None
+    for event in ("node_enter", "tag_call", "var_read", "var_write", "builtin_call"):
+        ip.add_hook(event, callback)
+        ip.remove_hook(event, callback)
+
+
+def counting(ip: Interpreter):
+    counts = {"nodes": 0}
+
+    def enter(node, scope):
+        counts["nodes"] += 1
+
+    ip.add_hook("node_enter", enter)
+
+
+def main():
+    configs = {
+        "no hooks": None,
+        "hooks added then removed": added_and_removed,
+        "counting node_enter hook": counting,
+    }
+    # the configurations are interleaved so drift in machine load affects all of them alike
+    best = dict.fromkeys(configs, float("inf"))
+    for _ in range(REPEAT):
+        for name, setup in configs.items():
+            best[name] = min(best[name], timeit.timeit(lambda: run(setup), number=1))
+
+    print(f"3000 tag calls, best of {REPEAT}")
+    baseline = best["no hooks"]
+    for name, time in best.items():
+        overhead = f" {(time / baseline - 1) * 100:>+7.2f}%" if name != "no hooks" else ""
+        print(f"{name:<28} {time * 1000:>9.2f} ms{overhead}")
+
+
+if __name__ == "__main__":
+    main()
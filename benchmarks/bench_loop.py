@@ -0,0 +1,60 @@
+# compares the per-iteration overhead of `loop ... times` against faking a loop with a recursive tag.
+# run with: python3 -m benchmarks.bench_loop
+
+from src.__main__ import get_default_scope
+from src.interpreter import Interpreter
+import sys
+import timeit
+
+# recursive tags use several python frames per call, so they can't go much deeper than this
+ITERATIONS = 150
+REPEAT = 5
+
+RECURSIVE = f"""
+let n = {ITERATIONS}
+let total = 0
+tag count {{
+    if n > 0 {{
+        total = total + n
+        n = n - 1
+        {{count}}
+    }}
+    return total
+}}
+{{count}}
+"""
+
+LOOP = f"""
+let n = {ITERATIONS}
+let total = 0
+loop {ITERATIONS} times {{
+    total = total + n
+    n = n - 1
+}}
+total
+"""
+
+
+def run(source: str):
+    return list(Interpreter(source, get_default_scope()).evaluate())
+
+
+def bench(name: str, source: str):
+    number = 20
+    best = min(timeit.repeat(lambda: run(source), number=number, repeat=REPEAT)) / number
+    print(f"{name:<16} {best * 1e6 / ITERATIONS:>8.2f} us/iteration")
+    return best
+
+
+def main():
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10_000))
+    assert run(RECURSIVE)[-1] == run(LOOP)[-1]
+
+    print(f"{ITERATIONS} iterations, best of {REPEAT}")
+    recursive = bench("recursive tag", RECURSIVE)
+    loop = bench("loop ... times", LOOP)
+    print(f"speedup: {recursive / loop:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
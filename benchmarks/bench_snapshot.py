@@ -0,0 +1,54 @@
+# times snapshotting a 100k entry guild state dict.
+# "before" is what isolating a snapshot took with Dict backed by a plain python dict: a deep copy.
+# "after" is copying the persistent Dict and updating the copy, which shares structure with the original.
+# run with: python3 -m benchmarks.bench_snapshot
+
+from src.builtin_models import Dict, Number
+import copy
+import timeit
+
+SIZE = 100_000
+REPEAT = 5
+
+
+def guild_state(entry=dict) -> dict:
+    return {
+        f"member_{i}": entry({"xp": Number(i * 10), "level": Number(i // 100)})
+        for i in range(SIZE)
+    }
+
+
+def bench(name: str, fn, number: int):
+    best = min(timeit.repeat(fn, number=number, repeat=REPEAT)) / number
+    print(f"{name:<34} {best * 1e6:>12.2f} us")
+    return best
+
+
+def main():
+    plain = guild_state()
+    persistent = Dict(guild_state(Dict))
+
+    def snapshot_and_update():
+        snapshot = persistent.copy()
+        snapshot.set_item("member_42", Dict({"xp": Number(0), "level": Number(0)}))
+        return snapshot
+
+    def updates(snapshot: Dict):
+        for i in range(100):
+            snapshot.set_item(f"member_{i}", Dict({"xp": Number(0), "level": Number(0)}))
+
+    print(f"snapshot of a {SIZE} entry dict, best of {REPEAT}")
+    before = bench("before: deepcopy(dict)", lambda: copy.deepcopy(plain), 1)
+    bench("before: dict.copy() (shallow)", lambda: plain.copy(), 10)
+    bench("after: Dict.copy()", persistent.copy, 10_000)
+    after = bench("after: Dict.copy() + set_item", snapshot_and_update, 10_000)
+    bench("after: building Dict from dict", lambda: Dict(plain), 1)
+    bench("after: 100 member updates", lambda: updates(persistent.copy()), 100)
+
+    assert persistent.value["member_42"].value["xp"] == Number(420)
+    assert snapshot_and_update().value["member_42"].value["xp"] == Number(0)
+    print(f"speedup: {before / after:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# compares recursive tags under the default recursive evaluator and the explicit stack one.
+# the default evaluator only gets a couple hundred calls deep before python's recursion limit,
+# the stackless one goes as deep as `max_call_depth` and runs tail calls in constant depth.
+# run with: python3 -m benchmarks.bench_stackless
+
+from src.__main__ import get_default_scope
+from src.interpreter import Interpreter
+import timeit
+
+REPEAT = 3
+
+# `count` returns the result of calling `next`, so the call is in tail position
+TAIL = """
+tag done {
+    return acc
+}
+tag count {
+    let next = done
+    if n > 0 { next = count }
+    return {next n=n - 1, acc=acc + 1}
+}
+{count n=DEPTH, acc=0}
+"""
+
+# the addition happens after the recursive call returns, so every level stays on the stack
+NESTED = """
+tag total {
+    let r = 0
+    if n > 0 { r = n + {total n=n - 1} }
+    return r
+}
+{total n=DEPTH}
+"""
+
+
+def run(source: str, depth: int, stackless: bool):
+    ip = Interpreter(
+        source.replace("DEPTH", str(depth)), get_default_scope(), memo_size=0, stackless=stackless
+    )
+    try:
+        return list(ip.evaluate())[-1]
+    except RecursionError:
+        return None
+
+
+def main():
+    print(f"recursive tags, best of {REPEAT}")
+    for name, source in (("tail", TAIL), ("nested", NESTED)):
+        for depth in (100, 10_000, 50_000):
+            for stackless in (False, True):
+                mode = "stackless" if stackless else "recursive"
+                if run(source, depth, stackless) is None:
+                    print(f"{name:<7} {depth:>7} {mode:<10} RecursionError")
+                    continue
+                best = min(
+                    timeit.repeat(lambda: run(source, depth, stackless), number=1, repeat=REPEAT)
+                )
+                print(f"{name:<7} {depth:>7} {mode:<10} {best * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
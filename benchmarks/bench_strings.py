@@ -0,0 +1,38 @@
+# times building a big message out of many pieces with `out = out + piece` in a loop.
+# with lazily joined strings the time per piece should stay flat as the message grows.
+# run with: python3 -m benchmarks.bench_strings
+
+from src.__main__ import get_default_scope
+from src.builtin_models import Number, String
+from src.interpreter import Interpreter
+import timeit
+
+PIECE = "x" * 99 + "\n"
+SIZES = (2_500, 5_000, 10_000)  # 10k pieces of 100 characters = 1 MB
+REPEAT = 3
+
+SOURCE = """
+let out = ""
+loop pieces times {
+    out = out + piece
+}
+out.length
+"""
+
+
+def run(pieces: int):
+    scope = get_default_scope()
+    scope.declare_var("pieces", Number(pieces))
+    scope.declare_var("piece", String(PIECE))
+    return list(Interpreter(SOURCE, scope).evaluate())
+
+
+def main():
+    print(f"building a message from {len(PIECE)} character pieces, best of {REPEAT}")
+    for size in SIZES:
+        best = min(timeit.repeat(lambda: run(size), number=1, repeat=REPEAT))
+        print(f"{size:>7} pieces {best * 1000:>9.2f} ms {best * 1e6 / size:>7.2f} us/piece")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# generates valid TBD programs of a target size and shape, for scaling tests.
+# a program is a sequence of blocks (tag declarations, tag calls, array and dict literals and
+# arithmetic) repeated until it reaches the target size, so growing the size grows the program
+# without changing its shape.
+# print one with: python3 -m benchmarks.generator --size 5000 --tags 10 --depth 4
+
+from dataclasses import dataclass
+import argparse
+import random
+
+
+@dataclass(frozen=True)
+class Shape:
+    tags: int = 20  # distinct tags declared, later blocks call the ones that exist
+    depth: int = 3  # loops nested in every tag body, each one adds a scope to the chain
+    array_size: int = 20  # elements of every array literal
+    dict_size: int = 10  # entries of every dict literal
+    comment_density: float = 0.2  # chance of a comment line before every block
+
+
+class _Program:
+    def __init__(self, shape: Shape, seed: int):
+        self.shape = shape
+        self.random = random.Random(seed)
+        self.lines: list[str] = ["let total = 0"]
+        self.size = len(self.lines[0]) + 1
+        self.declared_tags = 0
+        self.variables = 0
+
+    def emit(self, *lines: str):
+        for line in lines:
+            self.lines.append(line)
+            self.size += len(line) + 1
+
+    def comment(self):
+        words = self.random.choices(("tag", "loop", "total", "value", "guild", "xp"), k=6)
+        self.emit("# " + " ".join(words))
+
+    def tag(self):
+        name = f"tag_{self.declared_tags}"
+        self.declared_tags += 1
+        depth = self.shape.depth
+        body = [f"tag {name} {{", "    let acc = x"]
+        for level in range(depth):
+            body.append("    " * (level + 1) + "loop 1 times {")
+        # reads of x and acc have to walk up through every loop's scope
+        body.append("    " * (depth + 1) + f"acc = acc + x * {self.random.randint(1, 9)} + index")
+        for level in reversed(range(depth)):
+            body.append("    " * (level + 1) + "}")
+        body += ["    return acc", "}"]
+        self.emit(*body)
+
+    def call(self):
+        name = f"tag_{self.random.randrange(self.declared_tags)}"
+        self.emit(f"total = total + {{{name} x={self.random.randint(1, 100)}}}")
+
+    def array(self):
+        elements = ", ".join(str(self.random.randint(0, 999)) for _ in range(self.shape.array_size))
+        self.emit(f"let array_{self.variables} = [{elements}]")
+        self.variables += 1
+
+    def dict(self):
+        entries = ", ".join(
+            f"key_{i}: {self.random.randint(0, 999)}" for i in range(self.shape.dict_size)
+        )
+        self.emit(f"let dict_{self.variables} = {{{entries}}}")
+        self.variables += 1
+
+    def arithmetic(self):
+        terms = " + ".join(str(self.random.randint(1, 99)) for _ in range(8))
+        self.emit(f"total = total + {terms}")
+
+    def block(self):
+        if self.random.random() < self.shape.comment_density:
+            self.comment()
+
+        if self.declared_tags < self.shape.tags and (
+            self.declared_tags == 0 or self.random.random() < 0.3
+        ):
+            return self.tag()
+
+        kinds = [self.array, self.dict, self.arithmetic]
+        if self.declared_tags:
+            kinds.append(self.call)
+        self.random.choice(kinds)()
+
+
+def generate(size: int, shape: Shape = Shape(), seed: int = 0) -> str:
+    """A program of roughly `size` characters, the same seed always gives the same program."""
+    program = _Program(shape, seed)
+    while program.size < size:
+        program.block()
+    program.emit("total")
+    return "\n".join(program.lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tags", type=int, default=Shape.tags)
+    parser.add_argument("--depth", type=int, default=Shape.depth)
+    parser.add_argument("--array-size", type=int, default=Shape.array_size)
+    parser.add_argument("--dict-size", type=int, default=Shape.dict_size)
+    parser.add_argument("--comment-density", type=float, default=Shape.comment_density)
+    flags = parser.parse_args()
+    shape = Shape(
+        flags.tags, flags.depth, flags.array_size, flags.dict_size, flags.comment_density
+    )
+    print(generate(flags.size, shape, flags.seed), end="")
+
+
+if __name__ == "__main__":
+    main()
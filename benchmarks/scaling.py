@@ -0,0 +1,83 @@
+# measures how the time and memory of every pipeline stage grow with the size of the program.
+# programs of doubling sizes are generated with the same shape, and the growth exponent k of
+# time ~ size^k is fitted for each stage. Anything growing faster than O(n log n) is flagged, over
+# the sizes used here n log n looks like an exponent of about 1 + 1 / ln(n).
+# run with: python3 -m benchmarks.scaling [--sizes 5000 10000 20000 40000] [--depth 3 ...]
+
+from benchmarks.generator import Shape, generate
+from benchmarks.suite import measure, stages
+from contextlib import redirect_stdout
+import argparse
+import io
+import math
+import sys
+
+SIZES = (5_000, 10_000, 20_000, 40_000)
+TOLERANCE = 0.25  # on top of the n log n exponent, timings are too noisy for anything tighter
+REPEAT = 3
+
+
+def growth_exponent(sizes: list[int], values: list[float]) -> float:
+    """Least squares slope of log(value) against log(size)."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-12)) for value in values]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def create_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tags", type=int, default=Shape.tags)
+    parser.add_argument("--depth", type=int, default=Shape.depth)
+    parser.add_argument("--array-size", type=int, default=Shape.array_size)
+    parser.add_argument("--dict-size", type=int, default=Shape.dict_size)
+    parser.add_argument("--comment-density", type=float, default=Shape.comment_density)
+    return parser
+
+
+def main():
+    flags = create_parser().parse_args()
+    sizes = sorted(flags.sizes)
+    if len(sizes) < 2:
+        sys.exit("Need at least two sizes to fit a growth exponent")
+
+    shape = Shape(
+        flags.tags, flags.depth, flags.array_size, flags.dict_size, flags.comment_density
+    )
+    results: dict[str, list[dict[str, float]]] = {}
+    for size in sizes:
+        source = generate(size, shape, flags.seed)
+        with redirect_stdout(io.StringIO()):
+            for stage, (setup, run) in stages(source).items():
+                results.setdefault(stage, []).append(measure(setup, run, flags.repeat))
+
+    limit = 1 + 1 / math.log(sizes[0]) + flags.tolerance
+    print(f"sizes {', '.join(map(str, sizes))}, {shape}")
+    print(f"{'stage':<10} {'ms per size':<40} {'time k':>7} {'memory k':>9}")
+    flagged = []
+    for stage, measurements in results.items():
+        times = [m["best"] for m in measurements]
+        memory = [m["peak_memory"] for m in measurements]
+        time_k, memory_k = growth_exponent(sizes, times), growth_exponent(sizes, memory)
+        timings = " ".join(f"{t * 1000:.1f}" for t in times)
+        line = f"{stage:<10} {timings:<40} {time_k:>7.2f} {memory_k:>9.2f}"
+        for what, k in (("time", time_k), ("memory", memory_k)):
+            if k > limit:
+                flagged.append(f"{stage} {what} grows like n^{k:.2f}")
+                line += f" {what.upper()}"
+        print(line)
+
+    if flagged:
+        print(f"\nworse than O(n log n) (exponent over {limit:.2f}):")
+        for message in flagged:
+            print(f"  {message}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
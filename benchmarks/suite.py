@@ -0,0 +1,223 @@
+# times the lexer, the parser and the interpreter separately over the examples and a set of
+# generated workloads, and compares the results against a stored baseline.
+# run with: python3 -m benchmarks.suite [--output results.json] [--baseline benchmarks/baseline.json]
+# a stage that got slower (or uses more memory) than the baseline by more than the threshold is
+# reported as a regression and makes the suite exit with status 1. Sub-millisecond stages easily
+# take twice as long from one run to the next, so time differences under `MIN_DIFFERENCE` never count.
+# refresh the baseline with: python3 -m benchmarks.suite --save-baseline
+
+from src.__main__ import get_default_scope
+from src.interpreter import Interpreter
+from src.lexer import Lexer
+from src.output import MemorySink, OutputChannel
+from src.parser import Parser
+from contextlib import redirect_stdout
+from pathlib import Path
+import argparse
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLES = ROOT / "examples"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+REPEAT = 5
+MIN_TIME = 0.05  # every stage is repeated until a timing takes at least this long
+THRESHOLD = 0.25  # timings on shared machines easily vary by 10%, so only bigger changes are flagged
+MIN_DIFFERENCE = 0.0005  # seconds, a stage has to be slower by at least this much as well
+
+
+def deep_nesting(depth: int = 40) -> str:
+    # nested loops and nested array literals, the parser and the evaluator recurse for each level
+    lines = ["let hits = 0"]
+    for level in range(depth):
+        lines.append("    " * level + "loop 1 times {")
+    lines.append("    " * depth + f"if index < {depth} {{ hits = hits + 1 }}")
+    for level in reversed(range(depth)):
+        lines.append("    " * level + "}")
+    lines.append("let nested = " + "[" * depth + "1" + "]" * depth)
+    return "\n".join(lines) + "\n"
+
+
+def arithmetic_chains(lines: int = 40, terms: int = 100) -> str:
+    operators = ("+", "-", "*", "+")
+    chains = []
+    for line in range(lines):
+        chain = " ".join(f"{term % 7 + 1} {operators[term % 4]}" for term in range(terms))
+        chains.append(f"let chain_{line} = {chain} {line}")
+    return "\n".join(chains) + "\n"
+
+
+def many_tags(count: int = 300) -> str:
+    lines = []
+    for index in range(count):
+        lines.append(f"tag tag_{index} {{\n    let doubled = x * 2\n    return doubled + {index}\n}}")
+    lines.extend(f"{{tag_{index} x={index}}}" for index in range(count))
+    return "\n".join(lines) + "\n"
+
+
+def large_literals(size: int = 2000) -> str:
+    numbers = ", ".join(str(i) for i in range(size))
+    words = ", ".join(f'"word {i}"' for i in range(size // 5))
+    entries = ", ".join(f"key_{i}: {i}" for i in range(size // 5))
+    text = "lorem ipsum " * size
+    return (
+        f"let numbers = [{numbers}]\n"
+        f"let words = [{words}]\n"
+        f"let table = {{{entries}}}\n"
+        f'let text = "{text}"\n'
+    )
+
+
+GENERATED = {
+    "deep_nesting": deep_nesting,
+    "arithmetic_chains": arithmetic_chains,
+    "many_tags": many_tags,
+    "large_literals": large_literals,
+}
+"""Workloads that stress one thing each"""
+
+
+def workloads() -> dict[str, str]:
+    sources = {f"examples/{path.name}": path.read_text() for path in sorted(EXAMPLES.glob("*.txt"))}
+    sources.update({f"generated/{name}": make() for name, make in GENERATED.items()})
+    return sources
+
+
+def stages(source: str):
+    # every stage gets a setup that runs outside of the timed part, the interpreter can only
+    # evaluate once so it's rebuilt for every run.
+    tokens = Lexer(source).tokenize()
+
+    def interpreter():
+        return Interpreter(source, get_default_scope(), OutputChannel(MemorySink()))
+
+    return {
+        "lex": (lambda: source, lambda source: Lexer(source).tokenize()),
+        "parse": (lambda: list(tokens), lambda tokens: Parser(tokens).parse()),
+        "evaluate": (interpreter, lambda ip: list(ip.evaluate())),
+    }
+
+
+def measure(setup, run, repeat: int = REPEAT) -> dict[str, float]:
+    timings = []
+    while len(timings) < repeat or sum(timings) < MIN_TIME:
+        arg = setup()
+        # like timeit, collections are kept out of the timings so they don't depend on when one hits
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run(arg)
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    arg = setup()
+    tracemalloc.start()
+    try:
+        run(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "best": best,
+        "mean": sum(timings) / len(timings),
+        "runs": len(timings),
+        "ops_per_sec": 1 / best if best else float("inf"),
+        "peak_memory": peak,
+    }
+
+
+def run_suite(only: str | None = None) -> dict:
+    results = {}
+    # print and send write to stdout, which would drown the report
+    with redirect_stdout(io.StringIO()):
+        for name, source in workloads().items():
+            if only and only not in name:
+                continue
+            for stage, (setup, run) in stages(source).items():
+                results[f"{name}:{stage}"] = measure(setup, run)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def report(
+    current: dict, baseline: dict | None, threshold: float, min_difference: float = MIN_DIFFERENCE
+) -> list[str]:
+    base = baseline["results"] if baseline else {}
+    regressions = []
+    print(f"{'benchmark':<42} {'best ms':>10} {'ops/s':>10} {'peak KiB':>10} {'vs baseline':>12}")
+    for key, result in current["results"].items():
+        line = (
+            f"{key:<42} {result['best'] * 1000:>10.3f} {result['ops_per_sec']:>10.1f}"
+            f" {result['peak_memory'] / 1024:>10.1f}"
+        )
+        if key in base:
+            time_ratio = result["best"] / base[key]["best"]
+            memory_ratio = result["peak_memory"] / max(base[key]["peak_memory"], 1)
+            line += f" {(time_ratio - 1) * 100:>+11.1f}%"
+            if time_ratio > 1 + threshold and result["best"] - base[key]["best"] > min_difference:
+                regressions.append(f"{key} is {(time_ratio - 1) * 100:.1f}% slower")
+                line += " SLOWER"
+            if memory_ratio > 1 + threshold:
+                regressions.append(f"{key} uses {(memory_ratio - 1) * 100:.1f}% more memory")
+                line += " MEMORY"
+        print(line)
+    return regressions
+
+
+def create_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", "-o", help="write the results to this json file")
+    parser.add_argument("--baseline", "-b", default=BASELINE, type=Path)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", "-t", default=THRESHOLD, type=float)
+    parser.add_argument(
+        "--min-difference",
+        default=MIN_DIFFERENCE,
+        type=float,
+        metavar="SECONDS",
+        help="time differences smaller than this are never regressions, whatever the ratio",
+    )
+    parser.add_argument("--only", help="only run benchmarks whose name contains this")
+    return parser
+
+
+def main():
+    flags = create_parser().parse_args()
+    current = run_suite(flags.only)
+
+    if flags.output:
+        Path(flags.output).write_text(json.dumps(current, indent=2))
+
+    baseline = None
+    if not flags.save_baseline and flags.baseline.is_file():
+        baseline = json.loads(flags.baseline.read_text())
+
+    regressions = report(current, baseline, flags.threshold, flags.min_difference)
+
+    if flags.save_baseline:
+        flags.baseline.write_text(json.dumps(current, indent=2))
+        print(f"saved baseline to {flags.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions over {flags.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,24 @@ import logging
 import sys
 from .interpreter import Interpreter, Scope
 from .builtin_models import BuiltInFunction
+from .stdlib import BUILTINS
+from .profiler import SamplingProfiler
+from .heap import DEFAULT_MEMORY_LIMIT
+from .session import Session
+from .checker import check
+from .modules import MODULES
+from .bigint import DEFAULT_MAX_INT_BITS
 import argparse
+import json
 import pathlib
 
 
 def __handle_print(args):
-    if not args["__args"].value:
+    if not len(args["__args"]):
         del args["__args"]
 
     else:
-        [print(a, end=" ") for a in args["__args"].value]
+        [print(a, end=" ") for a in args["__args"]]
         del args["__args"]
     print(*args.values())
 
@@ -20,12 +28,51 @@ def __handle_print(args):
 def create_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument("--file", "-f", default=None, dest="file")
+    parser.add_argument(
+        "--stackless",
+        action="store_true",
+        help="evaluate with an explicit stack so deeply recursive tags don't hit python's recursion limit",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="OUTPUT",
+        help="sample the script while it runs and write collapsed stacks for flamegraph tools "
+        "(defaults to the script's name with a .collapsed extension)",
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="print the statistics of the run as json"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only check the script for redeclarations, reassigned constants and undefined names",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=DEFAULT_MEMORY_LIMIT,
+        metavar="BYTES",
+        help="stop the script once its strings, arrays and dicts take about this much memory "
+        "(0 for no limit)",
+    )
+    parser.add_argument(
+        "--max-int-bits",
+        type=int,
+        default=DEFAULT_MAX_INT_BITS,
+        metavar="BITS",
+        help="refuse *, ^ and %% on integers that would take more bits than this (0 for no limit)",
+    )
     return parser
 
 
 def get_default_scope():
     scope = Scope()
     scope.declare_var("print", BuiltInFunction(__handle_print))
+    for name, builtin in BUILTINS.items():
+        scope.declare_var(name, builtin)
     return scope
 
 
@@ -38,7 +85,7 @@ def error(message: str = "", REPL=False):
 
 
 def start_repl():
-    scope = get_default_scope()
+    session = Session(get_default_scope())
     while True:
         lines = []
         while True:
@@ -55,11 +102,10 @@ def start_repl():
             else:
                 lines.append(line)
         try:
-            joint = "\n".join(lines)
-            ip = Interpreter(joint, scope)
-            iterator = ip.evaluate()
-            for i in iterator:
+            chunk = session.run("\n".join(lines))
+            for i in chunk.results:
                 print(i)
+            print(f"({chunk.timing()})")
         except EOFError:
             break
         except Exception as e:
@@ -80,9 +126,39 @@ if __name__ == "__main__":
             with path.open("r") as file:
                 text = file.read()
 
-            ip = Interpreter(text, get_default_scope())
-            for res in ip.evaluate():
-                print(res)
+            # imports are relative to the script, and modules can print like the script can
+            MODULES.root = path.parent
+            MODULES.scope_factory = get_default_scope
+
+            if flags["check"]:
+                program, *_ = Interpreter.compile(text)
+                diagnostics = check(program, get_default_scope())
+                for diagnostic in diagnostics:
+                    print(f"{path.name}: {diagnostic}")
+                sys.exit(1 if diagnostics else 0)
+
+            ip = Interpreter(
+                text,
+                get_default_scope(),
+                stackless=flags["stackless"],
+                memory_limit=flags["memory_limit"] or None,
+                max_int_bits=flags["max_int_bits"] or None,
+            )
+            profiler = None
+            if flags["profile"] is not None:
+                profiler = SamplingProfiler(root=path.name)
+                profiler.start()
+            try:
+                for res in ip.evaluate():
+                    print(res)
+            finally:
+                if profiler is not None:
+                    profiler.stop()
+                    output = flags["profile"] or path.with_suffix(".collapsed")
+                    profiler.write(output)
+                    print(f"Wrote {sum(profiler.samples.values())} samples to {output}")
+                if flags["stats"]:
+                    print(json.dumps(ip.stats.as_dict(), indent=2))
             error()
 
     else:
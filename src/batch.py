@@ -0,0 +1,188 @@
+# runs many scripts at once across worker processes, for regression runs over stored tags and for
+# pre-warming. Scripts come from a directory (every .txt file in it) or a jsonl file with one
+# {"id": ..., "source": ...} object per line. Each script gets its own scope and its own time,
+# memory and big int budgets, and one line of json with its results (or error) is written per
+# script as soon as it's done. A throughput and latency summary is printed at the end.
+# run with: python3 -m src.batch SCRIPTS [--workers 4] [--timeout 5] [--output results.jsonl]
+
+from .__main__ import get_default_scope
+from .interpreter import Interpreter
+from .output import MemorySink, OutputChannel
+from .exceptions import TimeLimitExceeded
+from .heap import DEFAULT_MEMORY_LIMIT
+from .bigint import DEFAULT_MAX_INT_BITS
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+from pathlib import Path
+import argparse
+import io
+import json
+import math
+import os
+import signal
+import sys
+import time
+import typing
+
+__all__ = ("load_scripts", "run_script", "run_batch", "percentile", "summarize")
+
+DEFAULT_TIMEOUT = 5.0
+"""Seconds a single script can run before it's stopped"""
+
+
+def load_scripts(path: str | Path) -> typing.Iterator[tuple[str, str]]:
+    """(id, source) of every script in a directory of .txt files or a jsonl file."""
+    path = Path(path)
+    if path.is_dir():
+        for file in sorted(path.rglob("*.txt")):
+            yield str(file.relative_to(path)), file.read_text()
+        return
+
+    with path.open() as lines:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            script = json.loads(line)
+            yield str(script.get("id", number)), script["source"]
+
+
+def _on_timeout(signum, frame):
+    raise TimeLimitExceeded("Script exceeded its time limit")
+
+
+def run_script(script: tuple[str, str], options: dict[str, typing.Any]) -> dict[str, typing.Any]:
+    """Runs a single script and returns its result line."""
+    name, source = script
+    timeout = options.get("timeout")
+    # the alarm interrupts the script between two bytecodes, the big int guard makes sure no
+    # single operation takes long enough to matter
+    use_alarm = timeout and hasattr(signal, "setitimer")
+    sink = MemorySink()
+    stdout = io.StringIO()
+    result: dict[str, typing.Any] = {"id": name, "ok": True, "results": [], "error": None}
+
+    start = time.perf_counter()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with redirect_stdout(stdout):
+            ip = Interpreter(
+                source,
+                get_default_scope(),
+                OutputChannel(sink),
+                stackless=options.get("stackless", False),
+                memory_limit=options.get("memory_limit"),
+                max_int_bits=options.get("max_int_bits"),
+            )
+            for value in ip.evaluate():
+                result["results"].append(repr(value))
+    except (Exception, TimeLimitExceeded) as e:
+        result["ok"] = False
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        result["time"] = time.perf_counter() - start
+
+    result["output"] = stdout.getvalue()
+    result["messages"] = [[destination, content] for destination, content in sink.messages]
+    return result
+
+
+class _Runner:
+    # a class instead of a closure because Pool has to pickle it to send it to the workers
+    def __init__(self, options: dict[str, typing.Any]):
+        self.options = options
+
+    def __call__(self, script: tuple[str, str]) -> dict[str, typing.Any]:
+        return run_script(script, self.options)
+
+
+def run_batch(
+    scripts: typing.Iterable[tuple[str, str]],
+    options: dict[str, typing.Any],
+    workers: int = 1,
+) -> typing.Iterator[dict[str, typing.Any]]:
+    """Result lines of all scripts in the order they finish."""
+    runner = _Runner(options)
+    if workers <= 1:
+        yield from map(runner, scripts)
+        return
+
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(runner, scripts, chunksize=4)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    # nearest rank, good enough for latency reports
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(results: list[dict[str, typing.Any]], wall_time: float) -> dict[str, typing.Any]:
+    times = sorted(result["time"] for result in results)
+    return {
+        "scripts": len(results),
+        "failed": sum(not result["ok"] for result in results),
+        "wall_time": wall_time,
+        "scripts_per_sec": len(results) / wall_time if wall_time else 0.0,
+        "p50": percentile(times, 0.50),
+        "p95": percentile(times, 0.95),
+        "p99": percentile(times, 0.99),
+        "max": times[-1] if times else 0.0,
+    }
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="python3 -m src.batch")
+    parser.add_argument("scripts", help="a directory of .txt scripts or a jsonl file of scripts")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", "-o", help="write the result lines here instead of stdout")
+    parser.add_argument(
+        "--timeout", "-t", type=float, default=DEFAULT_TIMEOUT, help="seconds per script (0 for none)"
+    )
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_MEMORY_LIMIT, metavar="BYTES")
+    parser.add_argument("--max-int-bits", type=int, default=DEFAULT_MAX_INT_BITS, metavar="BITS")
+    parser.add_argument("--stackless", action="store_true")
+    return parser
+
+
+def main():
+    flags = create_parser().parse_args()
+    options = {
+        "timeout": flags.timeout or None,
+        "memory_limit": flags.memory_limit or None,
+        "max_int_bits": flags.max_int_bits or None,
+        "stackless": flags.stackless,
+    }
+
+    output = open(flags.output, "w") if flags.output else sys.stdout
+    results = []
+    start = time.perf_counter()
+    try:
+        for result in run_batch(load_scripts(flags.scripts), options, flags.workers):
+            output.write(json.dumps(result) + "\n")
+            # only what the summary needs is kept, results can be big
+            results.append({"ok": result["ok"], "time": result["time"]})
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    summary = summarize(results, time.perf_counter() - start)
+    # the summary goes to stderr so it never ends up mixed with result lines on stdout
+    print(
+        f"{summary['scripts']} scripts ({summary['failed']} failed) in {summary['wall_time']:.2f}s, "
+        f"{summary['scripts_per_sec']:.1f} scripts/s\n"
+        f"latency p50 {summary['p50'] * 1000:.2f}ms, p95 {summary['p95'] * 1000:.2f}ms, "
+        f"p99 {summary['p99'] * 1000:.2f}ms, max {summary['max'] * 1000:.2f}ms",
+        file=sys.stderr,
+    )
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# cost guard for arithmetic on python's arbitrary precision ints.
+# `9 ^ 9 ^ 9` is a single `**` that can keep a core busy for minutes inside one C call, which nothing
+# can interrupt. So before running one of the operations whose cost grows faster than the size of
+# its operands, the size of the result is estimated from the operands' bit lengths and the
+# operation is refused if it's too big.
+# `+` and `-` run in linear time and add at most a bit to the bigger operand, so they aren't checked.
+# the estimate is an upper bound: whatever an operation is allowed to produce fits the limit.
+
+from .lexer_models import OPERATORS
+import math
+
+__all__ = ("DEFAULT_MAX_INT_BITS", "GUARDED_OPERATORS", "estimate_bits")
+
+DEFAULT_MAX_INT_BITS = 1 << 18
+"""Bits of the biggest int a single operation can produce, about 79000 decimal digits"""
+
+GUARDED_OPERATORS = frozenset((OPERATORS.MULTIPLY, OPERATORS.POWER, OPERATORS.REMAINDER))
+"""Operators whose cost on big ints is checked before running them"""
+
+
+def estimate_bits(operator: OPERATORS, l: int, r: int) -> int:
+    """Bits of the result of `l operator r`, for `%` the bits of the bigger operand since that's
+    what its cost depends on. Never less than the actual size, so nothing over the limit gets
+    through. For `*` and `^` it's at most a bit more, so something right at the limit can be refused."""
+    if operator is OPERATORS.PLUS or operator is OPERATORS.MINUS:
+        return max(l.bit_length(), r.bit_length()) + 1
+
+    if operator is OPERATORS.MULTIPLY:
+        if not l or not r:
+            return 0
+        return l.bit_length() + r.bit_length()
+
+    if operator is OPERATORS.POWER:
+        if r <= 0 or -1 <= l <= 1:
+            return 1  # a float for negative powers, otherwise 0, 1 or -1
+        if r.bit_length() > 53:
+            return l.bit_length() * r  # too big for the float math, and for any limit
+        # |l| ^ r has floor(r * log2|l|) + 1 bits, the product is nudged up so rounding can't make
+        # it come out a bit short
+        return math.floor(r * math.log2(abs(l)) * (1 + 1e-12)) + 1
+
+    return max(l.bit_length(), r.bit_length())
@@ -1,8 +1,15 @@
 from .parser_models import Expression, Literal, Identifier
 from .exceptions import NotSupported, PropertyNotFound, InterpreterException
+from .persistent import PersistentMap, PersistentVector
 from dataclasses import dataclass, field
+import threading
 import typing
 
+try:
+    import numpy
+except ImportError:  # numpy is optional, arrays just stay boxed without it
+    numpy = None
+
 __all__ = (
     "Scope",
     "String",
@@ -13,6 +20,7 @@ __all__ = (
     "BuiltInFunction",
     "Function",
     "Array",
+    "NumericArray",
     "literals",
 )
 
@@ -47,12 +55,16 @@ class Scope:
         self.variables[name] = value
 
     def assign_var(self, name: str, value: typing.Any):
-        scope = self.resolve_var_scope(name)
-        if scope is None:
-            raise InterpreterException(f"Variable {name} is not defined!")
-        if name in scope.constants:
-            raise InterpreterException(f"Variable {name} is a constant and cannot be reassigned!")
-        scope.variables[name] = value
+        # same as resolve_var_scope, without the recursion since this runs for every assignment
+        scope = self
+        while scope is not None:
+            if name in scope.variables:
+                scope.variables[name] = value
+                return
+            if name in scope.constants:
+                raise InterpreterException(f"Variable {name} is a constant and cannot be reassigned!")
+            scope = scope.parent
+        raise InterpreterException(f"Variable {name} is not defined!")
 
     def force_assign_var(self, name: str, value: typing.Any, constant: bool = False):
         """This method is used to assign variables forcefully, bypassing scope checks and whether the variable exists or not."""
@@ -68,12 +80,72 @@ class Scope:
         return name in scope.constants
 
 
-@dataclass
 class String(Literal):
-    value: str
+    # strings built with `+` don't join their pieces right away. Instead they share a list of pieces
+    # with the string they were built from and only join them once the value is actually needed.
+    # `out = out + line` in a loop is linear this way instead of copying `out` on every iteration.
+    # the last string built from a piece list owns its tail, so appending to it doesn't copy anything.
+    # piece lists are shared between strings that can be used from different threads (literals,
+    # memoized results, module exports), so claiming the tail happens under a lock.
+
+    _lock = threading.Lock()
+
+    def __init__(self, value: str = ""):
+        self._value: str | None = value
+        self._pieces: list[str] | None = None
+        self._count = 0  # how many of the shared pieces belong to this string
+        self.length = len(value)
+
+    @classmethod
+    def _from_pieces(cls, pieces: list[str], count: int, length: int) -> "String":
+        string = cls.__new__(cls)
+        string._value = None
+        string._pieces = pieces
+        string._count = count
+        string.length = length
+        return string
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            self._value = "".join(self._pieces[: self._count])
+        return self._value
+
+    @value.setter
+    def value(self, value: str):
+        self._value = value
+        self._pieces = None
+        self._count = 0
+        self.length = len(value)
+
+    def concat(self, other: "String") -> "String":
+        piece = other.value
+        with String._lock:
+            pieces = self._pieces
+            if pieces is None:
+                pieces = self._pieces = [self._value]
+                self._count = 1
+
+            elif len(pieces) != self._count:
+                # someone else already appended to the shared pieces, so we can't
+                pieces = self._pieces = pieces[: self._count]
+
+            pieces.append(piece)
+            count = self._count
+        return String._from_pieces(pieces, count + 1, self.length + other.length)
+
+    def __repr__(self):
+        return f"String(value={self.value!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, String):
+            return self.length == other.length and self.value == other.value
+        return NotImplemented
+
+    __hash__ = None
 
     _PROPERTIES = {
-        "length": lambda self: Number(len(self.value)),
+        "length": lambda self: Number(self.length),
         "upper": lambda self: String(self.value.upper()),
         "lower": lambda self: String(self.value.lower()),
         "capitalize": lambda self: String(self.value.capitalize()),
@@ -86,7 +158,7 @@ class String(Literal):
 
     def __add(self, other: Literal):
         if self.is_arithmetic_compatible(other):
-            return String(self.value + other.value)
+            return self.concat(other)
 
         raise NotSupported(f"Cannot add {self} and {other}")
 
@@ -111,7 +183,7 @@ class String(Literal):
 
     def _access_property(self, property: str):
         if property in self._PROPERTIES:
-            return self._PROPERTIES[property]
+            return self._PROPERTIES[property](self)
 
         raise PropertyNotFound(f"Property {property} not found in {self}")
 
@@ -142,15 +214,64 @@ class Null(Literal):
 
 @dataclass
 class Dict(Literal):
-    value: dict[str, Literal] = field(default_factory=dict[str, Literal])
+    # the underlying map is persistent, "modifying" it builds a new one sharing structure with the old,
+    # so copies are O(1) and can never see changes made to the original.
+    value: PersistentMap = field(default_factory=PersistentMap)
+
+    def __post_init__(self):
+        if not isinstance(self.value, PersistentMap):
+            self.value = PersistentMap(self.value)
+
+    def copy(self) -> "Dict":
+        return Dict(self.value)
+
+    def set_item(self, key: str, value: Literal):
+        self.value = self.value.set(key, value)
 
     def _access_property(self, property: str):
         return self.value.get(property, Null())
 
 
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+"""Range of ints that can be stored in a NumericArray without losing precision"""
+
+
 @dataclass
 class Array(Literal):
-    value: list[Literal] = field(default_factory=list[Literal])
+    # persistent for the same reasons as Dict
+    value: PersistentVector = field(default_factory=PersistentVector)
+
+    def __post_init__(self):
+        if not isinstance(self.value, PersistentVector):
+            self.value = PersistentVector(self.value)
+
+    @classmethod
+    def pack(cls, elements: list[Literal]) -> "Array":
+        """Builds the most compact array for the given elements.
+        Arrays made up of only numbers are backed by numpy when it's available."""
+        if numpy is not None and elements and all(type(e) is Number for e in elements):
+            values = [e.value for e in elements]
+            if all(type(v) is float for v in values):
+                return NumericArray(numpy.array(values, dtype=numpy.float64))
+            if all(type(v) is int and INT64_MIN <= v <= INT64_MAX for v in values):
+                return NumericArray(numpy.array(values, dtype=numpy.int64))
+
+        return cls(elements)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __iter__(self) -> typing.Iterator[Literal]:
+        return iter(self.value)
+
+    def copy(self) -> "Array":
+        return Array(self.value)
+
+    def append(self, value: Literal):
+        self.value = self.value.append(value)
+
+    def set_item(self, index: int, value: Literal):
+        self.value = self.value.set(index, value)
 
     def _access_property(self, property: str):
         if property == "length":
@@ -159,10 +280,83 @@ class Array(Literal):
         return self.value[int(property)]
 
 
+@dataclass(eq=False)
+class NumericArray(Array):
+    # homogeneous array of numbers (or bools, for comparison results) stored in a numpy array.
+    # elements are only boxed into Number/Bool when they're read back out.
+    # the numpy array is never modified in place either, so copies can share it too.
+    value: typing.Any = None
+
+    def __post_init__(self):
+        pass
+
+    def __repr__(self):
+        # scripts can't tell the two apart, so they print the same
+        return f"Array(value={list(self)!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, NumericArray):
+            return numpy.array_equal(self.value, other.value)
+        if isinstance(other, Array):
+            return list(self) == other.value
+        return NotImplemented
+
+    def __iter__(self) -> typing.Iterator[Literal]:
+        return map(self._box_scalar, self.value.tolist())
+
+    @staticmethod
+    def _box_scalar(value: int | float | bool) -> Literal:
+        return literals[type(value)](value)
+
+    def box(self):
+        """Turns this array into a regular boxed Array in place."""
+        self.value = PersistentVector(self)
+        self.__class__ = Array
+
+    def copy(self) -> "NumericArray":
+        return NumericArray(self.value)
+
+    def _can_store(self, value: Literal) -> bool:
+        if self.value.dtype.kind == "b":
+            return type(value) is Bool
+        if type(value) is not Number:
+            return False
+        if type(value.value) is float:
+            return self.value.dtype.kind == "f"
+        return self.value.dtype.kind == "i" and INT64_MIN <= value.value <= INT64_MAX
+
+    def append(self, value: Literal):
+        if not self._can_store(value):
+            self.box()
+            return self.append(value)
+        self.value = numpy.append(self.value, value.value)
+
+    def set_item(self, index: int, value: Literal):
+        if not self._can_store(value):
+            self.box()
+            return self.set_item(index, value)
+        values = self.value.copy()
+        values[index] = value.value
+        self.value = values
+
+    def _access_property(self, property: str):
+        if property == "length":
+            return Number(len(self.value))
+
+        return self._box_scalar(self.value[int(property)].item())
+
+
 @dataclass
 class BuiltInFunction(Expression):
-    python_function: typing.Callable[[typing.Dict[str, Literal]], typing.Any]
+    python_function: typing.Callable[..., typing.Any]
     # a callback function that takes a list of arguments and returns a value
+    pass_interpreter: bool = False
+    # if set, the running interpreter is passed as the second argument to the callback
+    # so it can call back into TBD functions with `Interpreter.call_function`
+    pure: bool = False
+    # whether the callback has no side effects, tags calling impure builtins are never memoized
+    cache: typing.Any = field(default=None, repr=False, compare=False)
+    # a BuiltinCache the results are kept in, shared by every call to this builtin
 
 
 @dataclass
@@ -172,6 +366,8 @@ class Function(Expression):
     body: list[Expression]
     returns: Expression
     declarative_scope: Scope
+    memo: typing.Any = field(default=None, repr=False, compare=False)
+    # the memoization state shared by every function created from the same tag declaration
 
 
 literals: dict[
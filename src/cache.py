@@ -0,0 +1,139 @@
+# result caches for builtins, like the bot's member lookups and role lists, which scripts call
+# with the same arguments over and over.
+# a cache is declared where the builtin is registered, `BuiltInFunction(_members, cache=BuiltinCache(ttl=30))`,
+# and is shared by every script that calls that builtin. Results are keyed by the values of the
+# arguments (the same way memoized tags are), expire after `ttl` seconds and the least recently
+# used ones are dropped past `maxsize`. Whatever knows the underlying data changed (a member
+# update event, a role edit) calls `invalidate` with the arguments whose results are stale.
+
+from .builtin_models import *
+from .memo import freeze, Unfreezable
+from collections import OrderedDict
+import threading
+import time
+import typing
+
+__all__ = ("BuiltinCache",)
+
+DEFAULT_TTL = 60.0
+"""Seconds a cached builtin result stays valid"""
+
+DEFAULT_MAXSIZE = 256
+"""Results a single builtin's cache keeps"""
+
+
+class BuiltinCache:
+    MISSING = object()
+
+    def __init__(
+        self,
+        ttl: float | None = DEFAULT_TTL,
+        maxsize: int = DEFAULT_MAXSIZE,
+        key_args: typing.Optional[typing.Iterable[str]] = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl  # None for results that only go away when invalidated or evicted
+        self.maxsize = maxsize
+        # the arguments that make up the key, all of them by default. Leaving one out means calls
+        # that only differ in it share a result
+        self.key_args = None if key_args is None else frozenset(key_args)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # key -> (expiry, result), the key is a sorted tuple of (name, frozen value) pairs
+        self._cache: OrderedDict[tuple, tuple[float, typing.Any]] = OrderedDict()
+        self._lock = threading.Lock()  # shared between scripts, which may run on other threads
+
+    def key(self, args: dict[str, typing.Any]) -> tuple | None:
+        """The cache key of a call, None when an argument can't be part of one."""
+        if self.maxsize <= 0:
+            return None
+        try:
+            # sorted so the order arguments are passed in doesn't matter, names are unique so
+            # the values never get compared
+            return tuple(
+                sorted(
+                    ((name, freeze(value)) for name, value in args.items()
+                     if self.key_args is None or name in self.key_args),
+                    key=lambda pair: pair[0],
+                )
+            )
+        except Unfreezable:
+            return None
+
+    def get(self, key: tuple) -> typing.Any:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return self.MISSING
+            expiry, result = entry
+            if expiry < self.clock():
+                del self._cache[key]
+                self.expirations += 1
+                self.misses += 1
+                return self.MISSING
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: tuple, result: typing.Any):
+        expiry = float("inf") if self.ttl is None else self.clock() + self.ttl
+        with self._lock:
+            self._cache[key] = (expiry, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, **args: typing.Any) -> int:
+        """Drops every result of a call made with (at least) these argument values, or every result
+        when none are given. Returns how many were dropped. Only arguments that are part of the
+        key can be given."""
+        if not args:
+            return self.clear()
+        if self.key_args is not None and not args.keys() <= self.key_args:
+            # results aren't keyed by those, so there's no telling which ones they came from
+            unknown = ", ".join(sorted(args.keys() - self.key_args))
+            keyed = ", ".join(sorted(self.key_args))
+            raise ValueError(f"Can't invalidate by {unknown}, results are only keyed by {keyed}")
+
+        wanted = {name: freeze(value) for name, value in args.items()}
+        with self._lock:
+            stale = [
+                key for key in self._cache
+                if all(wanted[name] == value for name, value in key if name in wanted)
+                and wanted.keys() <= {name for name, _ in key}
+            ]
+            for key in stale:
+                del self._cache[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._cache)
+            self._cache.clear()
+            self.invalidations += dropped
+        return dropped
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    def stats(self) -> dict[str, typing.Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
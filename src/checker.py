@@ -0,0 +1,199 @@
+# static checks run over a program before it's evaluated.
+# the checker follows declarations through the program the same way the interpreter's scopes will,
+# reports redeclarations, reassigned constants and names that can't be defined where they're used,
+# and marks every declaration and assignment it can prove is fine as `checked`. The interpreter
+# skips the scope chain walks that would have done the same checks at runtime for those.
+# everything here has to be an under-approximation: a tag's body sees whatever arguments it's
+# called with and whatever its declaring scope holds by then, so names in tag bodies are only ever
+# "maybe" defined and nothing declared there is marked.
+
+from .lexer_models import Token
+from .parser_models import *
+from .builtin_models import Scope
+from dataclasses import dataclass
+import typing
+
+__all__ = ("Diagnostic", "check")
+
+_VAR, _CONST, _MAYBE = "var", "const", "maybe"
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    line: int | None
+    message: str
+
+    def __str__(self):
+        return f"line {self.line}: {self.message}" if self.line else self.message
+
+
+class _Frame:
+    # the names a scope will hold at this point of the program
+    __slots__ = ("names", "parent", "open")
+
+    def __init__(self, parent: typing.Optional["_Frame"] = None, open: bool = False):
+        self.names: dict[str, str] = {}
+        self.parent = parent
+        self.open = open  # a tag's scope, holds whatever arguments the tag gets called with
+
+    def resolve(self, name: str) -> tuple[str | None, bool]:
+        """The kind of the name where it's found, and whether an open frame could be hiding it."""
+        frame, hidden = self, False
+        while frame is not None:
+            kind = frame.names.get(name)
+            if kind is not None:
+                return kind, hidden
+            hidden = hidden or frame.open
+            frame = frame.parent
+        return None, hidden
+
+
+class _Checker:
+    def __init__(self):
+        self.diagnostics: list[Diagnostic] = []
+        self.line: int | None = None  # line of the statement being checked
+
+    def report(self, message: str):
+        self.diagnostics.append(Diagnostic(self.line, message))
+
+    def statements(self, nodes: list, frame: _Frame, conditional: bool = False):
+        for node in nodes:
+            if isinstance(node, Node) and node.line is not None:
+                self.line = node.line
+            self.visit(node, frame, conditional)
+
+    def visit(self, node, frame: _Frame, conditional: bool = False):
+        if isinstance(node, (Literal, Token)) or node is None:
+            return
+
+        if isinstance(node, Identifier):
+            kind, hidden = frame.resolve(node.name)
+            if kind is None and not hidden:
+                self.report(f"Variable {node.name} is not defined")
+
+        elif isinstance(node, VarDec):
+            self.vardec(node, frame, conditional)
+
+        elif isinstance(node, AssignmentExp):
+            self.assignment(node, frame)
+
+        elif isinstance(node, BinaryExp):
+            self.visit(node.left, frame)
+            self.visit(node.right, frame)
+
+        elif isinstance(node, UnaryExp):
+            self.visit(node.operand, frame)
+
+        elif isinstance(node, ObjectExp):
+            for prop in node.properties:
+                self.visit(prop.value, frame)
+
+        elif isinstance(node, ArrayExp):
+            for element in node.elements:
+                self.visit(element, frame)
+
+        elif isinstance(node, MemberExp):
+            self.visit(node.object, frame)
+            if node.computed:
+                self.visit(node.value, frame)
+
+        elif isinstance(node, FunctionCallExp):
+            self.visit(node.caller, frame)
+            # builtins bind every argument in a scope of their own as it's evaluated,
+            # so later arguments may see the earlier ones
+            arguments = _Frame(frame)
+            for argument in node.arguments:
+                self.visit(argument.value, arguments)
+                arguments.names[argument.name] = _MAYBE
+
+        elif isinstance(node, FunctionDec):
+            self.function_dec(node, frame, conditional)
+
+        elif isinstance(node, IfStatement):
+            self.visit(node.condition, frame)
+            self.statements(node.body, frame, conditional=True)
+            if isinstance(node._else, IfStatement):
+                self.visit(node._else, frame, conditional=True)
+            elif node._else is not None:
+                self.statements(node._else, frame, conditional=True)
+
+        elif isinstance(node, LoopStatement):
+            self.visit(node.target, frame)
+            # a fresh scope every iteration, so nothing declared in the body outlives it
+            body = _Frame(frame)
+            body.names["index"] = _VAR
+            if not node.counted:
+                body.names["item"] = _VAR
+            self.statements(node.body, body, conditional)
+
+        elif isinstance(node, SendStatement):
+            self.visit(node.message, frame)
+            self.visit(node.destination, frame)
+
+        elif isinstance(node, ImportStatement):
+            self.visit(node.source, frame)
+            # what a module exports isn't known until it's loaded, so from here on any name
+            # could be defined in this scope
+            frame.open = True
+
+    def vardec(self, node: VarDec, frame: _Frame, conditional: bool):
+        kind, hidden = frame.resolve(node.name)
+        # the interpreter checks the whole scope chain, a name that exists anywhere can't be declared
+        node.checked = kind is None and not hidden
+        if kind in (_VAR, _CONST):
+            self.report(f"Variable {node.name} is already defined and cannot be redeclared")
+
+        self.visit(node.value, frame)
+        if kind is None:
+            declared = _CONST if isinstance(node, ConstDec) else _VAR
+            frame.names[node.name] = _MAYBE if conditional else declared
+
+    def assignment(self, node: AssignmentExp, frame: _Frame):
+        node.checked = False
+        if isinstance(node.assignee, Identifier):
+            name = node.assignee.name
+            kind, hidden = frame.resolve(name)
+            # open frames only ever add variables, so finding a variable is enough
+            node.checked = kind == _VAR
+            if kind == _CONST and not hidden:
+                self.report(f"Variable {name} is a constant and cannot be reassigned")
+            elif kind is None and not hidden:
+                self.report(f"Variable {name} is not defined")
+
+        self.visit(node.value, frame)
+
+    def function_dec(self, node: FunctionDec, frame: _Frame, conditional: bool):
+        body = _Frame(frame, open=True)
+        line = self.line
+        self.statements(node.body, body)
+        self.visit(node.returns, body)
+        self.line = line
+
+        if node.name:
+            # declared tags overwrite whatever has the same name, without any checks
+            kind = frame.names.get(node.name)
+            if conditional and kind is None:
+                frame.names[node.name] = _MAYBE
+            elif not conditional and kind != _CONST:
+                frame.names[node.name] = _VAR
+            else:
+                frame.names[node.name] = _MAYBE
+
+
+def _global_frame(scope: Scope) -> _Frame:
+    frame = _Frame()
+    while scope is not None:
+        for name in scope.variables:
+            frame.names.setdefault(name, _VAR)
+        for name in scope.constants:
+            frame.names.setdefault(name, _CONST)
+        scope = scope.parent
+    return frame
+
+
+def check(program: Program, scope: typing.Optional[Scope] = None) -> list[Diagnostic]:
+    """Checks the program as it would run in the given global scope. Every declaration and
+    assignment is (re)marked, so this has to run again before evaluating in a different scope."""
+    checker = _Checker()
+    checker.statements(program.body, _global_frame(scope or Scope()))
+    return checker.diagnostics
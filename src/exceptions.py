@@ -44,6 +44,26 @@ class SyntaxError(ParserException):
     pass
 
 
+class MemoryLimitExceeded(InterpreterException):
+    pass
+
+
+class IntegerTooLarge(InterpreterException):
+    pass
+
+
+class TimeLimitExceeded(BaseException):
+    # raised from a signal handler at any point of the script, including inside the interpreter's
+    # own `except InterpreterException` blocks, so it can't be one or it would just be swallowed
+    pass
+
+
+class Cancelled(BaseException):
+    # raised in a script's thread when whoever runs it stops it, not an InterpreterException for
+    # the same reason as TimeLimitExceeded
+    pass
+
+
 class NotSupported(InterpreterException):
     pass
 
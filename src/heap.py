@@ -0,0 +1,57 @@
+# approximate sizes of runtime values, used to cap how much memory a script can keep alive.
+# the numbers are rough CPython sizes, they only have to be good enough to stop a script before it
+# takes the whole process down, not to match what the allocator actually hands out.
+
+from .lexer_models import OPERATORS
+from .bigint import estimate_bits
+from .builtin_models import *
+import typing
+
+__all__ = ("DEFAULT_MEMORY_LIMIT", "estimate_size", "estimate_binop_size", "int_size")
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+"""Bytes of strings, arrays and dicts a single run can have alive at once before it's stopped"""
+
+OBJECT_SIZE = 56
+"""Size of an empty value object"""
+
+REFERENCE_SIZE = 8
+"""Size of one element of an Array (a pointer to the element)"""
+
+DICT_ENTRY_SIZE = 100
+"""Size of one entry of a Dict, the key, the value's pointer and the map node"""
+
+
+def int_size(value: int) -> int:
+    return 28 + value.bit_length() // 8
+
+
+def estimate_size(value: typing.Any) -> int:
+    """Approximate bytes taken by a value itself, not counting the values it contains."""
+    if isinstance(value, String):
+        return OBJECT_SIZE + value.length
+    if isinstance(value, NumericArray):
+        return OBJECT_SIZE + value.value.nbytes
+    if isinstance(value, Array):
+        return OBJECT_SIZE + REFERENCE_SIZE * len(value)
+    if isinstance(value, Dict):
+        return OBJECT_SIZE + DICT_ENTRY_SIZE * len(value.value)
+    if isinstance(value, Number) and type(value.value) is int:
+        return int_size(value.value)
+    return OBJECT_SIZE
+
+
+def estimate_binop_size(operator: OPERATORS, left: typing.Any, right: typing.Any) -> int:
+    """Approximate bytes the result of an operation will take, before running it."""
+    if isinstance(left, Array) or isinstance(right, Array):
+        length = len(left) if isinstance(left, Array) else len(right)
+        return OBJECT_SIZE + REFERENCE_SIZE * length
+
+    if isinstance(left, String) and isinstance(right, String):
+        # the result shares the pieces of the left string, but keeps them alive when the left one goes
+        return OBJECT_SIZE + left.length + right.length
+
+    l, r = getattr(left, "value", None), getattr(right, "value", None)
+    if type(l) is not int or type(r) is not int:
+        return OBJECT_SIZE
+    return 28 + estimate_bits(operator, l, r) // 8
@@ -0,0 +1,163 @@
+# execution hooks for tracing and instrumentation.
+# the interpreter doesn't check for hooks anywhere. Registering one shadows the few interpreter methods
+# the event happens in with an instrumented wrapper set on the instance, and removing the last hook
+# of a kind deletes the wrapper again. So a script evaluated without hooks runs the exact same code
+# it would if hooks didn't exist.
+
+from .parser_models import *
+from .builtin_models import *
+import typing
+
+if typing.TYPE_CHECKING:
+    from .interpreter import Interpreter
+
+__all__ = ("Hooks", "HOOK_EVENTS")
+
+HOOK_EVENTS = (
+    "node_enter",  # (node, scope)
+    "node_exit",  # (node, scope, result)
+    "tag_call",  # (function, arguments)
+    "tag_return",  # (function, result)
+    "var_read",  # (name, value, scope)
+    "var_write",  # (name, value, scope)
+    "builtin_call",  # (function, arguments)
+)
+"""Events hooks can be registered for and the arguments their callbacks get"""
+
+_WRAPPED = (
+    "_eval_node",
+    "_eval_identifier",
+    "_declare",
+    "_eval_assignment",
+    "_assign",
+    "_call_tag",
+    "_call_builtin",
+)
+
+
+class Hooks:
+    def __init__(self):
+        self.callbacks: dict[str, list[typing.Callable[..., typing.Any]]] = {
+            event: [] for event in HOOK_EVENTS
+        }
+
+    def __bool__(self):
+        return any(self.callbacks.values())
+
+    def add(self, event: str, callback: typing.Callable[..., typing.Any]):
+        if event not in self.callbacks:
+            raise ValueError(
+                f"Unknown hook event {event!r}, expected one of {', '.join(HOOK_EVENTS)}"
+            )
+        self.callbacks[event].append(callback)
+
+    def remove(self, event: str, callback: typing.Callable[..., typing.Any]):
+        self.callbacks[event].remove(callback)
+
+    def install(self, interpreter: "Interpreter"):
+        """(Re)binds the instrumented methods of the interpreter to match the registered hooks."""
+        for name in _WRAPPED:
+            interpreter.__dict__.pop(name, None)
+
+        node_enter, node_exit = self.callbacks["node_enter"], self.callbacks["node_exit"]
+        if node_enter or node_exit:
+            interpreter._eval_node = self._trace_nodes(interpreter._eval_node)
+
+        if self.callbacks["var_read"]:
+            interpreter._eval_identifier = self._trace_reads(interpreter._eval_identifier)
+
+        if self.callbacks["var_write"]:
+            interpreter._declare = self._trace_declarations(interpreter._declare)
+            interpreter._eval_assignment = self._trace_assignment_nodes(
+                interpreter._eval_assignment
+            )
+            interpreter._assign = self._trace_assignments(interpreter._assign)
+
+        if self.callbacks["tag_call"] or self.callbacks["tag_return"]:
+            interpreter._call_tag = self._trace_tags(interpreter._call_tag)
+
+        if self.callbacks["builtin_call"]:
+            interpreter._call_builtin = self._trace_builtins(interpreter._call_builtin)
+
+        if interpreter._stackless is not None:
+            interpreter._stackless.bind(self)
+
+    def _trace_nodes(self, eval_node):
+        enter, exit = self.callbacks["node_enter"], self.callbacks["node_exit"]
+
+        def traced(node, scope=None):
+            for callback in enter:
+                callback(node, scope)
+            result = eval_node(node, scope)
+            for callback in exit:
+                callback(node, scope, result)
+            return result
+
+        return traced
+
+    def _trace_reads(self, eval_identifier):
+        read = self.callbacks["var_read"]
+
+        def traced(node: Identifier, scope=None):
+            value = eval_identifier(node, scope)
+            for callback in read:
+                callback(node.name, value, scope)
+            return value
+
+        return traced
+
+    def _trace_declarations(self, declare):
+        write = self.callbacks["var_write"]
+
+        def traced(node: VarDec, val, constant, scope):
+            result = declare(node, val, constant, scope)
+            for callback in write:
+                callback(node.name, val, scope)
+            return result
+
+        return traced
+
+    def _trace_assignment_nodes(self, eval_assignment):
+        write = self.callbacks["var_write"]
+
+        def traced(node: AssignmentExp, scope=None):
+            result = eval_assignment(node, scope)
+            for callback in write:
+                callback(node.assignee.name, result, scope)
+            return result
+
+        return traced
+
+    def _trace_assignments(self, assign):
+        write = self.callbacks["var_write"]
+
+        def traced(name, value, scope):
+            result = assign(name, value, scope)
+            for callback in write:
+                callback(name, value, scope)
+            return result
+
+        return traced
+
+    def _trace_tags(self, call_tag):
+        call, ret = self.callbacks["tag_call"], self.callbacks["tag_return"]
+
+        def traced(function, arguments):
+            for callback in call:
+                callback(function, arguments)
+            result = call_tag(function, arguments)
+            for callback in ret:
+                callback(function, result)
+            return result
+
+        return traced
+
+    def _trace_builtins(self, call_builtin):
+        builtin = self.callbacks["builtin_call"]
+
+        def traced(function, arguments):
+            for callback in builtin:
+                callback(function, arguments)
+            return call_builtin(function, arguments)
+
+        return traced
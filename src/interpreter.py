@@ -3,10 +3,33 @@ from .lexer import Lexer
 from .parser import Parser
 from .parser_models import *
 from .builtin_models import *
-from .exceptions import InterpreterException
+from .builtin_models import INT64_MIN, INT64_MAX
+from .exceptions import InterpreterException, MemoryLimitExceeded, IntegerTooLarge, Cancelled
+from .output import OutputChannel
+from .memo import TagMemo, analyze_purity, freeze, Unfreezable
+from .cache import BuiltinCache
+from .specialize import Specializer, DEFAULT_MAXSIZE as DEFAULT_SPECIALIZE_SIZE
+from .stackless import StacklessEvaluator, DEFAULT_MAX_CALL_DEPTH
+from .hooks import Hooks
+from .stats import RunStats
+from .heap import DEFAULT_MEMORY_LIMIT, estimate_size, estimate_binop_size
+from .store import GuildStore
+from .checker import Diagnostic, check
+from .modules import ModuleCache, MODULES
+from .stream import EvaluationStream, DEFAULT_MAXSIZE
+from .bigint import DEFAULT_MAX_INT_BITS, GUARDED_OPERATORS, estimate_bits
 from typing import Any, Optional
 from dataclasses import dataclass, field
 from pprint import pprint
+import gc
+import threading
+import time
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 binops = {
     OPERATORS.PLUS: lambda l, r: l + r,
@@ -23,31 +46,140 @@ binops = {
     OPERATORS.LTEQUALS: lambda l, r: l <= r,
 }
 
+vector_binops = (
+    {
+        OPERATORS.PLUS: numpy.add,
+        OPERATORS.MINUS: numpy.subtract,
+        OPERATORS.MULTIPLY: numpy.multiply,
+        OPERATORS.DIVIDE: numpy.true_divide,
+        OPERATORS.REMAINDER: numpy.remainder,
+        OPERATORS.POWER: numpy.power,
+        OPERATORS.COMPARISON: numpy.equal,
+        OPERATORS.NEQUALS: numpy.not_equal,
+        OPERATORS.GREATER_THAN: numpy.greater,
+        OPERATORS.LESS_THAN: numpy.less,
+        OPERATORS.GTEQUALS: numpy.greater_equal,
+        OPERATORS.LTEQUALS: numpy.less_equal,
+    }
+    if numpy is not None
+    else {}
+)
+"""Element-wise numpy kernels used for operations involving a NumericArray"""
+
+int_result_bounds = {
+    OPERATORS.PLUS: lambda l, r: l + r,
+    OPERATORS.MINUS: lambda l, r: l + r,
+    OPERATORS.MULTIPLY: lambda l, r: l * r,
+    OPERATORS.POWER: lambda l, r: l**r,
+}
+"""Upper bound of the magnitude of an int result given the largest magnitudes of both operands"""
+
 
 class Interpreter:
-    def __init__(self, source: str, scope: Optional[Scope] = None) -> None:
+    def __init__(
+        self,
+        source: str,
+        scope: Optional[Scope] = None,
+        output: Optional[OutputChannel] = None,
+        memo_size: int = 128,
+        stackless: bool = False,
+        max_call_depth: int = DEFAULT_MAX_CALL_DEPTH,
+        memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+        max_int_bits: Optional[int] = DEFAULT_MAX_INT_BITS,
+        store: Optional[GuildStore] = None,
+        program: Optional[Program] = None,
+        modules: Optional[ModuleCache] = None,
+        specialize_size: int = DEFAULT_SPECIALIZE_SIZE,
+    ) -> None:
         self.source = source
-        self._lexer = Lexer(source)
-        self._tokens = self._lexer.tokenize()
-        self._parser = Parser(self._tokens)
-        self.ast = self._parser.parse()
+        if program is None:
+            program, lex_time, parse_time = self.compile(source)
+            self._compile_times = (lex_time, parse_time)
+        else:
+            self._compile_times = (0.0, 0.0)  # compiled by someone else, `source` is just informative
+        self.ast = program
         # pprint(self.ast)
         self.index = 0
 
         self.global_scope = scope or Scope()
+        self.output = output or OutputChannel()
+        self.memo_size = memo_size  # max cached results per pure tag, 0 disables memoization
+        self._memos: dict[int, TagMemo] = {}
+        # evaluates with an explicit stack so deep recursion doesn't hit python's recursion limit
+        self._stackless = StacklessEvaluator(self, max_call_depth) if stackless else None
+        self.hooks = Hooks()
+        self.stats = RunStats(*self._compile_times)  # replaced by every call to evaluate
+        self.memory_limit = memory_limit  # None lets a run keep as much alive as it wants
+        # approximate size of every value the run created that's still alive, and a weak reference
+        # to it, by id of the reference (values themselves mostly aren't hashable)
+        self._live: dict[int, tuple[weakref.ref, int]] = {}
+        self.max_int_bits = max_int_bits  # None lets ints grow (and operations on them take) unbounded
+        self.store = store  # persistent variables bound to the scope, written at the end of the run
+        # what the checker found and the variables the store couldn't write, filled in by evaluate
+        self.diagnostics: list[Diagnostic] = []
+        self.modules = modules or MODULES
+        # tag bodies rewritten for the literal arguments of a call site, 0 disables specialization
+        self.specializer = Specializer(specialize_size)
+        # set by whoever wants the run stopped, checked on every loop iteration and tag call
+        self.cancelled: Optional[threading.Event] = None
+        self._depth = 0
         # self._populate_builtins()
 
+    @staticmethod
+    def compile(source: str) -> tuple[Program, float, float]:
+        """Lexes and parses the source, returns the program and the seconds each step took."""
+        start = time.perf_counter()
+        lexer = Lexer(source)
+        tokens = lexer.tokenize()
+        lexed = time.perf_counter()
+        program = Parser(tokens, lexer.braces).parse()
+        return program, lexed - start, time.perf_counter() - lexed
+
+    def add_hook(self, event: str, callback):
+        """Registers a callback for one of the events in `hooks.HOOK_EVENTS`."""
+        self.hooks.add(event, callback)
+        self.hooks.install(self)
+
+    def remove_hook(self, event: str, callback):
+        self.hooks.remove(event, callback)
+        self.hooks.install(self)
+
     def _populate_builtins(self):
         self.global_scope.declare_var("print", BuiltInFunction(print))
 
     def evaluate(self):
-        while not self.at_end():
-            res = self._eval_node(self.current())
-            self.advance()
-            if res is None:
-                continue
-
-            yield res
+        eval_node = self._stackless.evaluate if self._stackless else self._eval_node
+        self.stats = RunStats(*self._compile_times)
+        self._live = {}  # values from earlier runs aren't this one's to release
+        start = time.perf_counter()
+        # marks what doesn't need checking at runtime, problems are still raised when they're reached
+        self.diagnostics = check(self.ast, self.global_scope)
+        try:
+            while not self.at_end():
+                res = eval_node(self.current(), self.global_scope)
+                self.advance()
+                if res is None:
+                    continue
+
+                yield res
+        finally:
+            try:
+                self.output.flush()  # whatever is still buffered goes out when the script ends
+            finally:
+                # a sink failing (or a stream being cancelled) doesn't keep the store from writing
+                if self.store is not None:
+                    self.store.flush()
+                    self.diagnostics.extend(
+                        Diagnostic(None, f"Variable {name} wasn't stored: {reason}")
+                        for name, reason in self.store.rejected.items()
+                    )
+                # time spent by whoever consumes the results in between is counted as well
+                self.stats.eval_time = time.perf_counter() - start
+
+    def stream(self, maxsize: int = DEFAULT_MAXSIZE) -> EvaluationStream:
+        """Evaluates on another thread, results, prints and sends come out of the returned stream
+        (iterable with `for` or `async for`) as they happen. At most `maxsize` of them are buffered."""
+        return EvaluationStream(self, maxsize)
 
     def advance(self):
         self.index += 1
@@ -66,6 +198,7 @@ class Interpreter:
 
     def _eval_node(self, node: Node | Token, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
+        self.stats.node_visits += 1
         if isinstance(node, BinaryExp):
             return self._eval_binop(node, scope)
 
@@ -110,6 +243,15 @@ class Interpreter:
         elif isinstance(node, IfStatement):
             return self._eval_if_statement(node, scope)
 
+        elif isinstance(node, LoopStatement):
+            return self._eval_loop_statement(node, scope)
+
+        elif isinstance(node, SendStatement):
+            return self._eval_send_statement(node, scope)
+
+        elif isinstance(node, ImportStatement):
+            return self._eval_import_statement(node, scope)
+
         else:
             return "Not implemented: {}".format(node)
 
@@ -117,6 +259,15 @@ class Interpreter:
         scope = scope or self.global_scope
         left: Literal = self._eval_node(node.left, scope)
         right: Literal = self._eval_node(node.right, scope)
+        return self._apply_binop(node.operator.subtype, left, right)
+
+    def _apply_binop(self, operator: OPERATORS, left: Literal, right: Literal):
+        if isinstance(left, Array) or isinstance(right, Array):
+            self._reserve(estimate_binop_size(operator, left, right))
+            return self._track(self._apply_array_binop(operator, left, right))
+
+        if operator is OPERATORS.PLUS and isinstance(left, String) and isinstance(right, String):
+            return self._track(left.concat(right))
 
         if not left.is_arithmetic_compatible(right):
             raise InterpreterException(
@@ -124,31 +275,136 @@ class Interpreter:
             )
 
         l, r = left.value, right.value
-        if node.operator.subtype in binops:
-            result: int | float | str = binops[node.operator.subtype](l, r)
-            tr = type(result)
-            return literals[tr](result)
+        if operator in GUARDED_OPERATORS and type(l) is int and type(r) is int:
+            self._check_int_cost(operator, l, r)
+
+        if operator in binops:
+            result: int | float | str = binops[operator](l, r)
+            cls = literals[type(result)]
+            self.stats.allocations[cls] += 1
+            return cls(result)
 
         else:
-            raise InterpreterException(f"Invalid operator {node.operator.subtype}")
+            raise InterpreterException(f"Invalid operator {operator}")
+
+    def _check_int_cost(self, operator: OPERATORS, l: int, r: int):
+        # the operation itself can't be interrupted, so it has to be refused before it starts
+        bits = estimate_bits(operator, l, r)
+        if self.max_int_bits is not None and bits > self.max_int_bits:
+            raise IntegerTooLarge(
+                f"{operator.value} on integers of {l.bit_length()} and {r.bit_length()} bits would "
+                f"need ~{bits} bits, more than the limit of {self.max_int_bits}"
+            )
+        # big ints aren't counted as alive, but one that doesn't fit is still refused
+        self._reserve(28 + bits // 8)
+
+    def _apply_array_binop(self, operator: OPERATORS, left: Literal, right: Literal):
+        # operations on arrays are applied element-wise, either between two arrays of the same length
+        # or between every element of an array and a scalar.
+        if isinstance(left, NumericArray) or isinstance(right, NumericArray):
+            result = self._vectorized_binop(operator, left, right)
+            if result is not None:
+                return result
+
+        if isinstance(left, Array) and isinstance(right, Array):
+            if len(left) != len(right):
+                raise InterpreterException(
+                    f"Cannot apply {operator} to arrays of different lengths ({len(left)} and {len(right)})"
+                )
+            pairs = zip(left, right)
+        elif isinstance(left, Array):
+            pairs = ((l, right) for l in left)
+        else:
+            pairs = ((left, r) for r in right)
+
+        return Array.pack([self._apply_binop(operator, l, r) for l, r in pairs])
+
+    def _vectorized_binop(self, operator: OPERATORS, left: Literal, right: Literal):
+        # returns None whenever numpy can't reproduce the exact semantics of the scalar operation
+        # (int overflow, division by zero, negative int powers etc.) so the caller falls back to
+        # the boxed element-wise path which behaves exactly like scalars do.
+        if operator not in vector_binops:
+            return None
+
+        l, r = self._vector_operand(left), self._vector_operand(right)
+        if l is None or r is None:
+            return None
+
+        if isinstance(l, numpy.ndarray) and isinstance(r, numpy.ndarray) and l.shape != r.shape:
+            return None
+
+        l_int, r_int = numpy.asarray(l).dtype.kind == "i", numpy.asarray(r).dtype.kind == "i"
+        if operator in (OPERATORS.DIVIDE, OPERATORS.REMAINDER) and numpy.any(r == 0):
+            return None
+
+        if operator is OPERATORS.POWER and r_int and numpy.any(r < 0):
+            return None
+
+        if l_int and r_int and operator in int_result_bounds:
+            try:
+                bound = int_result_bounds[operator](self._magnitude(l), self._magnitude(r))
+            except OverflowError:
+                return None
+            if bound > INT64_MAX:
+                return None
+
+        try:
+            with numpy.errstate(all="ignore"):
+                result = vector_binops[operator](l, r)
+        except (ValueError, TypeError, FloatingPointError):
+            return None
+
+        if result.dtype.kind == "f" and not numpy.all(numpy.isfinite(result)):
+            return None
+
+        return NumericArray(result)
+
+    @staticmethod
+    def _vector_operand(value: Literal):
+        if isinstance(value, NumericArray):
+            return value.value if value.value.dtype.kind in "if" else None
+
+        if type(value) is Number and (
+            type(value.value) is float or INT64_MIN <= value.value <= INT64_MAX
+        ):
+            return value.value
+
+        return None
+
+    @staticmethod
+    def _magnitude(value) -> float:
+        if isinstance(value, numpy.ndarray):
+            return max(abs(float(value.max())), abs(float(value.min())))
+        return abs(float(value))
 
     def _eval_unary(self, node: UnaryExp, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
         operand = self._eval_node(node.operand, scope)
-        if node.operator.subtype in (OPERATORS.PLUS, OPERATORS.MINUS) and not isinstance(
-            operand, Number
-        ):
+        return self._apply_unary(node.operator.subtype, operand)
+
+    def _apply_unary(self, operator: OPERATORS, operand: Literal):
+        if operator in (OPERATORS.PLUS, OPERATORS.MINUS) and not isinstance(operand, Number):
             raise InterpreterException(
-                "Unary operator {} can only be applied to numbers!".format(node.operator.subtype)
+                "Unary operator {} can only be applied to numbers!".format(operator)
             )
 
-        if node.operator.subtype is OPERATORS.MINUS:
-            return literals[type(operand.value)](-operand.value)
+        if operator is OPERATORS.MINUS:
+            cls = literals[type(operand.value)]
+            self.stats.allocations[cls] += 1
+            return cls(-operand.value)
 
         return operand
 
     def _eval_vardec(self, node: VarDec, constant: bool = False, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
+        self._check_redeclaration(node, scope)
+        val = self._eval_node(node.value, scope)
+        return self._declare(node, val, constant, scope)
+
+    @staticmethod
+    def _check_redeclaration(node: VarDec, scope: Scope):
+        if node.checked:
+            return
         try:
             scope.get_var(node.name)
         except InterpreterException:
@@ -158,16 +414,35 @@ class Interpreter:
                 f"Variables cannot be redeclared with the let/const keyword!"
             )
 
-        val = self._eval_node(node.value, scope)
-
+    @staticmethod
+    def _declare(node: VarDec, val: Literal, constant: bool, scope: Scope):
         if isinstance(val, Token) and val.type is TokenType.IDENTIFIER:
             raise InterpreterException(f"Variable {val.lexeme} is not defined.")
 
-        scope.declare_var(node.name, val, constant)
+        if node.checked:
+            # the name is nowhere in the scope chain, no need to look for it again
+            (scope.constants if constant else scope.variables)[node.name] = val
+        else:
+            scope.declare_var(node.name, val, constant)
         return Null()
 
     def _eval_assignment(self, node: AssignmentExp, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
+        name = self._assignee(node, scope)
+        res = self._eval_node(node.value, scope)
+        scope.assign_var(name, res)
+        return res
+
+    @staticmethod
+    def _assign(name: str, value: Literal, scope: Scope):
+        # used by the stackless evaluator, _eval_assignment assigns directly to keep the hot path short
+        scope.assign_var(name, value)
+        return value
+
+    @staticmethod
+    def _assignee(node: AssignmentExp, scope: Scope):
+        if node.checked:
+            return node.assignee.name
 
         name = None
         if isinstance(node.assignee, Identifier):
@@ -176,31 +451,94 @@ class Interpreter:
         is_constant = scope.is_constant(name)
         if is_constant:
             raise InterpreterException(f"Variable {name} is a constant and cannot be reassigned!")
-
-        res = self._eval_node(node.value, scope)
-        scope.assign_var(name, res)
-        return res
+        return name
 
     def _eval_object(self, node: ObjectExp, scope: Optional[Scope] = None):
-        _d = Dict()
-        _d.value.update(
-            {prop.name.name: self._eval_node(prop.value, scope) for prop in node.properties}
+        return self._track(
+            Dict({prop.name.name: self._eval_node(prop.value, scope) for prop in node.properties})
         )
-        return _d
 
     def _eval_identifier(self, node: Identifier, scope: Optional[Scope] = None):
+        # walks the scope chain itself instead of using Scope.get_var to count how far it went
         scope = scope or self.global_scope
-        try:
-            return scope.get_var(node.name)
-        except InterpreterException:
-            raise InterpreterException(f"Variable {node.name} is not defined.")
+        name = node.name
+        stats = self.stats
+        stats.scope_lookups += 1
+        hops = 0
+        while scope is not None:
+            if name in scope.variables:
+                value = scope.variables[name]
+                break
+            if name in scope.constants:
+                value = scope.constants[name]
+                break
+            scope = scope.parent
+            hops += 1
+        else:
+            raise InterpreterException(f"Variable {name} is not defined.")
+
+        if hops:
+            stats.scope_hops += hops
+            if hops > stats.max_scope_hops:
+                stats.max_scope_hops = hops
+        return value
+
+    def _track(self, value: Literal, size: Optional[int] = None):
+        # counts a newly created value and its size until it's garbage, and keeps track of the
+        # biggest arrays and strings
+        stats = self.stats
+        stats.allocations[type(value)] += 1
+        if isinstance(value, Array):
+            if len(value) > stats.peak_array_length:
+                stats.peak_array_length = len(value)
+        elif isinstance(value, String):
+            if value.length > stats.peak_string_length:
+                stats.peak_string_length = value.length
+        elif not isinstance(value, Dict):
+            return value
+
+        if size is None:
+            size = estimate_size(value)
+        self._reserve(size)
+        stats.heap_bytes += size
+        if stats.heap_bytes > stats.peak_heap_bytes:
+            stats.peak_heap_bytes = stats.heap_bytes
+        ref = weakref.ref(value, self._release)
+        self._live[id(ref)] = (ref, size)
+        return value
+
+    def _release(self, ref: weakref.ref):
+        # a tracked value was garbage collected, whatever ran after the run it was created in
+        # doesn't count it anymore
+        entry = self._live.pop(id(ref), None)
+        if entry is not None:
+            self.stats.heap_bytes -= entry[1]
+
+    def _reserve(self, size: int):
+        # refuses to go on if having `size` more bytes alive would go over the memory limit
+        limit = self.memory_limit
+        if limit is None or self.stats.heap_bytes + size <= limit:
+            return
+        # values only a reference cycle keeps alive (through a tag and the scope it captured)
+        # aren't released until the cycle is collected
+        gc.collect()
+        if self.stats.heap_bytes + size > limit:
+            raise MemoryLimitExceeded(
+                f"Script exceeded its memory limit of {limit} bytes "
+                f"(~{self.stats.heap_bytes} in use, ~{size} more needed)"
+            )
 
     def _eval_member_exp(self, node: MemberExp, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
         obj = self._eval_node(node.object, scope)
+        return self._access_member(obj, node)
+
+    @staticmethod
+    def _access_member(obj: Literal, node: MemberExp):
         if not isinstance(obj, (Dict, Array)) and node.computed:
             raise InterpreterException(f"Object {obj} is not subscriptable.")
-        return obj._access_property(getattr(node.value, "name", node.value.value))
+        prop = node.value.name if isinstance(node.value, Identifier) else node.value.value
+        return obj._access_property(prop)
 
     def _eval_function_call(self, node: FunctionCallExp, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
@@ -208,29 +546,137 @@ class Interpreter:
         if isinstance(function, BuiltInFunction):
             subscope = Scope(parent=scope)
             args = {arg.name: self._eval_argument(arg, subscope) for arg in node.arguments}
-            return function.python_function(args)
+            return self._call_builtin(function, args)
 
         elif isinstance(function, Function):
-            subscope = Scope(parent=function.declarative_scope)
-            # we need to loop through the arguments and params and assign them to the subscope
-            # if we have a param that wasn't passed in, we need to assign it to Null
-            # we also need to assign the extra arguments to the subscope anyways.
+            # arguments are evaluated in the caller's scope, like they are for builtins
+            args = {arg.name: self._eval_node(arg.value, scope) for arg in node.arguments}
+            return self._call_tag(self.specializer.specialize(function, node, args), args)
 
-            for param in function.parameters:
-                subscope.force_assign_var(param.name, Null())  # assign the param to Null
-
-            for arg in node.arguments:
-                subscope.force_assign_var(arg.name, self._eval_argument(arg, subscope))
-                # assign the arg to the value
-                # dual looping allows us to properly assign all arguments and parameters to the subscope
+        else:
+            raise InterpreterException(f"{node.caller} is not callable")
 
-            for node in function.body:
-                self._eval_node(node, subscope)
+    def call_function(self, function: Function | BuiltInFunction, arguments: dict[str, Literal]):
+        """Calls a function with already evaluated arguments.
+        This is the path builtins use to call back into TBD functions, it skips building and evaluating argument nodes."""
+        if isinstance(function, BuiltInFunction):
+            return self._call_builtin(function, dict(arguments))
 
-            return self._eval_node(function.returns, subscope)
+        elif isinstance(function, Function):
+            if self._stackless:
+                return self._stackless.call_function(function, dict(arguments))
+            return self._call_tag(function, dict(arguments))
 
         else:
-            raise InterpreterException(f"{node.caller} is not callable")
+            raise InterpreterException(f"{function} is not callable")
+
+    def _call_builtin(self, function: BuiltInFunction, args: dict[str, Literal]):
+        cache = function.cache
+        key = None if cache is None else cache.key(args)
+        if key is not None:
+            result = cache.get(key)
+            if result is not BuiltinCache.MISSING:
+                # nothing gets allocated, so there's nothing to track either
+                return result
+
+        if function.pass_interpreter:
+            result = function.python_function(args, self)
+        else:
+            result = function.python_function(args)
+        if key is not None and not isinstance(result, (Function, BuiltInFunction)):
+            cache.put(key, result)
+        return result if result is None else self._track(result)
+
+    def _call_tag(self, function: Function, arguments: dict[str, Literal]):
+        key = self._memo_key(function, arguments)
+        if key is not None:
+            result = function.memo.get(key)
+            if result is not TagMemo.MISSING:
+                return result
+
+        subscope = self._tag_scope(function, arguments)
+        self._depth += 1
+        if self._depth > self.stats.max_call_depth:
+            self.stats.max_call_depth = self._depth
+        try:
+            result = self._run_function_body(function, subscope)
+        finally:
+            self._depth -= 1
+        if key is not None and not isinstance(result, (Function, BuiltInFunction)):
+            # functions capture the scope of the call that created them so they're never shared
+            function.memo.put(key, result)
+        return result
+
+    def _tag_scope(self, function: Function, arguments: dict[str, Literal]):
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise Cancelled("Evaluation was cancelled")
+        self.stats.tag_calls += 1
+        subscope = Scope(parent=function.declarative_scope)
+        # we need to loop through the arguments and params and assign them to the subscope
+        # if we have a param that wasn't passed in, we need to assign it to Null
+        # we also need to assign the extra arguments to the subscope anyways.
+        for param in function.parameters:
+            subscope.force_assign_var(param.name, Null())  # assign the param to Null
+        subscope.variables.update(arguments)
+        return subscope
+
+    def _memo_key(self, function: Function, arguments: dict[str, Literal]):
+        # the key is made of the arguments and the values of every outer variable the tag reads.
+        # returns None when the call can't be memoized.
+        memo = function.memo
+        if memo is None or not memo.active:
+            return None
+
+        values = dict(arguments)
+        for name in memo.purity.reads:
+            if name not in values:
+                values[name] = self._lookup(function.declarative_scope, name)
+
+        visited = {id(memo)}
+        for value in values.values():
+            if isinstance(value, (Function, BuiltInFunction)) and not self._is_pure(value, visited):
+                return None
+
+        try:
+            return tuple((name, freeze(value)) for name, value in values.items())
+        except Unfreezable:
+            return None
+
+    def _is_pure(self, function: Function | BuiltInFunction, visited: set[int]) -> bool:
+        if isinstance(function, BuiltInFunction):
+            return function.pure
+
+        memo = function.memo
+        if memo is None or not memo.enabled or not memo.purity.pure:
+            return False
+        if id(memo) in visited:
+            return True  # recursion, it's pure as long as the rest of it is
+        visited.add(id(memo))
+
+        for name in memo.purity.reads:
+            value = self._lookup(function.declarative_scope, name)
+            if isinstance(value, (Function, BuiltInFunction)) and not self._is_pure(value, visited):
+                return False
+        return True
+
+    @staticmethod
+    def _lookup(scope: Scope, name: str):
+        scope = scope.resolve_var_scope(name)
+        if scope is None:
+            return None
+        if name in scope.variables:
+            return scope.variables[name]
+        return scope.constants[name]
+
+    def memo_stats(self) -> list[dict[str, Any]]:
+        """Cache statistics of every tag declared so far."""
+        return [memo.stats() for memo in self._memos.values()]
+
+    def _run_function_body(self, function: Function, subscope: Scope):
+        for node in function.body:
+            self._eval_node(node, subscope)
+
+        return self._eval_node(function.returns, subscope)
 
     def _eval_function_dec(self, node: FunctionDec, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
@@ -246,7 +692,13 @@ class Interpreter:
             return False
 
         parameters = list[Identifier](filter(filter_probable_parameters, node.body))
-        func = Function(node.name, parameters, node.body, node.returns, scope)
+
+        memo = self._memos.get(id(node))
+        if memo is None:
+            purity = analyze_purity(node.body, node.returns)
+            memo = self._memos[id(node)] = TagMemo(node.name, purity, self.memo_size)
+
+        func = self._track(Function(node.name, parameters, node.body, node.returns, scope, memo))
         if node.name:
             scope.force_assign_var(node.name, func)
         else:
@@ -265,11 +717,98 @@ class Interpreter:
             if isinstance(node._else, IfStatement):
                 return self._eval_if_statement(node._else, scope)
 
-            else:
+            elif node._else is not None:
                 for node in node._else:
                     res = self._eval_node(node, scope)
 
-                return res
+            return res
+
+    def _eval_loop_statement(self, node: LoopStatement, scope: Scope):
+        target = self._eval_node(node.target, scope)
+        items, count = self._loop_iterations(node, target)
+
+        # a single scope is shared by every iteration, it's only cleared between them
+        # so variables declared in the body don't leak into the next iteration.
+        # unless the body declares tags, which keep the scope of the iteration they were declared in
+        loop_scope = Scope(parent=scope)
+        variables = loop_scope.variables
+        constants = loop_scope.constants
+        eval_node = self._eval_node
+        body = node.body
+        cancelled = self.cancelled
+
+        for index in range(count):
+            if cancelled is not None and cancelled.is_set():
+                raise Cancelled("Evaluation was cancelled")
+            if node.captures:
+                loop_scope = Scope(parent=scope)
+                variables = loop_scope.variables
+            else:
+                variables.clear()
+                constants.clear()
+            variables["index"] = Number(index)
+            if items is not None:
+                variables["item"] = next(items)
+
+            for statement in body:
+                eval_node(statement, loop_scope)
+
+        return Null()
+
+    @staticmethod
+    def _loop_iterations(node: LoopStatement, target: Literal):
+        if node.counted:
+            if not isinstance(target, Number) or not isinstance(target.value, int):
+                raise InterpreterException(f"Can only loop a whole number of times, not {target}")
+            items = None
+            count = target.value
+        else:
+            if not isinstance(target, Array):
+                raise InterpreterException(f"Can only loop over arrays, not {target}")
+            items = iter(target)
+            count = len(target)
+        return items, count
+
+    def _eval_send_statement(self, node: SendStatement, scope: Scope):
+        message = self._eval_node(node.message, scope)
+        destination = self._eval_node(node.destination, scope)
+        return self._send(message, destination)
+
+    def _eval_import_statement(self, node: ImportStatement, scope: Scope):
+        return self._import(self._eval_node(node.source, scope), scope)
+
+    def _import(self, source: Literal, scope: Scope):
+        if not isinstance(source, String):
+            raise InterpreterException(f"Can only import modules by their path or name, not {source}")
+
+        module = self.modules.load(source.value, self)
+        for name, value in module.exports.items():
+            # importing the same module twice is fine, clashing with something else isn't
+            if name in scope.constants and scope.constants[name] is value:
+                continue
+            scope.declare_var(name, value, constant=True)
+        return Null()
+
+    def _send(self, message: Literal, destination: Literal):
+        if not isinstance(destination, (String, Number)):
+            raise InterpreterException(
+                f"Can only send messages to strings or numbers, not {destination}"
+            )
+
+        self.output.send(destination.value, self._to_text(message))
+        return Null()
+
+    @staticmethod
+    def _to_text(value: Literal) -> str:
+        if isinstance(value, String):
+            return value.value
+        elif isinstance(value, Bool):
+            return "true" if value.value else "false"
+        elif isinstance(value, Number):
+            return str(value.value)
+        elif isinstance(value, Null) or value is None:
+            return "null"
+        return str(value)
 
     def _check_truthiness(self, node: Literal) -> bool:
         if isinstance(node, Null):
@@ -279,7 +818,7 @@ class Interpreter:
         elif isinstance(node, Number):
             return node.value != 0
         elif isinstance(node, String):
-            return node.value != ""
+            return node.length != 0
         elif isinstance(node, Array):
             return len(node.value) != 0
         elif isinstance(node, Dict):
@@ -294,6 +833,6 @@ class Interpreter:
 
     def _eval_array(self, node: ArrayExp, scope: Optional[Scope] = None):
         scope = scope or self.global_scope
-        _a = Array()
-        _a.value.extend([self._eval_node(element, scope) for element in node.elements])
-        return _a
+        return self._track(
+            Array.pack([self._eval_node(element, scope) for element in node.elements])
+        )
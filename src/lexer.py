@@ -14,6 +14,7 @@ KEYWORD_TT = {
     "return": KEYWORDS.RETURN,
     "if": KEYWORDS.IF,
     "else": KEYWORDS.ELSE,
+    "import": KEYWORDS.IMPORT,
 }
 """Keywords linked to their token type"""
 
@@ -53,6 +54,9 @@ class Lexer:
         self.source = source
         self.source_lines = source.splitlines()
         self.tokens = []
+        # token index of every `{` to the index of its matching `}`, so the parser can jump over blocks
+        self.braces: dict[int, int] = {}
+        self._open_braces: list[int] = []
         self.row = 1
         self.column = 1
         self.total = len(source)
@@ -99,8 +103,11 @@ class Lexer:
         elif c == "]":
             self._add_token(TokenType.RSQUARE, self.current, self.current)
         elif c == "{":
+            self._open_braces.append(len(self.tokens))
             self._add_token(TokenType.LCURLY, self.current, self.current)
         elif c == "}":
+            if self._open_braces:
+                self.braces[self._open_braces.pop()] = len(self.tokens)
             self._add_token(TokenType.RCURLY, self.current, self.current)
         elif c in A_OPERATOR_TT:
             if self._peek_next() == "=":
@@ -53,6 +53,7 @@ class KEYWORDS(SUBTYPE):
     RETURN = "return"
     IF = "if"
     ELSE = "else"
+    IMPORT = "import"
 
 
 class OPERATORS(SUBTYPE):
@@ -0,0 +1,215 @@
+# memoization of pure tags.
+# a tag is pure when its body can't have side effects: it never sends messages and never assigns to
+# variables it didn't declare itself. Whatever it calls has to be pure as well, which is only known
+# once the call happens, so that part is checked by the interpreter at call time.
+# the result of a call to a pure tag only depends on its arguments and the values of the outer
+# variables it reads, so those make up the cache key.
+
+from .parser_models import *
+from .builtin_models import *
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+import typing
+
+__all__ = ("Purity", "TagMemo", "analyze_purity", "freeze", "Unfreezable")
+
+FROZEN_BY_CONTENT = 64
+"""Arrays and Dicts up to this size are part of cache keys by value, bigger ones by identity"""
+
+
+class Unfreezable(Exception):
+    # raised for values that can't be part of a cache key
+    pass
+
+
+@dataclass(frozen=True)
+class Purity:
+    pure: bool
+    reason: str | None = None  # why the tag isn't pure
+    reads: tuple[str, ...] = ()  # every name the tag reads, the outer ones end up in the cache key
+
+
+class _Identity:
+    # hashes and compares by identity, keeping the object alive so its id can't be reused
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: typing.Any):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.obj is self.obj
+
+
+class _Names:
+    # what one scope of the tag (its body, a nested tag's body or a loop body) declares and assigns
+    __slots__ = ("declared", "assigned")
+
+    def __init__(self, *declared: str):
+        self.declared: set[str] = set(declared)
+        self.assigned: set[str] = set()
+
+    def outer(self) -> set[str]:
+        """Assignments that aren't to this scope's own names, they go to an enclosing one."""
+        return self.assigned - self.declared
+
+
+def _walk(node, reads: set[str], names: _Names) -> str | None:
+    """Collects the names read, declared and assigned in the node. Returns a reason if it's impure."""
+    if isinstance(node, list):
+        for child in node:
+            reason = _walk(child, reads, names)
+            if reason:
+                return reason
+        return None
+
+    if not isinstance(node, Node) or isinstance(node, Literal):
+        return None
+
+    if isinstance(node, SendStatement):
+        return "sends messages"
+
+    if isinstance(node, ImportStatement):
+        return "imports modules"
+
+    if isinstance(node, Identifier):
+        reads.add(node.name)
+        return None
+
+    if isinstance(node, FunctionArgument):
+        # arguments are bound in the called tag's scope, not this one
+        return _walk(node.value, reads, names)
+
+    if isinstance(node, VarDec):
+        names.declared.add(node.name)
+        return _walk(node.value, reads, names)
+
+    if isinstance(node, FunctionDec):
+        if node.name:
+            names.declared.add(node.name)
+        # the body runs in a scope of its own, whatever it assigns and doesn't declare itself
+        # is assigned in this one
+        return _scope([*node.body, node.returns], reads, names)
+
+    if isinstance(node, LoopStatement):
+        reason = _walk(node.target, reads, names)
+        return reason or _scope(node.body, reads, names, "item", "index")
+
+    if isinstance(node, AssignmentExp):
+        if not isinstance(node.assignee, Identifier):
+            return "assigns to a non identifier"
+        names.assigned.add(node.assignee.name)
+        return _walk(node.value, reads, names)
+
+    if isinstance(node, FunctionCallExp) and not isinstance(node.caller, Identifier):
+        return "calls something that isn't a named tag"
+
+    if isinstance(node, MemberExp):
+        # non computed properties are names, not variables
+        parts = [node.object, node.value] if node.computed else [node.object]
+        return _walk(parts, reads, names)
+
+    if isinstance(node, Property):
+        return _walk(node.value, reads, names)
+
+    for f in fields(node):
+        reason = _walk(getattr(node, f.name), reads, names)
+        if reason:
+            return reason
+    return None
+
+
+def _scope(nodes: list, reads: set[str], parent: _Names, *declared: str) -> str | None:
+    names = _Names(*declared)
+    reason = _walk(nodes, reads, names)
+    parent.assigned |= names.outer()
+    return reason
+
+
+def analyze_purity(body: list[Statement], returns: Expression) -> Purity:
+    reads, names = set[str](), _Names()
+    reason = _walk([*body, returns], reads, names)
+    if reason is None and names.outer():
+        reason = "assigns to outer variables: " + ", ".join(sorted(names.outer()))
+    if reason is not None:
+        return Purity(False, reason)
+    return Purity(True, None, tuple(sorted(reads)))
+
+
+def freeze(value: typing.Any) -> typing.Hashable:
+    """Turns a runtime value into something hashable that's equal for equal values."""
+    if value is None:
+        return None
+    if isinstance(value, String):
+        return (String, value.value)
+    if isinstance(value, (Number, Bool, Null)):
+        # the type is part of the key so 1, 1.0 and true don't share results
+        return (type(value), type(value.value), value.value)
+    if isinstance(value, NumericArray):
+        if len(value) > FROZEN_BY_CONTENT:
+            return (NumericArray, _Identity(value.value))
+        return (NumericArray, value.value.dtype.str, value.value.tobytes())
+    if isinstance(value, Array):
+        # the persistent collections never change, so the same object always means the same contents
+        if len(value) > FROZEN_BY_CONTENT:
+            return (Array, _Identity(value.value))
+        return (Array, tuple(freeze(v) for v in value))
+    if isinstance(value, Dict):
+        if len(value.value) > FROZEN_BY_CONTENT:
+            return (Dict, _Identity(value.value))
+        return (Dict, tuple((k, freeze(v)) for k, v in value.value.items()))
+    if isinstance(value, (Function, BuiltInFunction)):
+        return _Identity(value)
+    raise Unfreezable(value)
+
+
+class TagMemo:
+    # bounded LRU cache of the results of a single tag declaration
+    MISSING = object()
+
+    def __init__(self, name: str | None, purity: Purity, maxsize: int = 128):
+        self.name = name
+        self.purity = purity
+        self.maxsize = maxsize
+        self.enabled = True  # tags can opt out with the `impure` builtin
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache: OrderedDict[typing.Hashable, Literal] = OrderedDict()
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.purity.pure and self.maxsize > 0
+
+    def get(self, key: typing.Hashable) -> typing.Any:
+        result = self._cache.get(key, self.MISSING)
+        if result is self.MISSING:
+            self.misses += 1
+            return result
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: typing.Hashable, result: Literal | None):
+        self._cache[key] = result
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict[str, typing.Any]:
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "pure": self.purity.pure,
+            "reason": self.purity.reason,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+        }
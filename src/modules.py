@@ -0,0 +1,140 @@
+# modules, loaded with `import "helpers.txt"` (a file) or `import "helpers"` (a registered source,
+# like a stored tag).
+# a module is compiled and evaluated once per process, the cache is keyed by a hash of its source
+# so an edited file is loaded again while every other script keeps sharing the same module. The
+# names a module declares at its top level (except the ones starting with `_`) are its exports,
+# they're declared as constants in the importing scope, and once the module ran every name in its
+# own scope becomes a constant too, so not even its tags can change what other importers see.
+# the module's own top level only runs the first time it's imported, against an output channel of
+# its own: what it sends is kept on the module instead of going to whoever imported it first.
+# scripts are user written, so only files under `root` can be imported and a failing module never
+# has its error (which could quote the file's contents) passed on to the importer. There's no root
+# by default, files can only be imported once whoever runs the scripts picks a directory for them.
+
+from .builtin_models import *
+from .parser_models import Program
+from .output import MemorySink, OutputChannel
+from .exceptions import InterpreterException, LexerException, ParserException
+from .stdlib import BUILTINS
+from dataclasses import dataclass, field
+from pathlib import Path
+import hashlib
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    from .interpreter import Interpreter
+
+__all__ = ("Module", "ModuleCache", "MODULES")
+
+
+@dataclass
+class Module:
+    name: str
+    digest: str  # sha256 of the source
+    program: Program = field(repr=False)
+    scope: Scope = field(repr=False)  # the scope the module ran in
+    messages: list = field(default_factory=list, repr=False)  # (destination, content) it sent
+
+    @property
+    def exports(self) -> dict[str, typing.Any]:
+        names = {**self.scope.variables, **self.scope.constants}
+        return {name: value for name, value in names.items() if not name.startswith("_")}
+
+
+class ModuleCache:
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        scope_factory: typing.Optional[typing.Callable[[], Scope]] = None,
+    ):
+        # where module paths are looked up, nothing outside it can be imported. None only allows
+        # registered modules
+        self.root = None if root is None else Path(root)
+        # the scope modules run under, the stdlib builtins by default
+        self.scope_factory = scope_factory or _builtin_scope
+        self.hits = 0
+        self.misses = 0
+        self._sources: dict[str, str] = {}  # registered modules, by name
+        self._modules: dict[str, Module] = {}  # by digest
+        self._loading: set[str] = set()  # digests being evaluated, to catch circular imports
+        self._lock = threading.RLock()
+
+    def register(self, name: str, source: str):
+        """Makes a source importable by name, registered names are looked up before files."""
+        self._sources[name] = source
+
+    def resolve(self, spec: str) -> tuple[str, str]:
+        """The name and source of the module an import refers to."""
+        if spec in self._sources:
+            return spec, self._sources[spec]
+
+        if self.root is None:
+            raise InterpreterException(f"Module {spec} not found, importing files isn't enabled")
+        root = Path(self.root).resolve()
+        path = (root / spec).resolve()
+        # absolute paths, `..` and symlinks all end up outside the root
+        if not path.is_relative_to(root) or not path.is_file():
+            raise InterpreterException(f"Module {spec} not found")
+        return str(path), path.read_text()
+
+    def load(self, spec: str, interpreter: "Interpreter") -> Module:
+        name, source = self.resolve(spec)
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        with self._lock:
+            module = self._modules.get(digest)
+            if module is not None:
+                self.hits += 1
+                return module
+
+            if digest in self._loading:
+                raise InterpreterException(f"Module {spec} imports itself")
+
+            self.misses += 1
+            self._loading.add(digest)
+            try:
+                module = self._evaluate(name, digest, source, interpreter)
+            except (InterpreterException, LexerException, ParserException) as e:
+                # the cause stays chained for whoever runs the bot, the script only learns it failed
+                raise InterpreterException(f"Error while importing {spec}") from e
+            finally:
+                self._loading.discard(digest)
+            self._modules[digest] = module
+            return module
+
+    def _evaluate(self, name: str, digest: str, source: str, importer: "Interpreter") -> Module:
+        from .interpreter import Interpreter
+
+        program, _, _ = Interpreter.compile(source)
+        scope = Scope(parent=self.scope_factory())
+        sink = MemorySink()
+        interpreter = Interpreter(
+            source,
+            scope,
+            OutputChannel(sink, flush_interval=None),
+            program=program,
+            stackless=importer._stackless is not None,
+            memory_limit=importer.memory_limit,
+            max_int_bits=importer.max_int_bits,
+            modules=self,
+        )
+        for _ in interpreter.evaluate():
+            pass
+        scope.constants.update(scope.variables)
+        scope.variables.clear()
+        return Module(name, digest, program, scope, sink.messages)
+
+    def clear(self):
+        with self._lock:
+            self._modules.clear()
+
+
+def _builtin_scope() -> Scope:
+    scope = Scope()
+    for name, builtin in BUILTINS.items():
+        scope.declare_var(name, builtin)
+    return scope
+
+
+MODULES = ModuleCache()
+"""The process wide module cache every interpreter uses by default"""
@@ -0,0 +1,118 @@
+# output channels used by the `send ... to` statement.
+# every message sent to a destination is buffered and coalesced with the others sent to the same
+# destination, so a script that sends hundreds of lines turns into a handful of outbound messages
+# (which matters a lot when every message is a rate limited discord API request).
+
+from pathlib import Path
+import threading
+import time
+import typing
+
+__all__ = ("Sink", "StdoutSink", "MemorySink", "FileSink", "OutputChannel")
+
+Destination = str | int | float
+
+
+class Sink:
+    # where the coalesced messages actually end up.
+    def deliver(self, destination: Destination, content: str):
+        raise NotImplementedError()
+
+
+class StdoutSink(Sink):
+    def deliver(self, destination: Destination, content: str):
+        print(f"[{destination}]\n{content}")
+
+
+class MemorySink(Sink):
+    # keeps every delivered message in memory, mostly useful for tests.
+    def __init__(self):
+        self.messages: list[tuple[Destination, str]] = []
+
+    def deliver(self, destination: Destination, content: str):
+        self.messages.append((destination, content))
+
+
+class FileSink(Sink):
+    # appends every delivered message to a file, one block per message.
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def deliver(self, destination: Destination, content: str):
+        with self.path.open("a") as file:
+            file.write(f"[{destination}]\n{content}\n")
+
+
+class OutputChannel:
+    def __init__(
+        self,
+        sink: typing.Optional[Sink] = None,
+        max_message_size: int = 2000,
+        flush_interval: typing.Optional[float] = 1.0,
+        separator: str = "\n",
+    ):
+        self.sink = sink or StdoutSink()
+        self.max_message_size = max_message_size
+        self.flush_interval = flush_interval
+        self.separator = separator
+        self.messages_sent = 0
+
+        self._buffers: dict[Destination, list[str]] = {}
+        self._sizes: dict[Destination, int] = {}
+        self._oldest_pending: typing.Optional[float] = None
+        # flushes whatever is still pending once the interval is up, even if the script is busy
+        # computing and never sends anything again. The lock keeps it from flushing halfway
+        # through a send.
+        self._timer: typing.Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    def send(self, destination: Destination, content: str):
+        with self._lock:
+            # messages longer than the limit are split, everything else is coalesced
+            for start in range(0, max(len(content), 1), self.max_message_size):
+                self._buffer(destination, content[start : start + self.max_message_size])
+
+            now = time.monotonic()
+            if self._oldest_pending is None:
+                self._oldest_pending = now
+
+            if self.flush_interval is not None and now - self._oldest_pending >= self.flush_interval:
+                self.flush()
+            elif self._buffers and self._timer is None and self.flush_interval:
+                self._timer = threading.Timer(self.flush_interval, self._flush_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_pending(self):
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return  # flushed (and maybe rearmed) while this one was waiting for the lock
+            self._timer = None
+            self.flush()
+
+    def _buffer(self, destination: Destination, piece: str):
+        buffer = self._buffers.setdefault(destination, [])
+        extra = len(piece) + (len(self.separator) if buffer else 0)
+        if buffer and self._sizes[destination] + extra > self.max_message_size:
+            self.flush(destination)
+            return self._buffer(destination, piece)
+
+        buffer.append(piece)
+        self._sizes[destination] = self._sizes.get(destination, 0) + extra
+
+    def flush(self, destination: typing.Optional[Destination] = None):
+        """Delivers everything buffered for the given destination, or for all of them if none is given."""
+        with self._lock:
+            destinations = list(self._buffers) if destination is None else [destination]
+            for dest in destinations:
+                buffer = self._buffers.pop(dest, None)
+                self._sizes.pop(dest, None)
+                if buffer:
+                    self.sink.deliver(dest, self.separator.join(buffer))
+                    self.messages_sent += 1
+
+            if not self._buffers:
+                self._oldest_pending = None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
@@ -9,10 +9,13 @@ from typing import List, Optional
 
 
 class Parser:
-    def __init__(self, tokens: List[Token]) -> None:
+    def __init__(self, tokens: List[Token], braces: Optional[dict[int, int]] = None) -> None:
         self.tokens = tokens
+        self.braces = braces  # matching braces as recorded by the lexer, found on first use otherwise
         self.index = 0
         self.ast = []
+        self.trivia: dict[int, Token] = {}  # comments and newlines between statements
+        self.tags = 0  # tag declarations parsed so far, loops use it to tell whether their body has any
 
     def match(self, type: TokenType, subtype: Optional[SUBTYPE] = None) -> bool:
         to_check = self.lookahead()
@@ -55,20 +58,57 @@ class Parser:
                 continue
             self.ast.append(result)
 
-        prog = Program(self.ast)
+        prog = Program(self.ast, self.trivia)
         return prog
 
-    def statement(self) -> Node:
+    def matching_brace(self, index: int) -> Optional[int]:
+        """Index of the `}` closing the `{` at the given token index, None if it's never closed."""
+        if self.braces is None:
+            self.braces, stack = {}, []
+            for i, token in enumerate(self.tokens):
+                if token.type is TokenType.LCURLY:
+                    stack.append(i)
+                elif token.type is TokenType.RCURLY and stack:
+                    self.braces[stack.pop()] = i
+        return self.braces.get(index)
+
+    def skip_trivia(self) -> bool:
+        """Moves a comment or newline at the current position to the trivia table.
+        Returns whether there was one."""
+        token = self.peek()
+        if token.type is TokenType.COMMENT or token.type is TokenType.NEWLINE:
+            self.trivia[token.start_position] = token
+            self.index += 1
+            return True
+        return False
+
+    def statement(self) -> Optional[Node]:
+        # None for comments and blank lines, they don't make it into the AST
+        if self.skip_trivia():
+            return None
+        line = self.peek().line
+        return self.at_line(self._statement(), line)
+
+    @staticmethod
+    def at_line(node: Node, line: int) -> Node:
+        # literals are shared runtime values, only the other nodes get a line
+        if isinstance(node, Node) and not isinstance(node, Literal) and node.line is None:
+            node.line = line
+        return node
+
+    def _statement(self) -> Node:
         if self.peek_match(TokenType.KEYWORD, KEYWORDS.LET):
             return self.let_stmt()
         elif self.peek_match(TokenType.KEYWORD, KEYWORDS.CONST):
             return self.const_stmt()
         elif self.peek_match(TokenType.KEYWORD, KEYWORDS.IF):
             return self.if_stmt()
-        # elif self.match(TokenType.KEYWORD, KEYWORDS.LOOP):
-        #     return self.loop_stmt()
-        # elif self.match(TokenType.KEYWORD, KEYWORDS.SEND):
-        #     return self.send_stmt()
+        elif self.peek_match(TokenType.KEYWORD, KEYWORDS.LOOP):
+            return self.loop_stmt()
+        elif self.peek_match(TokenType.KEYWORD, KEYWORDS.SEND):
+            return self.send_stmt()
+        elif self.peek_match(TokenType.KEYWORD, KEYWORDS.IMPORT):
+            return self.import_stmt()
         # else:
         return self.expr_stmt()
 
@@ -196,6 +236,7 @@ class Parser:
         if not self.peek_match(TokenType.LCURLY):
             return self.parse_function_def_expr()
 
+        line = self.peek().line
         self.consume()  # consume the {
 
         if (
@@ -242,7 +283,7 @@ class Parser:
 
         self.consume()
 
-        return FunctionCallExp(caller, arguments)
+        return self.at_line(FunctionCallExp(caller, arguments), line)
 
     def parse_function_def_expr(self):
         if not self.peek_match(TokenType.KEYWORD, KEYWORDS.TAG):
@@ -258,6 +299,7 @@ class Parser:
             self.consume()
 
         if self.peek_match(TokenType.LCURLY):
+            opening = self.index
             self.consume()
             body = list[Statement]()
             return_found = False  # to keep track of the first return statement.
@@ -266,8 +308,7 @@ class Parser:
                     self.consume()
                     break
 
-                elif self.peek_match(TokenType.NEWLINE):
-                    self.consume()
+                elif self.skip_trivia():
                     continue
 
                 elif return_found:
@@ -278,6 +319,10 @@ class Parser:
                 elif self.peek_match(TokenType.KEYWORD, KEYWORDS.RETURN):
                     return_val = self.parse_return_stmt()
                     return_found = True
+                    # everything after the return is dead, jump straight to the closing brace
+                    closing = self.matching_brace(opening)
+                    if closing is not None and closing >= self.index:
+                        self.index = closing
                     continue
 
                 val = self.statement()
@@ -289,16 +334,18 @@ class Parser:
 
                 body.append(val)
 
+        self.tags += 1
         return FunctionDec(name, body, return_val)
 
     def parse_return_stmt(self):
         # I want to allow a single or multiple return values with a single return keyword.
         # If there is a single return value, it will be returned as is.
         # otherwise, an array will be returned with all the values
+        line = self.peek().line
         self.consume()
         vals = list[Expression]()
         while True:
-            vals.append(self.expr_stmt())
+            vals.append(self.at_line(self.expr_stmt(), line))
             if not self.peek_match(TokenType.COMMA):
                 break
 
@@ -307,7 +354,7 @@ class Parser:
         if len(vals) == 1:
             return vals[0]
 
-        return ArrayExp(vals)
+        return self.at_line(ArrayExp(vals), line)
 
     def parse_object_expr(self):
         properties = list[Property]()
@@ -447,18 +494,19 @@ class Parser:
                 self.consume()
                 break
 
-            elif self.peek_match(TokenType.NEWLINE):
-                self.consume()
+            elif self.skip_trivia():
                 continue
 
-            body.append(self.expr_stmt())
+            line = self.peek().line
+            body.append(self.at_line(self.expr_stmt(), line))
 
         if self.peek_match(TokenType.KEYWORD, KEYWORDS.ELSE):
 
             self.consume()
 
             if self.peek_match(TokenType.KEYWORD, KEYWORDS.IF):
-                return IfStatement(cond, body, self.if_stmt())
+                line = self.peek().line
+                return IfStatement(cond, body, self.at_line(self.if_stmt(), line))
 
             else:
                 else_body = list[Statement]()
@@ -475,12 +523,59 @@ class Parser:
                         self.consume()
                         break
 
-                    elif self.peek_match(TokenType.NEWLINE):
-                        self.consume()
+                    elif self.skip_trivia():
                         continue
 
-                    else_body.append(self.expr_stmt())
+                    line = self.peek().line
+                    else_body.append(self.at_line(self.expr_stmt(), line))
 
                 return IfStatement(cond, body, else_body)
 
         return IfStatement(cond, body, None)
+
+    def loop_stmt(self):
+        self.consume()  # consume the "loop" keyword
+
+        target = self.expr_stmt()
+
+        counted = self.peek_match(TokenType.KEYWORD, KEYWORDS.TIMES)
+        if counted:
+            self.consume()  # consume the "times" keyword
+
+        if not self.peek_match(TokenType.LCURLY):
+            raise ParserException(f"Expected '{{' after loop target, found {self.peek()}")
+
+        self.consume()  # consume the '{'
+
+        body = list[Statement]()
+        tags = self.tags
+
+        while True:
+            if self.peek_match(TokenType.RCURLY):
+                self.consume()
+                break
+
+            elif self.skip_trivia():
+                continue
+
+            body.append(self.statement())
+
+        return LoopStatement(target, body, counted, self.tags != tags)
+
+    def send_stmt(self):
+        self.consume()  # consume the "send" keyword
+
+        message = self.expr_stmt()
+
+        if not self.peek_match(TokenType.KEYWORD, KEYWORDS.TO):
+            raise ParserException(f"Expected 'to' after message to send, found {self.peek()}")
+
+        self.consume()  # consume the "to" keyword
+
+        destination = self.expr_stmt()
+
+        return SendStatement(message, destination)
+
+    def import_stmt(self):
+        self.consume()  # consume the "import" keyword
+        return ImportStatement(self.expr_stmt())
@@ -1,7 +1,7 @@
 # file to define models that will be used in the AST of the language
 
 from .lexer_models import *
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import typing
 
 __all__ = (
@@ -9,6 +9,9 @@ __all__ = (
     "Literal",
     "Statement",
     "IfStatement",
+    "LoopStatement",
+    "SendStatement",
+    "ImportStatement",
     "FunctionArgument",
     "Expression",
     "BinaryExp",
@@ -28,7 +31,12 @@ __all__ = (
 
 
 class Node:
-    pass  # base class for all nodes in the AST
+    # base class for all nodes in the AST
+    # the source line a statement starts on, set by the parser. It's a plain class attribute and not
+    # a dataclass field so it doesn't show up in reprs or comparisons.
+    line: int | None = None
+    # set by the checker on declarations and assignments it proved can't fail its checks
+    checked: bool = False
 
 
 class Statement(Node):
@@ -46,6 +54,30 @@ class IfStatement(Statement):
     _else: list[Statement] | typing.Optional["IfStatement"]
 
 
+@dataclass
+class LoopStatement(Statement):
+    # loop 10 times { ... } or loop array { ... }
+    target: Expression  # the number of times to loop or the array to loop over
+    body: list[Statement]
+    counted: bool  # whether this is a `times` loop
+    # whether a tag is declared anywhere in the body. Tags capture the scope they're declared in,
+    # so every iteration needs a scope of its own instead of sharing one
+    captures: bool = False
+
+
+@dataclass
+class SendStatement(Statement):
+    # send message to destination
+    message: Expression
+    destination: Expression
+
+
+@dataclass
+class ImportStatement(Statement):
+    # import "helpers.txt"
+    source: Expression  # the module's path or registered name
+
+
 @dataclass
 class Literal(Expression):
     value: str | bool | float | int | None | dict | list = None
@@ -121,6 +153,9 @@ class FunctionArgument(VarDec):
 @dataclass
 class Program(Node):
     body: list[Statement | Token | Expression]
+    # comments and blank lines between statements, by source position. They aren't part of the body
+    # so the interpreter never sees them, they're only kept around for tooling.
+    trivia: dict[int, Token] = field(default_factory=dict, repr=False, compare=False)
 
 
 @dataclass
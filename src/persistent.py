@@ -0,0 +1,406 @@
+# persistent (immutable) collections backing Dict and Array.
+# "modifying" one returns a new collection that shares almost all of its structure with the old one,
+# so copying is O(1) and updates only copy the O(log32 n) nodes on the path to the changed entry.
+#
+# PersistentMap is a hash array mapped trie (HAMT) and PersistentVector is a 32-way trie with a tail,
+# both modeled after clojure's collections.
+
+from collections.abc import Mapping, Sequence
+from itertools import chain
+import typing
+
+__all__ = ("PersistentMap", "PersistentVector")
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_MASK = (1 << 64) - 1
+
+
+def _hash(key: typing.Hashable) -> int:
+    return hash(key) & _HASH_MASK
+
+
+class _Leaf:
+    # `order` remembers when the key was first added, so iteration keeps insertion order like dicts do
+    __slots__ = ("hash", "key", "value", "order")
+
+    def __init__(self, hash: int, key: typing.Any, value: typing.Any, order: int):
+        self.hash = hash
+        self.key = key
+        self.value = value
+        self.order = order
+
+
+class _BitmapNode:
+    # `children` only holds entries for the bits set in `bitmap`, in order.
+    # nodes owned by a bulk update (see `PersistentMap._with_items`) can be modified in place,
+    # everything else is copied.
+    __slots__ = ("bitmap", "children", "owner")
+
+    def __init__(self, bitmap: int, children: list, owner: typing.Optional[object] = None):
+        self.bitmap = bitmap
+        self.children = children
+        self.owner = owner
+
+
+class _CollisionNode:
+    # keys whose full hashes are equal
+    __slots__ = ("hash", "leaves")
+
+    def __init__(self, hash: int, leaves: list[_Leaf]):
+        self.hash = hash
+        self.leaves = leaves
+
+
+_EMPTY_NODE = _BitmapNode(0, [])
+
+
+def _merge_leaves(shift: int, first: _Leaf, second: _Leaf, owner) -> _BitmapNode | _CollisionNode:
+    if first.hash == second.hash:
+        return _CollisionNode(first.hash, [first, second])
+
+    first_bit = (first.hash >> shift) & _MASK
+    second_bit = (second.hash >> shift) & _MASK
+    if first_bit == second_bit:
+        return _BitmapNode(
+            1 << first_bit, [_merge_leaves(shift + _BITS, first, second, owner)], owner
+        )
+
+    children = [first, second] if first_bit < second_bit else [second, first]
+    return _BitmapNode((1 << first_bit) | (1 << second_bit), children, owner)
+
+
+def _assoc(node, shift: int, leaf: _Leaf, owner) -> tuple[typing.Any, bool]:
+    """Returns the node with the leaf added or replaced and whether the map grew."""
+    if isinstance(node, _CollisionNode):
+        if node.hash == leaf.hash:
+            leaves = node.leaves[:]
+            for i, existing in enumerate(leaves):
+                if existing.key == leaf.key:
+                    leaf.order = existing.order
+                    leaves[i] = leaf
+                    return _CollisionNode(node.hash, leaves), False
+            return _CollisionNode(node.hash, leaves + [leaf]), True
+
+        # the new key only shares part of the hash, push the collision node one level down
+        wrapper = _BitmapNode(1 << ((node.hash >> shift) & _MASK), [node], owner)
+        return _assoc(wrapper, shift, leaf, owner)
+
+    bit = 1 << ((leaf.hash >> shift) & _MASK)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    editable = owner is not None and node.owner is owner
+
+    if not node.bitmap & bit:
+        if editable:
+            node.children.insert(index, leaf)
+            node.bitmap |= bit
+            return node, True
+        children = node.children[:index] + [leaf] + node.children[index:]
+        return _BitmapNode(node.bitmap | bit, children, owner), True
+
+    child = node.children[index]
+    if isinstance(child, _Leaf):
+        if child.key == leaf.key:
+            if child.value is leaf.value:
+                return node, False
+            leaf.order = child.order
+            new_child, added = leaf, False
+        else:
+            new_child, added = _merge_leaves(shift + _BITS, child, leaf, owner), True
+    else:
+        new_child, added = _assoc(child, shift + _BITS, leaf, owner)
+        if new_child is child:
+            return node, added
+
+    if editable:
+        node.children[index] = new_child
+        return node, added
+    children = node.children[:]
+    children[index] = new_child
+    return _BitmapNode(node.bitmap, children, owner), added
+
+
+def _without(node, shift: int, hash: int, key: typing.Any):
+    """Returns the node without the key, a leaf if only one is left in it, or None if it's empty."""
+    if isinstance(node, _CollisionNode):
+        leaves = [l for l in node.leaves if l.key != key]
+        if len(leaves) == len(node.leaves):
+            return node
+        return leaves[0] if len(leaves) == 1 else _CollisionNode(node.hash, leaves)
+
+    bit = 1 << ((hash >> shift) & _MASK)
+    if not node.bitmap & bit:
+        return node
+
+    index = (node.bitmap & (bit - 1)).bit_count()
+    child = node.children[index]
+    if isinstance(child, _Leaf):
+        if child.key != key:
+            return node
+        new_child = None
+    else:
+        new_child = _without(child, shift + _BITS, hash, key)
+        if new_child is child:
+            return node
+
+    if new_child is None:
+        children = node.children[:index] + node.children[index + 1 :]
+        if not children:
+            return None
+        if len(children) == 1 and isinstance(children[0], _Leaf) and shift:
+            return children[0]
+        return _BitmapNode(node.bitmap & ~bit, children)
+
+    if isinstance(new_child, _Leaf) and len(node.children) == 1 and shift:
+        return new_child
+
+    children = node.children[:]
+    children[index] = new_child
+    return _BitmapNode(node.bitmap, children)
+
+
+def _collect_leaves(node, leaves: list[_Leaf]) -> list[_Leaf]:
+    if isinstance(node, _CollisionNode):
+        leaves.extend(node.leaves)
+        return leaves
+
+    for child in node.children:
+        if isinstance(child, _Leaf):
+            leaves.append(child)
+        else:
+            _collect_leaves(child, leaves)
+    return leaves
+
+
+def _ordered_leaves(node) -> list[_Leaf]:
+    leaves = _collect_leaves(node, [])
+    leaves.sort(key=lambda leaf: leaf.order)
+    return leaves
+
+
+class PersistentMap(Mapping):
+    __slots__ = ("_root", "_size", "_next_order")
+
+    def __init__(self, items: typing.Optional[Mapping | typing.Iterable[tuple]] = None):
+        self._root = _EMPTY_NODE
+        self._size = 0
+        self._next_order = 0
+        if items:
+            self._root, self._size, self._next_order = self._with_items(items)
+
+    @classmethod
+    def _make(cls, root, size: int, next_order: int) -> "PersistentMap":
+        result = cls.__new__(cls)
+        result._root = root
+        result._size = size
+        result._next_order = next_order
+        return result
+
+    def _with_items(self, items: Mapping | typing.Iterable[tuple]):
+        # every node created while adding the items belongs to this `owner`, so adding the next item
+        # can modify them in place instead of copying the path again.
+        owner = object()
+        root, size, order = self._root, self._size, self._next_order
+        pairs = items.items() if isinstance(items, Mapping) else items
+        for key, value in pairs:
+            root, added = _assoc(root, 0, _Leaf(_hash(key), key, value, order), owner)
+            size += added
+            order += 1
+        return root, size, order
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        hash = _hash(key)
+        node = self._root
+        shift = 0
+        while True:
+            if isinstance(node, _CollisionNode):
+                for leaf in node.leaves:
+                    if leaf.key == key:
+                        return leaf.value
+                raise KeyError(key)
+
+            bit = 1 << ((hash >> shift) & _MASK)
+            if not node.bitmap & bit:
+                raise KeyError(key)
+
+            node = node.children[(node.bitmap & (bit - 1)).bit_count()]
+            if isinstance(node, _Leaf):
+                if node.key == key:
+                    return node.value
+                raise KeyError(key)
+
+            shift += _BITS
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> typing.Iterator:
+        return (leaf.key for leaf in _ordered_leaves(self._root))
+
+    def items(self):
+        return [(leaf.key, leaf.value) for leaf in _ordered_leaves(self._root)]
+
+    def values(self):
+        return [leaf.value for leaf in _ordered_leaves(self._root)]
+
+    def set(self, key: typing.Any, value: typing.Any) -> "PersistentMap":
+        leaf = _Leaf(_hash(key), key, value, self._next_order)
+        root, added = _assoc(self._root, 0, leaf, None)
+        if root is self._root:
+            return self
+        return self._make(root, self._size + added, self._next_order + 1)
+
+    def delete(self, key: typing.Any) -> "PersistentMap":
+        root = _without(self._root, 0, _hash(key), key)
+        if root is self._root:
+            return self
+        if root is None:
+            return self._make(_EMPTY_NODE, 0, self._next_order)
+        if isinstance(root, _Leaf):
+            root = _BitmapNode(1 << (root.hash & _MASK), [root])
+        return self._make(root, self._size - 1, self._next_order)
+
+    def update(self, items: Mapping | typing.Iterable[tuple]) -> "PersistentMap":
+        return self._make(*self._with_items(items))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    __hash__ = None
+
+
+def _new_path(level: int, node: list) -> list:
+    while level > 0:
+        node = [node]
+        level -= _BITS
+    return node
+
+
+class PersistentVector(Sequence):
+    __slots__ = ("_count", "_shift", "_root", "_tail")
+
+    def __init__(self, items: typing.Iterable = ()):
+        items = list(items)
+        count = len(items)
+        # the tail always holds the last 1-32 elements so appending is cheap
+        tail_offset = ((count - 1) >> _BITS) << _BITS if count else 0
+
+        level = [items[i : i + _WIDTH] for i in range(0, tail_offset, _WIDTH)]
+        shift = _BITS
+        while len(level) > _WIDTH:
+            level = [level[i : i + _WIDTH] for i in range(0, len(level), _WIDTH)]
+            shift += _BITS
+
+        self._count = count
+        self._shift = shift
+        self._root = level
+        self._tail = items[tail_offset:]
+
+    @classmethod
+    def _make(cls, count: int, shift: int, root: list, tail: list) -> "PersistentVector":
+        result = cls.__new__(cls)
+        result._count = count
+        result._shift = shift
+        result._root = root
+        result._tail = tail
+        return result
+
+    def _tail_offset(self) -> int:
+        return self._count - len(self._tail)
+
+    def _leaf_for(self, index: int) -> list:
+        if index >= self._tail_offset():
+            return self._tail
+
+        node = self._root
+        level = self._shift
+        while level > 0:
+            node = node[(index >> level) & _MASK]
+            level -= _BITS
+        return node
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("PersistentVector index out of range")
+        return index
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return PersistentVector([self[i] for i in range(*index.indices(self._count))])
+
+        index = self._check_index(index)
+        return self._leaf_for(index)[index & _MASK]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> typing.Iterator:
+        nodes = self._root
+        level = self._shift
+        while level > 0:
+            nodes = list(chain.from_iterable(nodes)) if level > _BITS else nodes
+            level -= _BITS
+        return chain(chain.from_iterable(nodes), self._tail)
+
+    def append(self, value: typing.Any) -> "PersistentVector":
+        if len(self._tail) < _WIDTH:
+            return self._make(self._count + 1, self._shift, self._root, self._tail + [value])
+
+        # the tail is full, push it into the tree and start a new one
+        if (self._count >> _BITS) > (1 << self._shift):
+            root = [self._root, _new_path(self._shift, self._tail)]
+            shift = self._shift + _BITS
+        else:
+            root = self._push_tail(self._shift, self._root)
+            shift = self._shift
+
+        return self._make(self._count + 1, shift, root, [value])
+
+    def _push_tail(self, level: int, parent: list) -> list:
+        index = ((self._count - 1) >> level) & _MASK
+        node = parent[:]
+        if level == _BITS:
+            child = self._tail
+        elif index < len(parent):
+            child = self._push_tail(level - _BITS, parent[index])
+        else:
+            child = _new_path(level - _BITS, self._tail)
+
+        if index < len(node):
+            node[index] = child
+        else:
+            node.append(child)
+        return node
+
+    def set(self, index: int, value: typing.Any) -> "PersistentVector":
+        index = self._check_index(index)
+        if index >= self._tail_offset():
+            tail = self._tail[:]
+            tail[index & _MASK] = value
+            return self._make(self._count, self._shift, self._root, tail)
+
+        return self._make(
+            self._count, self._shift, self._set_in(self._shift, self._root, index, value), self._tail
+        )
+
+    def _set_in(self, level: int, node: list, index: int, value: typing.Any) -> list:
+        node = node[:]
+        if level == 0:
+            node[index & _MASK] = value
+        else:
+            child_index = (index >> level) & _MASK
+            node[child_index] = self._set_in(level - _BITS, node[child_index], index, value)
+        return node
+
+    def __eq__(self, other):
+        if isinstance(other, (PersistentVector, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,155 @@
+# sampling profiler for TBD scripts.
+# a background thread periodically looks at the python stack of the thread running the interpreter
+# and maps it back to TBD tags and source lines, so the interpreter itself does nothing extra while
+# it's being profiled. Samples are written in the collapsed stack format flamegraph tools read:
+#   <script>:12;count:5;count:7 42
+# every frame is a tag (or builtin) with the line it was executing, the number is how many samples
+# ended in that stack.
+
+from .interpreter import Interpreter
+from .stackless import StacklessEvaluator
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+import inspect
+import sys
+import threading
+import typing
+
+__all__ = ("SamplingProfiler",)
+
+DEFAULT_INTERVAL = 0.005
+"""Seconds between samples, python only switches threads every few milliseconds anyways"""
+
+_NODE, _CALL, _TAG, _BUILTIN, _WORK_STACK = range(5)
+
+_KINDS: dict[CodeType, int] = {
+    Interpreter._eval_node.__code__: _NODE,
+    Interpreter._eval_function_call.__code__: _CALL,
+    Interpreter._call_tag.__code__: _TAG,
+    Interpreter._call_builtin.__code__: _BUILTIN,
+    StacklessEvaluator._run.__code__: _WORK_STACK,
+    StacklessEvaluator._function_call.__code__: _CALL,
+    StacklessEvaluator._tag.__code__: _TAG,
+}
+"""What each interpreter function tells us about the TBD stack"""
+
+_HANDLERS = frozenset(
+    function.__code__
+    for function in vars(StacklessEvaluator).values()
+    if inspect.isgeneratorfunction(function)
+)
+"""Generators of the stackless evaluator, they all have the node they're evaluating in `node`"""
+
+
+class _StackBuilder:
+    # turns the interpreter's python frames (outermost first) into TBD frames
+    def __init__(self, root: str):
+        self.frames: list[str] = []
+        self.name = root
+        self.line: int | None = None
+        self.callee: str | None = None
+
+    def visit(self, code: CodeType, local: dict[str, typing.Any]):
+        kind = _KINDS.get(code, _NODE if code in _HANDLERS else None)
+        if kind is _NODE or kind is _CALL:
+            node = local.get("node")
+            if getattr(node, "line", None) is not None:
+                self.line = node.line
+            if kind is _CALL:
+                self.callee = getattr(node.caller, "name", None)
+
+        elif kind is _TAG:
+            function = local.get("function")
+            self.push(getattr(function, "name", None) or self.callee or "<anonymous>")
+
+        elif kind is _BUILTIN:
+            self.push(self.callee or "<builtin>")
+
+        elif kind is _WORK_STACK:
+            for generator in list(local.get("stack", ())):
+                # calls to tags are delegated to with `yield from`
+                while generator is not None:
+                    if generator.gi_frame is None:
+                        break
+                    local = generator.gi_frame.f_locals
+                    self.visit(generator.gi_code, local)
+                    # handlers wrapped for hooks are driven by _no_tail_calls without `yield from`
+                    generator = generator.gi_yieldfrom or local.get("generator")
+
+    def push(self, name: str):
+        self.frames.append(self.frame())
+        self.name, self.line, self.callee = name, None, None
+
+    def frame(self) -> str:
+        return self.name if self.line is None else f"{self.name}:{self.line}"
+
+    def build(self) -> tuple[str, ...]:
+        return (*self.frames, self.frame())
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL, root: str = "<script>"):
+        self.interval = interval
+        self.root = root
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target: typing.Optional[int] = None
+
+    def start(self, thread_id: typing.Optional[int] = None):
+        """Starts sampling the given thread, the current one by default."""
+        if self._thread is not None:
+            raise RuntimeError("The profiler is already running")
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="tbd-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = self._tbd_stack(frame)
+            if stack is not None:
+                self.samples[stack] += 1
+
+    def _tbd_stack(self, frame: FrameType) -> tuple[str, ...] | None:
+        frames = list[FrameType]()
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+
+        builder = _StackBuilder(self.root)
+        interpreting = False
+        for frame in reversed(frames):
+            # the generators of the stackless evaluator are visited through its work stack
+            if frame.f_code in _KINDS and frame.f_code not in _HANDLERS:
+                interpreting = True
+                builder.visit(frame.f_code, frame.f_locals)
+
+        # samples taken outside of the interpreter (lexing, parsing, printing results) are dropped
+        return builder.build() if interpreting else None
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+    def write(self, path: str | Path):
+        Path(path).write_text(self.collapsed())
@@ -0,0 +1,86 @@
+# interactive sessions, used by the REPL (and anything else that evaluates chunks of input one
+# after the other, like an "eval" command).
+# every chunk runs in the same global scope, so variables and tags declared by one are there for
+# the next. Only the new chunk is compiled, and compiled chunks are cached so entering the exact
+# same input again (re-running a definition, calling the same tag) skips the lexer and parser.
+
+from .builtin_models import Scope
+from .parser_models import Literal, Program
+from .interpreter import Interpreter
+from .output import OutputChannel
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import time
+import typing
+
+__all__ = ("Session", "ChunkResult")
+
+DEFAULT_CACHE_SIZE = 64
+"""Compiled chunks a session keeps around"""
+
+
+@dataclass
+class ChunkResult:
+    results: list[Literal] = field(default_factory=list)
+    lex_time: float = 0.0  # seconds, 0 when the chunk was already compiled
+    parse_time: float = 0.0
+    eval_time: float = 0.0
+    cached: bool = False  # whether the compiled chunk came from the cache
+
+    @property
+    def total_time(self) -> float:
+        return self.lex_time + self.parse_time + self.eval_time
+
+    def timing(self) -> str:
+        compiled = "cached" if self.cached else (
+            f"lex {self.lex_time * 1000:.2f}ms, parse {self.parse_time * 1000:.2f}ms"
+        )
+        return f"{compiled}, eval {self.eval_time * 1000:.2f}ms"
+
+
+class Session:
+    def __init__(
+        self,
+        scope: typing.Optional[Scope] = None,
+        output: typing.Optional[OutputChannel] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        **options,
+    ):
+        self.scope = scope or Scope()
+        self.output = output or OutputChannel()
+        self.cache_size = cache_size
+        self.options = options  # passed on to every chunk's Interpreter
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, Program] = OrderedDict()
+
+    def compile(self, source: str) -> tuple[Program, float, float, bool]:
+        """The compiled program for the source, from the cache if it was compiled before."""
+        program = self._cache.get(source)
+        if program is not None:
+            self._cache.move_to_end(source)
+            self.hits += 1
+            return program, 0.0, 0.0, True
+
+        self.misses += 1
+        program, lex_time, parse_time = Interpreter.compile(source)
+        if self.cache_size > 0:
+            self._cache[source] = program
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return program, lex_time, parse_time, False
+
+    def run(self, source: str) -> ChunkResult:
+        """Evaluates a chunk in the session's scope. A chunk that fails halfway keeps whatever it
+        declared before failing, like it would in any other REPL."""
+        program, lex_time, parse_time, cached = self.compile(source)
+        interpreter = Interpreter(
+            source, self.scope, self.output, program=program, **self.options
+        )
+        result = ChunkResult(lex_time=lex_time, parse_time=parse_time, cached=cached)
+        start = time.perf_counter()
+        try:
+            result.results.extend(interpreter.evaluate())
+        finally:
+            result.eval_time = time.perf_counter() - start
+        return result
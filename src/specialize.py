@@ -0,0 +1,306 @@
+# specialization of tags for the constant arguments a call site passes.
+# a call like `{format_user style="short"}` passes the same literal every time, so the tag's body can
+# be rewritten once with `style` replaced by "short" and everything that only depended on it folded
+# away: operations on two literals are computed and ifs on a literal condition are replaced by the
+# branch they'd take. The rewritten body is cached per (tag declaration, constant arguments) and
+# reused by every later call passing the same constants. Rewriting costs more than running the body
+# once, so a call site is only specialized once it's been called `threshold` times.
+# folding never goes through the interpreter's operators: those count allocations, charge the
+# memory budget and extend shared strings in place, none of which should happen ahead of time.
+# the arguments are still bound in the tag's scope like any other call, so whatever isn't rewritten
+# (nested tags in particular, they can be called with arguments of their own) sees the same values.
+# a parameter is only replaced when nothing in the tag can ever rebind it: declaring, assigning or
+# naming a tag after it anywhere in the body (nested tags included) keeps it a variable, and a body
+# that imports is never specialized since the module's exports could shadow anything.
+
+from .lexer_models import OPERATORS
+from .parser_models import *
+from .builtin_models import *
+from .memo import freeze
+from .bigint import GUARDED_OPERATORS, estimate_bits
+from collections import OrderedDict
+import copy
+import typing
+
+__all__ = ("Specializer",)
+
+DEFAULT_MAXSIZE = 64
+"""Specialized tag bodies an interpreter keeps around"""
+
+DEFAULT_THRESHOLD = 16
+"""Calls a call site makes before the tag it calls is specialized for it"""
+
+FOLD_MAX_INT_BITS = 1024
+"""Bigger ints are left for the runtime to compute, under its own big int guard"""
+
+CONSTANT_TYPES = (String, Number, Bool)
+"""Literals that can be substituted into a tag's body, null evaluates to nothing so it's left out"""
+
+
+def _rebound(node, names: set[str]) -> bool:
+    """Collects every name the node could rebind. Returns False if it imports."""
+    if isinstance(node, list):
+        return all(_rebound(child, names) for child in node)
+
+    if not isinstance(node, Node) or isinstance(node, Literal):
+        return True
+
+    if isinstance(node, ImportStatement):
+        return False
+
+    if isinstance(node, VarDec) and not isinstance(node, FunctionArgument):
+        names.add(node.name)
+
+    elif isinstance(node, AssignmentExp) and isinstance(node.assignee, Identifier):
+        names.add(node.assignee.name)
+
+    elif isinstance(node, FunctionDec) and node.name:
+        names.add(node.name)
+
+    return all(_rebound(value, names) for value in vars(node).values())
+
+
+def _fold_binop(operator: OPERATORS, left: Literal, right: Literal) -> Literal | None:
+    """The scalar cases of `Interpreter._apply_binop`, None for anything else (including errors,
+    which the runtime raises when the call gets there)."""
+    from .interpreter import binops
+
+    if operator not in binops or not left.is_arithmetic_compatible(right):
+        return None
+    l, r = left.value, right.value
+    if operator in GUARDED_OPERATORS and type(l) is int and type(r) is int:
+        if estimate_bits(operator, l, r) > FOLD_MAX_INT_BITS:
+            return None
+    try:
+        # strings are joined into a new one, not appended to the left one's pieces
+        result = binops[operator](l, r)
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    cls = literals.get(type(result))
+    return None if cls is None else cls(result)
+
+
+def _fold_unary(operator: OPERATORS, operand: Literal) -> Literal | None:
+    """`Interpreter._apply_unary` for numbers."""
+    if not isinstance(operand, Number) or operator not in (OPERATORS.PLUS, OPERATORS.MINUS):
+        return None
+    if operator is OPERATORS.MINUS:
+        return literals[type(operand.value)](-operand.value)
+    return operand
+
+
+def _truthy(value: Literal) -> bool:
+    # `Interpreter._check_truthiness` for the constant types
+    if isinstance(value, String):
+        return value.length != 0
+    return bool(value.value)
+
+
+def _replace(node: Node, **changes) -> Node:
+    # a shallow copy keeps the line and the checker's marks, which aren't dataclass fields
+    clone = copy.copy(node)
+    clone.__dict__.update(changes)
+    return clone
+
+
+class _Rewriter:
+    def statements(self, nodes: list, values: dict[str, Literal]) -> list:
+        result = []
+        for node in nodes:
+            node = self.rewrite(node, values)
+            if isinstance(node, IfStatement) and isinstance(node.condition, CONSTANT_TYPES):
+                # a statement's value is never used in a tag's body, so the branch can just take
+                # the if's place. Ifs don't open a scope of their own either.
+                result.extend(self._branch(node))
+            else:
+                result.append(node)
+        return result
+
+    def _branch(self, node: IfStatement) -> list:
+        if _truthy(node.condition):
+            return node.body
+        if isinstance(node._else, IfStatement):
+            return self.statements([node._else], {})
+        return node._else or []
+
+    def rewrite(self, node, values: dict[str, Literal]):
+        if not isinstance(node, Node) or isinstance(node, Literal):
+            return node
+
+        if isinstance(node, Identifier):
+            return values.get(node.name, node)
+
+        if isinstance(node, BinaryExp):
+            left, right = self.rewrite(node.left, values), self.rewrite(node.right, values)
+            if isinstance(left, CONSTANT_TYPES) and isinstance(right, CONSTANT_TYPES):
+                folded = _fold_binop(node.operator.subtype, left, right)
+                if folded is not None:
+                    return folded
+            if left is node.left and right is node.right:
+                return node
+            return _replace(node, left=left, right=right)
+
+        if isinstance(node, UnaryExp):
+            operand = self.rewrite(node.operand, values)
+            if isinstance(operand, CONSTANT_TYPES):
+                folded = _fold_unary(node.operator.subtype, operand)
+                if folded is not None:
+                    return folded
+            return node if operand is node.operand else _replace(node, operand=operand)
+
+        if isinstance(node, (VarDec, AssignmentExp)):
+            value = self.rewrite(node.value, values)
+            return node if value is node.value else _replace(node, value=value)
+
+        if isinstance(node, ObjectExp):
+            properties = [self.rewrite(prop, values) for prop in node.properties]
+            return self._changed(node, "properties", properties)
+
+        if isinstance(node, Property):
+            value = self.rewrite(node.value, values)
+            return node if value is node.value else _replace(node, value=value)
+
+        if isinstance(node, ArrayExp):
+            elements = [self.rewrite(element, values) for element in node.elements]
+            return self._changed(node, "elements", elements)
+
+        if isinstance(node, MemberExp):
+            obj = self.rewrite(node.object, values)
+            value = self.rewrite(node.value, values) if node.computed else node.value
+            if obj is node.object and value is node.value:
+                return node
+            return _replace(node, object=obj, value=value)
+
+        if isinstance(node, FunctionCallExp):
+            return self._call(node, values)
+
+        if isinstance(node, IfStatement):
+            condition = self.rewrite(node.condition, values)
+            body = self.statements(node.body, values)
+            if isinstance(node._else, IfStatement):
+                _else = self.rewrite(node._else, values)
+            elif node._else is not None:
+                _else = self.statements(node._else, values)
+            else:
+                _else = None
+            return _replace(node, condition=condition, body=body, _else=_else)
+
+        if isinstance(node, LoopStatement):
+            target = self.rewrite(node.target, values)
+            # every iteration declares its own index and item
+            inner = {name: value for name, value in values.items() if name not in ("index", "item")}
+            return _replace(node, target=target, body=self.statements(node.body, inner))
+
+        if isinstance(node, SendStatement):
+            message = self.rewrite(node.message, values)
+            destination = self.rewrite(node.destination, values)
+            return _replace(node, message=message, destination=destination)
+
+        # tag declarations are left alone, their bodies see whatever their own calls pass
+        return node
+
+    def _call(self, node: FunctionCallExp, values: dict[str, Literal]):
+        caller = self.rewrite(node.caller, values)
+        # builtins bind every argument as it's evaluated, later arguments see that value instead
+        values = dict(values)
+        arguments = []
+        for argument in node.arguments:
+            arguments.append(self.rewrite(argument, values))
+            values.pop(argument.name, None)
+        if caller is node.caller and all(new is old for new, old in zip(arguments, node.arguments)):
+            return node
+        return _replace(node, caller=caller, arguments=arguments)
+
+    @staticmethod
+    def _changed(node: Node, name: str, children: list):
+        if all(new is old for new, old in zip(children, getattr(node, name))):
+            return node
+        return _replace(node, **{name: children})
+
+
+class Specializer:
+    # bounded LRU cache of the tag bodies an interpreter specialized
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, threshold: int = DEFAULT_THRESHOLD):
+        self.maxsize = maxsize  # 0 disables specialization
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._rewriter = _Rewriter()
+        # calls made so far by every call site that isn't hot yet, by id of the call node, which
+        # is kept so the id can't be reused
+        self._sites: dict[int, list] = {}
+        # names each tag body could rebind, None when it imports. By id of the body, which is
+        # kept so the id can't be reused
+        self._rebound: dict[int, tuple[list, frozenset[str] | None]] = {}
+        self._cache: OrderedDict[tuple, tuple[list, list, Expression]] = OrderedDict()
+
+    def specialize(self, function: Function, node: FunctionCallExp, arguments: dict[str, Literal]) -> Function:
+        """The function to call, a version with the call site's constant arguments folded into its
+        body if it has any, the function itself otherwise."""
+        if self.maxsize <= 0:
+            return function
+
+        site = self._sites.get(id(node))
+        if site is None or site[0] is not node:
+            site = self._sites[id(node)] = [node, 0]
+        if site[1] < self.threshold:
+            site[1] += 1
+            return function
+
+        # only literals written at the call site, and only the last one when a name is passed twice
+        constants = [
+            argument.name for argument in node.arguments
+            if isinstance(argument.value, CONSTANT_TYPES) and arguments.get(argument.name) is argument.value
+        ]
+        if not constants:
+            return function
+
+        rebound = self._rebound_names(function)
+        if rebound is None:
+            return function
+        constants = [name for name in constants if name not in rebound]
+        if not constants:
+            return function
+
+        key = (id(function.body), tuple((name, freeze(arguments[name])) for name in sorted(constants)))
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] is function.body:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            values = {name: arguments[name] for name in constants}
+            body = self._rewriter.statements(function.body, values)
+            returns = self._rewriter.rewrite(function.returns, values)
+            entry = self._cache[key] = (function.body, body, returns)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+        _, body, returns = entry
+        # same scope and memo, so everything else about the call stays as it was
+        return Function(function.name, function.parameters, body, returns, function.declarative_scope, function.memo)
+
+    def _rebound_names(self, function: Function) -> frozenset[str] | None:
+        entry = self._rebound.get(id(function.body))
+        if entry is None or entry[0] is not function.body:
+            names = set[str]()
+            imports = not _rebound([*function.body, function.returns], names)
+            entry = self._rebound[id(function.body)] = (function.body, None if imports else frozenset(names))
+        return entry[1]
+
+    def clear(self):
+        self._cache.clear()
+        self._rebound.clear()
+        self._sites.clear()
+
+    def stats(self) -> dict[str, typing.Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,332 @@
+# evaluation driven by an explicit work stack instead of python recursion.
+# every compound node is evaluated by a generator that yields the child nodes it needs the value of,
+# the driver loop evaluates them and sends the values back in. Nested TBD calls only grow the work
+# stack, so call depth is bounded by `max_call_depth` rather than by python's recursion limit.
+# a return expression that is itself a call (of a tag that isn't memoized) is evaluated as a tail call:
+# it replaces the call on the stack instead of being pushed on top of it, so tail recursive tags run
+# in constant space. Any other return expression is evaluated while the call still counts towards the
+# depth, `return {f n=n+1} + 1` recurses just like a call in the body would.
+
+from .lexer_models import *
+from .parser_models import *
+from .builtin_models import *
+from .exceptions import InterpreterException, Cancelled
+from .memo import TagMemo
+from dataclasses import dataclass
+import typing
+
+if typing.TYPE_CHECKING:
+    from .interpreter import Interpreter
+    from .hooks import Hooks
+
+__all__ = ("StacklessEvaluator", "DEFAULT_MAX_CALL_DEPTH")
+
+DEFAULT_MAX_CALL_DEPTH = 100_000
+"""How many nested tag calls a script can make before it's stopped"""
+
+_ENTER_CALL = object()
+
+
+@dataclass(slots=True)
+class TailCall:
+    # yielded by a handler whose value is the value of `node`, the handler is done after this
+    node: Node
+    scope: Scope
+
+
+class StacklessEvaluator:
+    def __init__(self, interpreter: "Interpreter", max_call_depth: int = DEFAULT_MAX_CALL_DEPTH):
+        self.interpreter = interpreter
+        self.max_call_depth = max_call_depth
+        # call depth of the runs this one is nested in (builtins calling back into tags) and the
+        # positions in the stack of the generators of the current run that entered a tag body
+        self._base_depth = 0
+        self._calls: list[int] = []
+        self.bind(None)
+
+    def bind(self, hooks: typing.Optional["Hooks"]):
+        """Builds the dispatch tables, wrapping the handlers if hooks need to see them."""
+        self._handlers = {
+            BinaryExp: self._binop,
+            UnaryExp: self._unary,
+            VarDec: self._vardec,
+            ConstDec: self._vardec,
+            AssignmentExp: self._assignment,
+            ObjectExp: self._object,
+            ArrayExp: self._array,
+            MemberExp: self._member_exp,
+            FunctionCallExp: self._function_call,
+            IfStatement: self._if_statement,
+            LoopStatement: self._loop_statement,
+            SendStatement: self._send_statement,
+            ImportStatement: self._import_statement,
+        }
+        self._leaves = {
+            Identifier: self.interpreter._eval_identifier,
+            Number: self._literal,
+            String: self._literal,
+            Bool: self._literal,
+        }
+        self.__dict__.pop("_tag", None)
+        if hooks is None:
+            return
+
+        callbacks = hooks.callbacks
+        if callbacks["node_enter"] or callbacks["node_exit"]:
+            # leaves go through the interpreter's _eval_node so the hooks see them as well
+            self._leaves = {}
+            self._handlers = {
+                node_type: self._traced(handler, callbacks)
+                for node_type, handler in self._handlers.items()
+            }
+
+        if callbacks["tag_call"] or callbacks["tag_return"]:
+            untraced = self._tag
+            self._tag = lambda function, arguments: self._trace_tag(
+                untraced, callbacks, function, arguments
+            )
+
+    @property
+    def depth(self) -> int:
+        return self._base_depth + len(self._calls)
+
+    def evaluate(self, node: Node | Token, scope: Scope):
+        handler = self._handlers.get(type(node))
+        if handler is None:
+            # leaves never evaluate other nodes
+            return self.interpreter._eval_node(node, scope)
+        self.interpreter.stats.node_visits += 1
+        return self._run(handler(node, scope))
+
+    def call_function(self, function: Function, arguments: dict[str, Literal]):
+        return self._run(self._tag(function, arguments))
+
+    def _run(self, generator: typing.Generator):
+        handlers = self._handlers
+        leaves = self._leaves
+        eval_leaf = self.interpreter._eval_node
+        stack = [generator]
+        outer = self._base_depth, self._calls
+        self._base_depth = self.depth
+        self._calls = calls = []
+        limit = self.max_call_depth - self._base_depth
+        stats = self.interpreter.stats
+        visits = 0
+        value = None
+        try:
+            while stack:
+                try:
+                    request = stack[-1].send(value)
+                except StopIteration as stop:
+                    stack.pop()
+                    if calls and calls[-1] == len(stack):
+                        calls.pop()
+                    value = stop.value
+                    continue
+
+                if request is _ENTER_CALL:
+                    calls.append(len(stack) - 1)
+                    if len(calls) > limit:
+                        raise InterpreterException(
+                            f"Maximum call depth of {self.max_call_depth} exceeded"
+                        )
+                    if self.depth > stats.max_call_depth:
+                        stats.max_call_depth = self.depth
+                    value = None
+                    continue
+
+                if type(request) is TailCall:
+                    stack.pop()
+                    if calls and calls[-1] == len(stack):
+                        calls.pop()
+                    node, scope = request.node, request.scope
+                else:
+                    node, scope = request
+
+                node_type = type(node)
+                if node_type in leaves:
+                    visits += 1
+                    value = leaves[node_type](node, scope)
+                elif node_type in handlers:
+                    visits += 1
+                    stack.append(handlers[node_type](node, scope))
+                    value = None
+                else:
+                    # counts itself
+                    value = eval_leaf(node, scope)
+        finally:
+            self._base_depth, self._calls = outer
+            stats.node_visits += visits
+
+        return value
+
+    def _traced(self, handler, callbacks):
+        return lambda node, scope: self._trace(handler, callbacks, node, scope)
+
+    def _trace(self, handler, callbacks, node: Node, scope: Scope):
+        for callback in callbacks["node_enter"]:
+            callback(node, scope)
+        result = yield from self._no_tail_calls(handler(node, scope))
+        for callback in callbacks["node_exit"]:
+            callback(node, scope, result)
+        return result
+
+    def _trace_tag(self, tag, callbacks, function: Function, arguments: dict[str, Literal]):
+        for callback in callbacks["tag_call"]:
+            callback(function, arguments)
+        result = yield from self._no_tail_calls(tag(function, arguments))
+        for callback in callbacks["tag_return"]:
+            callback(function, result)
+        return result
+
+    def _no_tail_calls(self, generator: typing.Generator):
+        # runs a handler but evaluates its tail call as a regular child, so whoever wraps it gets the
+        # result. Tail calls aren't eliminated while hooks are registered.
+        value = None
+        while True:
+            try:
+                request = generator.send(value)
+            except StopIteration as stop:
+                return stop.value
+
+            if type(request) is TailCall:
+                generator.close()
+                return (yield request.node, request.scope)
+            value = yield request
+
+    @staticmethod
+    def _literal(node: Literal, scope: Scope):
+        return node
+
+    # the handlers mirror the _eval_* methods of the interpreter and share their checks
+
+    def _binop(self, node: BinaryExp, scope: Scope):
+        left = yield node.left, scope
+        right = yield node.right, scope
+        return self.interpreter._apply_binop(node.operator.subtype, left, right)
+
+    def _unary(self, node: UnaryExp, scope: Scope):
+        operand = yield node.operand, scope
+        return self.interpreter._apply_unary(node.operator.subtype, operand)
+
+    def _vardec(self, node: VarDec, scope: Scope):
+        self.interpreter._check_redeclaration(node, scope)
+        val = yield node.value, scope
+        return self.interpreter._declare(node, val, isinstance(node, ConstDec), scope)
+
+    def _assignment(self, node: AssignmentExp, scope: Scope):
+        name = self.interpreter._assignee(node, scope)
+        res = yield node.value, scope
+        return self.interpreter._assign(name, res, scope)
+
+    def _object(self, node: ObjectExp, scope: Scope):
+        values = {}
+        for prop in node.properties:
+            values[prop.name.name] = yield prop.value, scope
+        return self.interpreter._track(Dict(values))
+
+    def _array(self, node: ArrayExp, scope: Scope):
+        elements = []
+        for element in node.elements:
+            elements.append((yield element, scope))
+        return self.interpreter._track(Array.pack(elements))
+
+    def _member_exp(self, node: MemberExp, scope: Scope):
+        obj = yield node.object, scope
+        return self.interpreter._access_member(obj, node)
+
+    def _function_call(self, node: FunctionCallExp, scope: Scope):
+        function = yield node.caller, scope
+        if isinstance(function, BuiltInFunction):
+            subscope = Scope(parent=scope)
+            args = {}
+            for arg in node.arguments:
+                val = yield arg.value, subscope
+                subscope.force_assign_var(arg.name, val)
+                args[arg.name] = val
+            return self.interpreter._call_builtin(function, args)
+
+        elif isinstance(function, Function):
+            args = {}
+            for arg in node.arguments:
+                args[arg.name] = yield arg.value, scope
+            function = self.interpreter.specializer.specialize(function, node, args)
+            return (yield from self._tag(function, args))
+
+        else:
+            raise InterpreterException(f"{node.caller} is not callable")
+
+    def _tag(self, function: Function, arguments: dict[str, Literal]):
+        key = self.interpreter._memo_key(function, arguments)
+        if key is not None:
+            result = function.memo.get(key)
+            if result is not TagMemo.MISSING:
+                return result
+
+        subscope = self.interpreter._tag_scope(function, arguments)
+        yield _ENTER_CALL
+        for statement in function.body:
+            yield statement, subscope
+
+        if key is None and type(function.returns) is FunctionCallExp:
+            # nothing left to do with the result, so the call's frame can be reused
+            yield TailCall(function.returns, subscope)
+
+        result = yield function.returns, subscope
+        if key is not None and not isinstance(result, (Function, BuiltInFunction)):
+            # functions capture the scope of the call that created them so they're never shared
+            function.memo.put(key, result)
+        return result
+
+    def _if_statement(self, node: IfStatement, scope: Scope):
+        cond = yield node.condition, scope
+        res = Null()
+        if self.interpreter._check_truthiness(cond):
+            for statement in node.body:
+                res = yield statement, scope
+
+        elif isinstance(node._else, IfStatement):
+            yield TailCall(node._else, scope)
+
+        elif node._else is not None:
+            for statement in node._else:
+                res = yield statement, scope
+
+        return res
+
+    def _loop_statement(self, node: LoopStatement, scope: Scope):
+        target = yield node.target, scope
+        items, count = self.interpreter._loop_iterations(node, target)
+
+        loop_scope = Scope(parent=scope)
+        variables = loop_scope.variables
+        constants = loop_scope.constants
+        cancelled = self.interpreter.cancelled
+
+        for index in range(count):
+            if cancelled is not None and cancelled.is_set():
+                raise Cancelled("Evaluation was cancelled")
+            if node.captures:
+                # tags declared in the body keep the scope of their iteration
+                loop_scope = Scope(parent=scope)
+                variables = loop_scope.variables
+            else:
+                variables.clear()
+                constants.clear()
+            variables["index"] = Number(index)
+            if items is not None:
+                variables["item"] = next(items)
+
+            for statement in node.body:
+                yield statement, loop_scope
+
+        return Null()
+
+    def _send_statement(self, node: SendStatement, scope: Scope):
+        message = yield node.message, scope
+        destination = yield node.destination, scope
+        return self.interpreter._send(message, destination)
+
+    def _import_statement(self, node: ImportStatement, scope: Scope):
+        source = yield node.source, scope
+        return self.interpreter._import(source, scope)
@@ -0,0 +1,41 @@
+# statistics of a single run of the interpreter.
+# everything here is a counter the interpreter bumps where it already does the work, so they're
+# cheap enough to always collect.
+
+from collections import defaultdict
+from dataclasses import dataclass, field, fields
+import typing
+
+__all__ = ("RunStats",)
+
+
+@dataclass
+class RunStats:
+    lex_time: float = 0.0  # seconds
+    parse_time: float = 0.0
+    eval_time: float = 0.0
+    node_visits: int = 0
+    tag_calls: int = 0  # calls that ran the tag's body, memoized results are in memo_stats()
+    max_call_depth: int = 0
+    scope_lookups: int = 0  # variables read
+    scope_hops: int = 0  # parent scopes walked through by those reads
+    max_scope_hops: int = 0
+    allocations: defaultdict[type, int] = field(default_factory=lambda: defaultdict(int))
+    heap_bytes: int = 0  # approximate bytes of the strings, arrays and dicts created that are still alive
+    peak_heap_bytes: int = 0
+    peak_array_length: int = 0
+    peak_string_length: int = 0
+
+    @property
+    def mean_scope_hops(self) -> float:
+        return self.scope_hops / self.scope_lookups if self.scope_lookups else 0.0
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        """Plain values only, ready to be logged or dumped as json."""
+        result = {f.name: getattr(self, f.name) for f in fields(self)}
+        result["allocations"] = {
+            cls.__name__: count
+            for cls, count in sorted(self.allocations.items(), key=lambda item: -item[1])
+        }
+        result["mean_scope_hops"] = self.mean_scope_hops
+        return result
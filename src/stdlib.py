@@ -0,0 +1,185 @@
+# native builtins for working with arrays.
+# these iterate in python instead of making users write the loop (and pay for it) in TBD itself.
+# functions passed to them are called through `Interpreter.call_function` with these arguments:
+#   map/filter: item, index
+#   reduce: acc, item, index
+#   sort: item (for the `key` function)
+
+from .builtin_models import *
+from .builtin_models import numpy, INT64_MAX
+from .parser_models import Literal
+from .exceptions import InterpreterException
+from .heap import OBJECT_SIZE, REFERENCE_SIZE
+import typing
+
+if typing.TYPE_CHECKING:
+    from .interpreter import Interpreter
+
+__all__ = ("BUILTINS",)
+
+_MISSING = object()
+
+
+def _get_arg(args: dict[str, Literal], name: str, default: typing.Any = _MISSING):
+    value = args.get(name, _MISSING)
+    if value is _MISSING or isinstance(value, Null):
+        if default is _MISSING:
+            raise InterpreterException(f"Missing required argument `{name}`")
+        return default
+    return value
+
+
+def _get_items(args: dict[str, Literal], builtin: str) -> Array:
+    # the array can either be passed as `items=...` or as the literal arguments themselves
+    items = args.get("items", None)
+    if items is None or isinstance(items, Null):
+        items = args.get("__args", Array())
+    if not isinstance(items, Array):
+        raise InterpreterException(f"{builtin} expects an array, got {items}")
+    return items
+
+
+def _get_function(args: dict[str, Literal], name: str, builtin: str, required: bool = True):
+    fn = _get_arg(args, name, _MISSING if required else None)
+    if fn is not None and not isinstance(fn, (Function, BuiltInFunction)):
+        raise InterpreterException(f"`{name}` passed to {builtin} must be a tag, got {fn}")
+    return fn
+
+
+def _get_int(value: Literal, name: str) -> int:
+    if not isinstance(value, Number) or not isinstance(value.value, int):
+        raise InterpreterException(f"`{name}` must be a whole number, got {value}")
+    return value.value
+
+
+def _range(args: dict[str, Literal], interpreter: "Interpreter"):
+    positional = list(args.get("__args", Array()))
+    if len(positional) > 3:
+        raise InterpreterException("range takes at most 3 numbers: start, end and step")
+
+    if len(positional) == 1:
+        positional.insert(0, Number(0))  # {range 10} is the same as {range 0, 10}
+    start, end, step = (positional + [Number(0), _MISSING, Number(1)][len(positional) :])[:3]
+
+    start = _get_int(_get_arg(args, "start", start), "start")
+    end = _get_int(_get_arg(args, "end", end), "end")
+    step = _get_int(_get_arg(args, "step", step), "step")
+    if step == 0:
+        raise InterpreterException("range step cannot be 0")
+
+    # refuse a range that can't fit before building it, {range 10 ** 12} would take the process down
+    length = len(range(start, end, step))
+    interpreter._reserve(OBJECT_SIZE + REFERENCE_SIZE * length)
+
+    if numpy is not None and INT64_MAX >= max(abs(start), abs(end)):
+        return NumericArray(numpy.arange(start, end, step, dtype=numpy.int64))
+
+    return Array([Number(i) for i in range(start, end, step)])
+
+
+def _sum(args: dict[str, Literal]):
+    items = _get_items(args, "sum")
+    start = _get_arg(args, "start", Number(0))
+    if not isinstance(start, (Number, Bool)):
+        raise InterpreterException(f"sum can only add numbers, got {start}")
+
+    if isinstance(items, NumericArray):
+        values = items.value
+        if values.dtype.kind == "f":
+            return Number(float(numpy.sum(values)) + start.value)
+
+        # int64 sums wrap around silently so only let numpy do it when it can't overflow
+        magnitude = max(abs(int(values.max())), abs(int(values.min()))) if len(values) else 0
+        if magnitude * len(values) + abs(start.value) <= INT64_MAX:
+            total = int(numpy.sum(values, dtype=numpy.int64)) + start.value
+        else:
+            total = sum(values.tolist(), start.value)
+        return literals[type(total)](total)
+
+    total = start.value
+    for item in items:
+        if not isinstance(item, (Number, Bool)):
+            raise InterpreterException(f"sum can only add numbers, got {item}")
+        total += item.value
+    return literals[type(total)](total)
+
+
+def _impure(args: dict[str, Literal]):
+    # opts tags out of memoization, for tags that should run every time even though they look pure.
+    # {impure my_tag, other_tag}
+    for fn in args.values():
+        if isinstance(fn, Function) and fn.memo is not None:
+            fn.memo.enabled = False
+            fn.memo.clear()
+    return Null()
+
+
+def _map(args: dict[str, Literal], interpreter: "Interpreter"):
+    items = _get_items(args, "map")
+    fn = _get_function(args, "fn", "map")
+    call = interpreter.call_function
+    return Array.pack(
+        [call(fn, {"item": item, "index": Number(i)}) for i, item in enumerate(items)]
+    )
+
+
+def _filter(args: dict[str, Literal], interpreter: "Interpreter"):
+    items = _get_items(args, "filter")
+    fn = _get_function(args, "fn", "filter")
+    call, truthy = interpreter.call_function, interpreter._check_truthiness
+    return Array.pack(
+        [
+            item
+            for i, item in enumerate(items)
+            if truthy(call(fn, {"item": item, "index": Number(i)}))
+        ]
+    )
+
+
+def _reduce(args: dict[str, Literal], interpreter: "Interpreter"):
+    items = iter(_get_items(args, "reduce"))
+    fn = _get_function(args, "fn", "reduce")
+    acc = args.get("initial", _MISSING)
+    offset = 0
+    if acc is _MISSING:
+        acc = next(items, _MISSING)
+        if acc is _MISSING:
+            raise InterpreterException("reduce of an empty array with no `initial` value")
+        offset = 1
+
+    call = interpreter.call_function
+    for i, item in enumerate(items, offset):
+        acc = call(fn, {"acc": acc, "item": item, "index": Number(i)})
+    return acc
+
+
+def _sort(args: dict[str, Literal], interpreter: "Interpreter"):
+    items = _get_items(args, "sort")
+    key = _get_function(args, "key", "sort", required=False)
+    reverse = interpreter._check_truthiness(_get_arg(args, "reverse", Bool(False)))
+
+    if key is None and isinstance(items, NumericArray):
+        values = numpy.sort(items.value, kind="stable")
+        return NumericArray(values[::-1].copy() if reverse else values)
+
+    if key is None:
+        sort_key = lambda item: item.value
+    else:
+        sort_key = lambda item: interpreter.call_function(key, {"item": item}).value
+
+    try:
+        return Array.pack(sorted(items, key=sort_key, reverse=reverse))
+    except TypeError:
+        raise InterpreterException("sort can only compare values of the same type")
+
+
+BUILTINS: dict[str, BuiltInFunction] = {
+    "range": BuiltInFunction(_range, pass_interpreter=True, pure=True),
+    "sum": BuiltInFunction(_sum, pure=True),
+    "map": BuiltInFunction(_map, pass_interpreter=True),
+    "filter": BuiltInFunction(_filter, pass_interpreter=True),
+    "reduce": BuiltInFunction(_reduce, pass_interpreter=True),
+    "sort": BuiltInFunction(_sort, pass_interpreter=True),
+    "impure": BuiltInFunction(_impure),
+}
+"""Native builtins linked to the names they're declared as in the default scope"""
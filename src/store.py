@@ -0,0 +1,249 @@
+# persistent variables, stored per guild in a local sqlite database.
+# a store is bound to the global scope of a run: the designated variables are declared there with
+# their stored value (or a default the first time) and from then on they're plain scope variables,
+# so reading or bumping one costs exactly what any other variable does. Nothing is written while
+# the script runs, changed variables are written in one transaction at the end of the run and,
+# for long running scripts, every `flush_interval` seconds from a background thread.
+# values are kept in a small binary format, see `encode`. A variable holding something that can't be
+# encoded (a tag) is skipped and keeps its previously stored value, the reason ends up in `rejected`.
+# flushes happen at the end of runs, raising there would hide whatever the script did.
+
+from .builtin_models import *
+from .parser_models import Literal
+from .exceptions import InterpreterException
+from pathlib import Path
+import sqlite3
+import struct
+import threading
+import typing
+
+__all__ = ("GuildStore", "encode", "decode")
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+"""Seconds between background writes of changed variables"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS variables (
+    guild TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (guild, name)
+) WITHOUT ROWID
+"""
+
+# one byte tags, followed by the value's payload
+_NULL, _TRUE, _FALSE, _INT, _FLOAT, _STRING, _ARRAY, _DICT = b"ntfidsam"
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, index: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[index]
+        index += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, index
+        shift += 7
+
+
+def _write_text(out: bytearray, text: str):
+    raw = text.encode()
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_text(data: bytes, index: int) -> tuple[str, int]:
+    length, index = _read_varint(data, index)
+    return data[index : index + length].decode(), index + length
+
+
+def _encode_into(out: bytearray, value: Literal):
+    if isinstance(value, Bool):
+        out.append(_TRUE if value.value else _FALSE)
+    elif isinstance(value, Number):
+        if type(value.value) is float:
+            out.append(_FLOAT)
+            out += struct.pack("<d", value.value)
+        else:
+            # zigzag so small negative numbers stay small too
+            n = value.value
+            out.append(_INT)
+            _write_varint(out, n << 1 if n >= 0 else (-n << 1) - 1)
+    elif isinstance(value, String):
+        out.append(_STRING)
+        _write_text(out, value.value)
+    elif isinstance(value, Array):
+        out.append(_ARRAY)
+        _write_varint(out, len(value))
+        for element in value:
+            _encode_into(out, element)
+    elif isinstance(value, Dict):
+        out.append(_DICT)
+        _write_varint(out, len(value.value))
+        for key, element in value.value.items():
+            _write_text(out, key)
+            _encode_into(out, element)
+    elif isinstance(value, Null):
+        out.append(_NULL)
+    else:
+        raise InterpreterException(f"{value} can't be stored, only numbers, strings, arrays and dicts")
+
+
+def encode(value: Literal) -> bytes:
+    out = bytearray()
+    _encode_into(out, value)
+    return bytes(out)
+
+
+def _decode_from(data: bytes, index: int) -> tuple[Literal, int]:
+    tag = data[index]
+    index += 1
+    if tag == _INT:
+        n, index = _read_varint(data, index)
+        return Number(n >> 1 if not n & 1 else -((n + 1) >> 1)), index
+    if tag == _FLOAT:
+        return Number(struct.unpack_from("<d", data, index)[0]), index + 8
+    if tag == _STRING:
+        text, index = _read_text(data, index)
+        return String(text), index
+    if tag == _ARRAY:
+        count, index = _read_varint(data, index)
+        elements = []
+        for _ in range(count):
+            element, index = _decode_from(data, index)
+            elements.append(element)
+        return Array.pack(elements), index
+    if tag == _DICT:
+        count, index = _read_varint(data, index)
+        entries = []
+        for _ in range(count):
+            key, index = _read_text(data, index)
+            element, index = _decode_from(data, index)
+            entries.append((key, element))
+        return Dict(entries), index
+    if tag == _TRUE or tag == _FALSE:
+        return Bool(tag == _TRUE), index
+    if tag == _NULL:
+        return Null(), index
+    raise ValueError(f"Unknown value tag {tag!r} at byte {index - 1}")
+
+
+def decode(data: bytes) -> Literal:
+    value, _ = _decode_from(data, 0)
+    return value
+
+
+def _version(value: Literal):
+    # arrays and dicts are changed in place by swapping their (never modified) value,
+    # everything else is changed by assigning a new object to the variable
+    return value.value if isinstance(value, (Array, Dict)) else None
+
+
+class GuildStore:
+    def __init__(
+        self,
+        path: str | Path,
+        guild: str | int,
+        flush_interval: typing.Optional[float] = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.guild = str(guild)
+        self.flush_interval = flush_interval
+        self.writes = 0  # variables written to disk so far
+        self.rejected: dict[str, str] = {}  # variables the last flushes couldn't store, and why
+
+        # flushes can happen from the background thread, the lock keeps them from overlapping
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        self._cache: dict[str, Literal] = {}  # last value read from or written to disk
+        self._bound: list[tuple[Scope, dict[str, tuple]]] = []  # scopes and what they were saved as
+        self._thread: typing.Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def load(self, names: typing.Iterable[str]) -> dict[str, Literal]:
+        """Stored values of the given variables, only the ones that aren't cached yet are read."""
+        names = list(names)
+        missing = [name for name in names if name not in self._cache]
+        if missing:
+            placeholders = ", ".join("?" * len(missing))
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT name, value FROM variables WHERE guild = ? AND name IN ({placeholders})",
+                    (self.guild, *missing),
+                ).fetchall()
+            for name, data in rows:
+                self._cache[name] = decode(data)
+
+        return {name: self._cache[name] for name in names if name in self._cache}
+
+    def bind(self, scope: Scope, defaults: dict[str, Literal]) -> Scope:
+        """Declares every variable in `defaults` in the scope, with its stored value if it has one."""
+        stored = self.load(defaults)
+        saved = {}
+        for name, default in defaults.items():
+            value = stored.get(name, default)
+            if isinstance(value, (Array, Dict)):
+                value = value.copy()  # so scopes bound at the same time don't change each other's
+            scope.declare_var(name, value)
+            saved[name] = (value, _version(value)) if name in stored else (None, None)
+
+        self._bound.append((scope, saved))
+        if self.flush_interval is not None and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._flush_loop, name="tbd-store", daemon=True)
+            self._thread.start()
+        return scope
+
+    def unbind(self, scope: Scope):
+        """Writes the scope's changed variables and stops tracking it."""
+        self.flush()
+        self._bound = [(bound, saved) for bound, saved in self._bound if bound is not scope]
+
+    def flush(self) -> int:
+        """Writes every bound variable that changed since it was last written, returns how many."""
+        with self._lock:
+            changed = []
+            for scope, saved in self._bound:
+                for name, (value, version) in saved.items():
+                    current = scope.variables.get(name)
+                    if current is None or (current is value and _version(current) is version):
+                        continue
+                    try:
+                        data = encode(current)
+                    except InterpreterException as e:
+                        self.rejected[name] = str(e)
+                        continue
+                    self.rejected.pop(name, None)
+                    changed.append((saved, name, current, data))
+
+            if changed:
+                with self._connection:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO variables (guild, name, value) VALUES (?, ?, ?)",
+                        [(self.guild, name, data) for _, name, _, data in changed],
+                    )
+                # only marked as saved once they actually are
+                for saved, name, current, _ in changed:
+                    saved[name] = (current, _version(current))
+                    self._cache[name] = current
+                self.writes += len(changed)
+            return len(changed)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._connection.close()
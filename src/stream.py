@@ -0,0 +1,161 @@
+# streaming evaluation, for consumers that show a script's output while it's still running (like a
+# discord message that's edited as output comes in).
+# the script runs on a thread of its own and everything it produces (results, printed lines and sent
+# messages) goes through a bounded queue. When the consumer falls behind the queue fills up and
+# the script blocks on its next output until there's room again, so a slow consumer slows the script
+# down instead of piling up output in memory.
+# a consumer that goes away (closing the stream, breaking out of the loop, getting cancelled while
+# it awaits) stops the script: it's stopped on its next output, loop iteration or tag call.
+
+from .builtin_models import *
+from .parser_models import Literal
+from .output import Sink, Destination
+from .exceptions import Cancelled
+from dataclasses import dataclass
+import asyncio
+import queue
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    from .interpreter import Interpreter
+
+__all__ = ("StreamEvent", "EvaluationStream")
+
+DEFAULT_MAXSIZE = 64
+"""Events buffered between the script and its consumer"""
+
+_END = object()
+
+
+@dataclass
+class StreamEvent:
+    kind: str  # "result", "print" or "send"
+    value: typing.Any  # the result, or the text that was printed or sent
+    destination: Destination | None = None  # where a "send" went
+
+
+class _StreamSink(Sink):
+    def __init__(self, stream: "EvaluationStream"):
+        self.stream = stream
+
+    def deliver(self, destination: Destination, content: str):
+        self.stream._put(StreamEvent("send", content, destination))
+
+
+class EvaluationStream:
+    def __init__(self, interpreter: "Interpreter", maxsize: int = DEFAULT_MAXSIZE):
+        self.interpreter = interpreter
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._closed = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._error: BaseException | None = None
+        self._stopping = False  # the script was told the consumer went away
+
+    def _put(self, event: typing.Any):
+        # blocks while the queue is full, that's the backpressure. Checks every now and then
+        # whether the consumer went away so the script doesn't wait on it forever.
+        while True:
+            if self._closed.is_set():
+                # the script's thread is stopped once, everything output after that (the flush at
+                # the end of the run, the output channel's timer) is dropped
+                if self._stopping or threading.current_thread() is not self._thread:
+                    return
+                self._stopping = True
+                raise Cancelled("The stream was closed")
+            try:
+                self._queue.put(event, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _print(self, args: dict[str, Literal]):
+        # same formatting as the CLI's print, positional values first and then the named ones
+        values = [*args.pop("__args", ()), *args.values()]
+        self._put(StreamEvent("print", " ".join(str(value) for value in values)))
+
+    def _produce(self):
+        ip = self.interpreter
+        scope = ip.global_scope
+        sink, ip.output.sink = ip.output.sink, _StreamSink(self)
+        had_print = "print" in scope.variables
+        previous_print = scope.variables.get("print")
+        scope.force_assign_var("print", BuiltInFunction(self._print))
+        ip.cancelled = self._closed
+        try:
+            for result in ip.evaluate():
+                self._put(StreamEvent("result", result))
+        except Cancelled:
+            pass
+        except BaseException as e:
+            self._error = e
+        finally:
+            ip.cancelled = None
+            ip.output.sink = sink
+            if had_print:
+                scope.variables["print"] = previous_print
+            else:
+                scope.variables.pop("print", None)
+            try:
+                self._put(_END)
+            except Cancelled:
+                pass
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._produce, name="tbd-stream", daemon=True)
+            self._thread.start()
+
+    def _get(self) -> typing.Any:
+        # checks every now and then whether the stream was closed, by another thread or by the
+        # consumer being cancelled while this ran in a worker thread, so it never waits forever
+        while True:
+            if self._closed.is_set():
+                return _END
+            try:
+                event = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        if event is _END:
+            self._closed.set()
+            if self._error is not None:
+                raise self._error
+        return event
+
+    def __iter__(self) -> typing.Iterator[StreamEvent]:
+        if self._closed.is_set():
+            return
+        self._start()
+        try:
+            while (event := self._get()) is not _END:
+                yield event
+        finally:
+            self.close()
+
+    async def __aiter__(self) -> typing.AsyncIterator[StreamEvent]:
+        if self._closed.is_set():
+            return
+        self._start()
+        try:
+            while (event := await asyncio.to_thread(self._get)) is not _END:
+                yield event
+        finally:
+            self.close()
+
+    def close(self):
+        """Stops the script if it's still running, whatever it hasn't output yet is dropped.
+        The script stops the next time it outputs something."""
+        self._closed.set()
+        # the script may be blocked on a full queue, what's in there is dropped as well
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            self._queue.put_nowait(_END)  # wakes up a consumer waiting for the next event
+        except queue.Full:
+            pass
+
+    cancel = close
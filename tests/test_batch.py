@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from src.batch import percentile, run_script, summarize
+
+
+def run(source: str, **options) -> dict:
+    return run_script(("script", source), options)
+
+
+def test_results_and_messages():
+    result = run('let a = 2\nsend "hi" to "general"\na * 3')
+    assert result["ok"]
+    assert result["results"][-1] == "Number(value=6)"
+    assert result["messages"] == [["general", "hi"]]
+
+
+def test_errors_are_reported():
+    result = run("missing")
+    assert not result["ok"]
+    assert "missing" in result["error"]
+
+
+_UNDEFINED = "\n".join(f" p{i}" for i in range(300))
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        # tag bodies aren't proven by the checker, every declaration in them goes through
+        # the redeclaration check
+        "tag f {\n" + "\n".join(f" let v{i} = 1" for i in range(300)) + "\n return 1\n}\n"
+        "{impure f}\nloop 1000 times {\n {f}\n}",
+        # declaring a tag looks up every probable parameter, none of them are defined
+        "loop 2000 times {\n tag f {\n" + _UNDEFINED + "\n return 1\n }\n}",
+    ],
+    ids=["redeclaration", "tag declaration"],
+)
+def test_time_limit_stops_the_script(source):
+    # the alarm lands wherever the script happens to be, most of the time inside one of the
+    # interpreter's own `except InterpreterException` blocks here. Enough runs that one of them does.
+    for _ in range(10):
+        start = time.perf_counter()
+        result = run(source, timeout=0.1)
+        assert time.perf_counter() - start < 1
+        assert not result["ok"]
+        assert result["error"].startswith("TimeLimitExceeded")
+
+
+def test_summary_percentiles():
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.0
+    summary = summarize([{"ok": True, "time": 1.0}, {"ok": False, "time": 3.0}], 2.0)
+    assert summary["failed"] == 1
+    assert summary["scripts_per_sec"] == 1.0
+    assert summary["max"] == 3.0
@@ -0,0 +1,74 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.lexer_models import OPERATORS
+from src.bigint import estimate_bits
+from src.exceptions import IntegerTooLarge
+
+LIMIT = 64
+
+OPERATIONS = {
+    OPERATORS.PLUS: lambda l, r: l + r,
+    OPERATORS.MINUS: lambda l, r: l - r,
+    OPERATORS.MULTIPLY: lambda l, r: l * r,
+    OPERATORS.POWER: lambda l, r: l**r,
+}
+
+
+def run(source: str, max_int_bits: int = LIMIT):
+    return list(Interpreter(source, get_default_scope(), max_int_bits=max_int_bits).evaluate())[-1]
+
+
+@pytest.mark.parametrize("operator", list(OPERATIONS))
+def test_estimates_are_never_short(operator):
+    operands = [0, 1, 2, 3, 7, 255, 256, 2**31 - 1, 2**32, 3**40, 2**63 - 1, 2**63, -3, -(2**32)]
+    exponents = range(0, 70)
+    for l in operands:
+        for r in exponents if operator is OPERATORS.POWER else operands:
+            actual = OPERATIONS[operator](l, r).bit_length()
+            assert estimate_bits(operator, l, r) >= actual, (l, r)
+            if operator is not OPERATORS.MINUS and l >= 0 and r >= 0:
+                # operands can cancel out, otherwise it's at most a bit more
+                assert estimate_bits(operator, l, r) <= actual + 1, (l, r)
+
+
+def test_big_powers_arent_underestimated():
+    # (bit_length - 1) * r undercounts by a factor of up to bit_length / (bit_length - 1)
+    assert estimate_bits(OPERATORS.POWER, 3, 262143) >= (3**262143).bit_length()
+    with pytest.raises(IntegerTooLarge):
+        run("3 ^ 262143", max_int_bits=1 << 18)
+
+
+@pytest.mark.parametrize(
+    "source, bits",
+    [
+        ("4294967295 * 4294967295", 64),
+        ("-4294967295 * 4294967295", 64),
+        ("2 ^ 63", 64),
+        ("3 ^ 40", 64),
+        ("-3 ^ 40", 64),
+        ("18446744073709551615 % 18446744073709551614", 1),
+    ],
+)
+def test_right_at_the_limit(source, bits):
+    assert run(source).value.bit_length() == bits
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "4294967296 * 4294967296",
+        "2 ^ 64",
+        "3 ^ 41",
+        "18446744073709551616 % 7",
+    ],
+)
+def test_a_bit_over_the_limit(source):
+    with pytest.raises(IntegerTooLarge, match="limit of 64"):
+        run(source)
+
+
+def test_additions_arent_refused():
+    # linear time and at most a bit more each, so they're left alone
+    assert run("18446744073709551615 + 1").value == 2**64
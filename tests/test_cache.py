@@ -0,0 +1,120 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.builtin_models import BuiltInFunction, Dict, Function, Number, String
+from src.cache import BuiltinCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Members:
+    # stands in for the bot's member lookups, counts how often it's actually asked
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, args):
+        self.calls += 1
+        member = args["id"]
+        return Dict({"id": member, "name": String(f"user{member.value}")})
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def backend():
+    return Members()
+
+
+def run(source: str, builtin: BuiltInFunction, **options) -> list:
+    scope = get_default_scope()
+    scope.declare_var("member", builtin)
+    return list(Interpreter(source, scope, **options).evaluate())
+
+
+@pytest.mark.parametrize("stackless", [False, True])
+def test_repeated_calls_hit_the_cache(backend, clock, stackless):
+    cache = BuiltinCache(ttl=10, clock=clock)
+    member = BuiltInFunction(backend, cache=cache)
+    results = run("loop 30 times {\n let m = {member id=index % 3}\n}\n{member id=1}", member, stackless=stackless)
+    assert results[-1].value["name"] == String("user1")
+    assert backend.calls == 3
+    assert (cache.hits, cache.misses) == (28, 3)
+    assert cache.hit_rate == pytest.approx(28 / 31)
+
+
+def test_cache_is_shared_across_scripts(backend, clock):
+    member = BuiltInFunction(backend, cache=BuiltinCache(ttl=10, clock=clock))
+    run("{member id=1}", member)
+    run("{member id=1}", member)
+    assert backend.calls == 1
+
+
+def test_results_expire_after_the_ttl(backend, clock):
+    cache = BuiltinCache(ttl=10, clock=clock)
+    member = BuiltInFunction(backend, cache=cache)
+    run("{member id=1}", member)
+    clock.now = 9
+    run("{member id=1}", member)
+    assert backend.calls == 1
+    clock.now = 11
+    run("{member id=1}", member)
+    assert backend.calls == 2
+    assert cache.expirations == 1
+
+
+def test_least_recently_used_results_are_evicted(backend, clock):
+    cache = BuiltinCache(ttl=None, maxsize=2, clock=clock)
+    member = BuiltInFunction(backend, cache=cache)
+    run("{member id=1}\n{member id=2}\n{member id=1}\n{member id=3}\n{member id=1}\n{member id=2}", member)
+    assert backend.calls == 4  # 2 was evicted by 3, 1 was used more recently
+    assert cache.evictions == 2
+
+
+def test_keys_come_from_argument_values():
+    cache = BuiltinCache()
+    assert cache.key({"a": Number(1), "b": String("x")}) == cache.key({"b": String("x"), "a": Number(1)})
+    assert cache.key({"a": Number(1)}) != cache.key({"a": Number(1.0)})
+    assert cache.key({"a": Number(1)}) != cache.key({"a": String("1")})
+    assert BuiltinCache(key_args=["a"]).key({"a": Number(1), "b": Number(2)}) == (
+        BuiltinCache(key_args=["a"]).key({"a": Number(1), "b": Number(3)})
+    )
+
+
+def test_unfreezable_arguments_bypass_the_cache(backend):
+    cache = BuiltinCache()
+    assert cache.key({"fn": object()}) is None
+    assert BuiltinCache(maxsize=0).key({"a": Number(1)}) is None
+
+
+def test_functions_are_not_cached(clock):
+    cache = BuiltinCache(clock=clock)
+    make = BuiltInFunction(lambda args: Function(None, [], [], Number(1), None), cache=cache)
+    run("{member}\n{member}", make)
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_by_argument_values(backend, clock):
+    cache = BuiltinCache(clock=clock)
+    member = BuiltInFunction(backend, cache=cache)
+    run("{member id=1}\n{member id=2}", member)
+    assert cache.invalidate(id=Number(1)) == 1
+    run("{member id=1}\n{member id=2}", member)
+    assert backend.calls == 3
+    assert cache.invalidate() == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_by_an_argument_outside_the_key_is_an_error():
+    cache = BuiltinCache(key_args=["id"])
+    with pytest.raises(ValueError, match="guild"):
+        cache.invalidate(guild=Number(1))
@@ -0,0 +1,112 @@
+import pytest
+
+import src.interpreter
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.checker import check
+from src.exceptions import InterpreterException
+from src.modules import ModuleCache
+from src.parser_models import Node, VarDec, AssignmentExp
+
+
+@pytest.fixture(params=[False, True], ids=["recursive", "stackless"])
+def stackless(request):
+    return request.param
+
+
+@pytest.fixture
+def modules():
+    modules = ModuleCache(scope_factory=get_default_scope)
+    modules.register("shared", "let x = 1\nconst limit = 10\n")
+    return modules
+
+
+def nodes(node, kind):
+    # every node of the given kind, in source order
+    if isinstance(node, list):
+        for child in node:
+            yield from nodes(child, kind)
+    elif isinstance(node, Node):
+        if isinstance(node, kind):
+            yield node
+        for value in vars(node).values():
+            yield from nodes(value, kind)
+
+
+def outcome(source: str, stackless: bool, modules: ModuleCache):
+    interpreter = Interpreter(source, get_default_scope(), stackless=stackless, modules=modules)
+    try:
+        return list(interpreter.evaluate())
+    except InterpreterException as e:
+        return type(e), str(e)
+
+
+def unmarked(program, scope):
+    # the checker's diagnostics without any of its marks, every check happens at runtime
+    diagnostics = check(program, scope)
+    for node in nodes(program.body, (VarDec, AssignmentExp)):
+        node.checked = False
+    return diagnostics
+
+
+CASES = {
+    "redeclared": "let a = 1\nlet a = 2",
+    "redeclared const": "const a = 1\nlet a = 2",
+    "assigned const": "const a = 1\na = 2",
+    "shadowed in a tag": "let a = 1\ntag f {\n let a = 2\n return a\n}\n{f}",
+    "assigned const in a tag": "const a = 1\ntag f {\n a = 2\n return a\n}\n{f}",
+    "shadowed in a loop": "let a = 1\nloop 2 times {\n let a = 2\n}",
+    "redeclared in a loop": "loop 2 times {\n let b = 1\n let b = 2\n}",
+    "shadowed builtin": "let print = 1",
+    "declared after import": 'import "shared"\nlet x = 2',
+    "assigned after import": 'import "shared"\nlimit = 2',
+    "declared in a taken branch": "let c = true\nif c {\n tag a {\n  return 1\n }\n}\nlet a = 2",
+    "assigned after a skipped branch": "let c = false\nif c {\n tag a {\n  return 1\n }\n}\na = 2",
+}
+
+
+@pytest.mark.parametrize("source", CASES.values(), ids=CASES.keys())
+def test_checked_programs_still_raise(source, stackless, modules):
+    result = outcome(source, stackless, modules)
+    assert isinstance(result, tuple) and result[0] is InterpreterException
+
+
+OK = {
+    "declarations": "let a = 1\nconst b = 2\na = a + b\na",
+    "loop declarations": "let total = 0\nloop 3 times {\n let b = index\n total = total + b\n}\ntotal",
+    "tag declarations": "tag f {\n let b = x * 2\n return b\n}\n{f x=2}",
+    "skipped branch": "let c = false\nif c {\n tag a {\n  return 1\n }\n}\nlet a = 2\na",
+    "import": 'import "shared"\nlet y = x + limit\ny',
+}
+
+
+@pytest.mark.parametrize("source", [*CASES.values(), *OK.values()], ids=[*CASES.keys(), *OK.keys()])
+def test_marks_dont_change_what_happens(source, stackless, modules, monkeypatch):
+    checked = outcome(source, stackless, modules)
+    modules.clear()
+    monkeypatch.setattr(src.interpreter, "check", unmarked)
+    assert outcome(source, stackless, modules) == checked
+
+
+def marks(source: str, kind=(VarDec, AssignmentExp)) -> list[bool]:
+    program, *_ = Interpreter.compile(source)
+    check(program, get_default_scope())
+    return [node.checked for node in nodes(program.body, kind)]
+
+
+def test_only_certain_outcomes_are_marked():
+    assert marks("let a = 1\nlet a = 2\na = 3") == [True, False, True]
+    assert marks("const a = 1\na = 2") == [True, False]
+    # no declaration in a tag's body, it can be called with any arguments
+    assert marks("tag f {\n let a = 1\n a = 2\n return a\n}") == [False, True]
+    assert marks("tag f {\n a = 2\n return a\n}") == [False]
+    # fresh every iteration
+    assert marks("loop 2 times {\n let a = 1\n a = 2\n}") == [True, True]
+    assert marks("let a = 1\nloop 2 times {\n let a = 1\n}") == [True, False]
+    # maybe declared
+    assert marks("if x {\n tag a {\n  return 1\n }\n}\nlet a = 2\na = 3") == [False, False]
+    assert marks("if x {\n tag a {\n  return 1\n }\n}\na = 3") == [False]
+    # the module could export anything, but once the declaration went through it's a variable here
+    assert marks('import "shared"\nlet a = 1\na = 2') == [False, True]
+    assert marks('import "shared"\na = 2') == [False]
+    assert marks('let a = 1\nimport "shared"\na = 2') == [True, True]
@@ -0,0 +1,53 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.exceptions import MemoryLimitExceeded
+
+LIMIT = 100_000
+
+
+def run(source: str, **options) -> Interpreter:
+    interpreter = Interpreter(source, get_default_scope(), memory_limit=LIMIT, **options)
+    list(interpreter.evaluate())
+    return interpreter
+
+
+@pytest.mark.parametrize("stackless", [False, True])
+@pytest.mark.parametrize(
+    "source",
+    [
+        "let a = {range 100000}",
+        # every string keeps the pieces of the ones it was built from alive
+        'let s = ""\nloop 100000 times {\n s = s + "0123456789"\n}',
+        'let kept = {}\nloop 1000 times {\n kept = {"a": kept, "b": [index, index, index]}\n}',
+    ],
+)
+def test_what_stays_alive_hits_the_limit(source, stackless):
+    with pytest.raises(MemoryLimitExceeded, match="memory limit of 100000 bytes"):
+        run(source, stackless=stackless)
+
+
+@pytest.mark.parametrize("stackless", [False, True])
+@pytest.mark.parametrize(
+    "source",
+    [
+        # ~100 bytes of temporaries per iteration, ~10 MB over the whole loop
+        "loop 100000 times {\n let t = [index, index, index]\n}",
+        'loop 100000 times {\n let s = "0123456789" + "0123456789"\n}',
+        'tag f {\n let t = {"a": [x, x]}\n return x\n}\nlet total = 0\nloop 20000 times {\n total = total + {f x=index}\n}',
+        # tags capture the scope they're declared in, a cycle that's only released by the collector
+        "loop 20000 times {\n let t = [index, index, index]\n tag f {\n return t\n }\n}",
+    ],
+)
+def test_temporaries_dont_add_up(source, stackless):
+    interpreter = run(source, stackless=stackless)
+    assert interpreter.stats.peak_heap_bytes <= LIMIT
+    assert interpreter.stats.allocations
+
+
+def test_live_bytes_go_down_when_values_are_dropped():
+    interpreter = run("let a = {range 1000}\nlet peak = 0\na = 0")
+    stats = interpreter.stats
+    assert stats.peak_heap_bytes >= 8 * 1000
+    assert stats.heap_bytes < stats.peak_heap_bytes
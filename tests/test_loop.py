@@ -0,0 +1,78 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.builtin_models import Number, String, Array
+from src.exceptions import InterpreterException
+
+
+def run(source: str, stackless: bool = False) -> list:
+    return list(Interpreter(source, get_default_scope(), stackless=stackless).evaluate())
+
+
+@pytest.fixture(params=[False, True], ids=["recursive", "stackless"])
+def stackless(request):
+    return request.param
+
+
+def test_times(stackless):
+    assert run("let total = 0\nloop 5 times {\n total = total + index\n}\ntotal", stackless)[-1] == Number(10)
+    assert run("let total = 0\nloop 0 times {\n total = total + 1\n}\ntotal", stackless)[-1] == Number(0)
+
+
+def test_array_binds_item_and_index(stackless):
+    source = 'let out = 0\nloop [10, 20, 30] {\n out = out + item * index\n}\nout'
+    assert run(source, stackless)[-1] == Number(20 + 60)
+    source = 'let out = ""\nloop ["a", "b", "c"] {\n out = out + item\n}\nout'
+    assert run(source, stackless)[-1] == String("abc")
+
+
+@pytest.mark.parametrize(
+    "target",
+    ['{"a": 1}', '"abc"', "2.5", "-1.5"],
+)
+def test_only_whole_numbers_and_arrays(target, stackless):
+    counted = f"loop {target} times {{\n let a = 1\n}}"
+    over = f"loop {target} {{\n let a = 1\n}}"
+    with pytest.raises(InterpreterException, match="Can only loop"):
+        run(counted, stackless)
+    with pytest.raises(InterpreterException, match="Can only loop"):
+        run(over, stackless)
+
+
+def test_declarations_dont_leak_into_the_next_iteration(stackless):
+    source = "let total = 0\nloop 3 times {\n let doubled = index * 2\n total = total + doubled\n}\ntotal"
+    assert run(source, stackless)[-1] == Number(6)
+    with pytest.raises(InterpreterException, match="doubled"):
+        run("loop 3 times {\n let doubled = index * 2\n}\ndoubled", stackless)
+
+
+def test_tags_keep_the_iteration_they_were_declared_in(stackless):
+    source = (
+        "let first = 0\nlet last = 0\n"
+        "loop [0, 10, 20] {\n"
+        " let doubled = item * 2\n"
+        " tag f {\n  return [item, index, doubled]\n }\n"
+        " if index == 0 {\n  first = f\n }\n"
+        " last = f\n"
+        "}\n"
+        "[{first}, {last}]"
+    )
+    first, last = run(source, stackless)[-1]
+    assert list(first) == [Number(0), Number(0), Number(0)]
+    assert list(last) == [Number(20), Number(2), Number(40)]
+
+
+def test_tags_declared_in_nested_bodies_keep_their_iteration(stackless):
+    source = (
+        "let first = 0\n"
+        "loop 3 times {\n"
+        " let outer = index\n"
+        " loop 1 times {\n"
+        "  tag f {\n   return outer\n  }\n"
+        "  if outer == 0 {\n   first = f\n  }\n"
+        " }\n"
+        "}\n"
+        "{first}"
+    )
+    assert run(source, stackless)[-1] == Number(0)
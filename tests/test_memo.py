@@ -0,0 +1,55 @@
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.memo import analyze_purity
+from src.parser_models import FunctionDec
+
+
+def tag_purity(source: str):
+    program, _, _ = Interpreter.compile(source)
+    tag = next(node for node in program.body if isinstance(node, FunctionDec))
+    return analyze_purity(tag.body, tag.returns)
+
+
+def run(source: str) -> list:
+    return list(Interpreter(source, get_default_scope()).evaluate())
+
+
+def test_local_variables_keep_a_tag_pure():
+    purity = tag_purity("tag f {\n let x = 1\n x = x + n\n return x\n}")
+    assert purity.pure
+
+
+def test_assigning_an_outer_variable_is_impure():
+    purity = tag_purity("tag f {\n log = n\n return n\n}")
+    assert not purity.pure
+    assert "log" in purity.reason
+
+
+def test_declaration_in_a_sibling_tag_does_not_hide_an_outer_assignment():
+    purity = tag_purity(
+        "tag f {\n"
+        " tag a {\n let log = 1\n return log\n }\n"
+        " tag b {\n log = log + 1\n return log\n }\n"
+        " return {b}\n"
+        "}"
+    )
+    assert not purity.pure
+    assert "log" in purity.reason
+
+
+def test_declaration_in_a_loop_body_does_not_hide_an_assignment_after_it():
+    purity = tag_purity("tag f {\n loop 2 times {\n let log = 1\n }\n log = 2\n return 1\n}")
+    assert not purity.pure
+
+
+def test_side_effect_of_a_nested_tag_runs_on_every_call():
+    results = run(
+        "let log = 0\n"
+        "tag f {\n"
+        " tag a {\n let log = 1\n return log\n }\n"
+        " tag b {\n log = log + 1\n return log\n }\n"
+        " return {b}\n"
+        "}\n"
+        "{f}\n{f}\nlog"
+    )
+    assert results[-1].value == 2
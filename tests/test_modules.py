@@ -0,0 +1,72 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.builtin_models import Number
+from src.exceptions import InterpreterException
+from src.modules import ModuleCache
+from src.output import MemorySink, OutputChannel
+
+
+@pytest.fixture
+def modules(tmp_path):
+    root = tmp_path / "scripts"
+    root.mkdir()
+    (root / "helpers.txt").write_text(
+        'let counter = 0\nsend "loaded" to "log"\ntag bump {\n counter = counter + 1\n return counter\n}\n'
+        "tag double {\n return n * 2\n}\n"
+    )
+    (tmp_path / "secret.txt").write_text("hunter2 is the password")
+    return ModuleCache(root, scope_factory=get_default_scope)
+
+
+def run(source: str, modules: ModuleCache, sink=None) -> list:
+    interpreter = Interpreter(source, get_default_scope(), OutputChannel(sink), modules=modules)
+    return list(interpreter.evaluate())
+
+
+def test_exports_are_shared(modules):
+    assert run('import "helpers.txt"\n{double n=4}', modules)[-1] == Number(8)
+    assert run('import "helpers.txt"\n{double n=5}', modules)[-1] == Number(10)
+    assert (modules.hits, modules.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("spec", ["../secret.txt", "{root}/../secret.txt", "/etc/hostname"])
+def test_files_outside_the_root_cannot_be_imported(modules, spec):
+    spec = spec.format(root=modules.root)
+    with pytest.raises(InterpreterException, match="not found"):
+        run(f'import "{spec}"', modules)
+
+
+def test_errors_do_not_quote_the_module(modules):
+    (modules.root / "notes.txt").write_text("hunter2 is the password")
+    with pytest.raises(InterpreterException) as error:
+        run('import "notes.txt"', modules)
+    assert "hunter2" not in str(error.value)
+
+
+def test_module_sends_stay_with_the_module(modules):
+    sink = MemorySink()
+    run('import "helpers.txt"', modules, sink)
+    assert sink.messages == []
+    module = modules.load("helpers.txt", None)
+    assert module.messages == [("log", "loaded")]
+
+
+def test_module_scope_is_read_only(modules):
+    with pytest.raises(InterpreterException, match="constant"):
+        run('import "helpers.txt"\n{bump}', modules)
+    with pytest.raises(InterpreterException, match="constant"):
+        run('import "helpers.txt"\ncounter = 5', modules)
+
+
+def test_files_cant_be_imported_without_a_root(tmp_path, monkeypatch):
+    (tmp_path / "helpers.txt").write_text("let counter = 0\n")
+    monkeypatch.chdir(tmp_path)
+    modules = ModuleCache(scope_factory=get_default_scope)
+    with pytest.raises(InterpreterException, match="importing files isn't enabled"):
+        run('import "helpers.txt"', modules)
+    # registered modules still work
+    modules.register("helpers", "let counter = 1\n")
+    assert run('import "helpers"\ncounter', modules)[-1] == Number(1)
+
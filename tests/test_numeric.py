@@ -0,0 +1,113 @@
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.builtin_models import Array, NumericArray, Number, Bool, String
+from src.builtin_models import INT64_MAX, INT64_MIN
+from src.lexer_models import OPERATORS
+
+OPERATORS_ = [
+    OPERATORS.PLUS,
+    OPERATORS.MINUS,
+    OPERATORS.MULTIPLY,
+    OPERATORS.DIVIDE,
+    OPERATORS.REMAINDER,
+    OPERATORS.POWER,
+    OPERATORS.COMPARISON,
+    OPERATORS.NEQUALS,
+    OPERATORS.GREATER_THAN,
+    OPERATORS.LESS_THAN,
+    OPERATORS.GTEQUALS,
+    OPERATORS.LTEQUALS,
+]
+
+ARRAYS = {
+    "ints": [3, -2, 7, 0],
+    "floats": [1.5, -0.25, 2.0, 8.0],
+    "big ints": [INT64_MAX, INT64_MIN, 2**40, -(2**40)],
+    "small ints": [1, 2, 3, 4],
+}
+
+SCALARS = [0, 2, -3, 2.5, True, INT64_MAX, 2**70]
+
+
+@pytest.fixture
+def interpreter():
+    return Interpreter("", get_default_scope())
+
+
+def operand(value):
+    if isinstance(value, list):
+        return Array.pack([Number(v) for v in value])
+    return Bool(value) if type(value) is bool else Number(value)
+
+
+def boxed(value):
+    # the same array, without numpy
+    if isinstance(value, list):
+        return Array([Number(v) for v in value])
+    return operand(value)
+
+
+def outcome(interpreter, operator, left, right):
+    try:
+        result = interpreter._apply_binop(operator, left, right)
+    except Exception as e:  # the same error from both, IntegerTooLarge for the huge powers
+        return type(e)
+    # same values and the same types, 2 and 2.0 compare equal but aren't the same result
+    return [(type(element), type(element.value), element.value) for element in result]
+
+
+@pytest.mark.parametrize("operator", OPERATORS_, ids=lambda op: op.value)
+@pytest.mark.parametrize("name", ARRAYS)
+def test_array_and_scalar_like_the_boxed_path(interpreter, operator, name):
+    array = ARRAYS[name]
+    assert isinstance(operand(array), NumericArray)
+    for scalar in SCALARS:
+        vectorized = outcome(interpreter, operator, operand(array), operand(scalar))
+        assert vectorized == outcome(interpreter, operator, boxed(array), boxed(scalar)), scalar
+        vectorized = outcome(interpreter, operator, operand(scalar), operand(array))
+        assert vectorized == outcome(interpreter, operator, boxed(scalar), boxed(array)), scalar
+
+
+@pytest.mark.parametrize("operator", OPERATORS_, ids=lambda op: op.value)
+@pytest.mark.parametrize("left", ARRAYS)
+@pytest.mark.parametrize("right", ARRAYS)
+def test_two_arrays_like_the_boxed_path(interpreter, operator, left, right):
+    vectorized = outcome(interpreter, operator, operand(ARRAYS[left]), operand(ARRAYS[right]))
+    assert vectorized == outcome(interpreter, operator, boxed(ARRAYS[left]), boxed(ARRAYS[right]))
+
+
+def test_int64_overflow_falls_back_to_exact_ints(interpreter):
+    result = interpreter._apply_binop(OPERATORS.PLUS, operand([INT64_MAX, 1]), Number(1))
+    assert [element.value for element in result] == [INT64_MAX + 1, 2]
+    assert not isinstance(result, NumericArray)
+    result = interpreter._apply_binop(OPERATORS.MULTIPLY, operand([2**40]), operand([2**40]))
+    assert [element.value for element in result] == [2**80]
+
+
+def test_mixed_arrays(interpreter):
+    # ints and floats aren't packed together, the ints would turn into floats
+    mixed = Array.pack([Number(1), Number(2.5)])
+    assert not isinstance(mixed, NumericArray)
+    assert [type(e.value) for e in mixed] == [int, float]
+    result = interpreter._apply_binop(OPERATORS.PLUS, mixed, operand([1, 2]))
+    assert [(type(e.value), e.value) for e in result] == [(int, 2), (float, 4.5)]
+
+
+def test_non_numbers_box_the_array():
+    array = operand([1, 2, 3])
+    array.append(String("x"))
+    assert type(array) is Array
+    assert list(array) == [Number(1), Number(2), Number(3), String("x")]
+    array = operand([1, 2, 3])
+    array.set_item(0, Number(2**70))
+    assert type(array) is Array and array.value[0] == Number(2**70)
+
+
+def test_numeric_arrays_print_like_arrays():
+    assert repr(operand([1, 2])) == repr(boxed([1, 2])) == "Array(value=[Number(value=1), Number(value=2)])"
+    comparison = Interpreter("[1, 2] > 1", get_default_scope())
+    assert repr(list(comparison.evaluate())[-1]) == "Array(value=[Bool(value=False), Bool(value=True)])"
@@ -0,0 +1,181 @@
+import random
+
+import pytest
+
+from src.persistent import PersistentMap, PersistentVector
+
+# the tail holds up to 32 elements, the root up to 32 leaves of 32 before the trie grows a level
+SIZES = [0, 1, 31, 32, 33, 64, 65, 1024, 1055, 1056, 1057, 1088, 1089, 32 * 32 * 32 + 32, 32 * 32 * 32 + 33]
+
+
+class Colliding:
+    # keys with the hash you give them
+    def __init__(self, name: str, hash: int):
+        self.name = name
+        self.hash = hash
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return isinstance(other, Colliding) and self.name == other.name
+
+    def __repr__(self):
+        return f"Colliding({self.name!r}, {self.hash})"
+
+
+def appended(items) -> PersistentVector:
+    vector = PersistentVector()
+    for item in items:
+        vector = vector.append(item)
+    return vector
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("build", [PersistentVector, appended], ids=["bulk", "appended"])
+def test_vector_matches_a_list(size, build):
+    expected = list(range(size))
+    vector = build(expected)
+    assert len(vector) == size
+    assert list(vector) == expected
+    assert [vector[i] for i in range(size)] == expected
+    if size:
+        assert vector[-1] == expected[-1] and vector[-size] == expected[0]
+    for index in (size, -size - 1):
+        with pytest.raises(IndexError):
+            vector[index]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_vector_appends_and_sets_leave_the_original_alone(size):
+    expected = list(range(size))
+    vector = PersistentVector(expected)
+
+    longer = vector.append("new")
+    assert list(longer) == expected + ["new"]
+    assert list(vector) == expected
+
+    rng = random.Random(size)
+    current, model = vector, expected[:]
+    versions = []
+    for _ in range(50 if size else 0):
+        index = rng.randrange(size)
+        current = current.set(index, -index)
+        model[index] = -index
+        versions.append((current, model[:]))
+    for version, snapshot in versions:
+        assert list(version) == snapshot
+    assert list(vector) == expected
+
+
+def test_vector_branches_share_their_past():
+    base = PersistentVector(range(1056))
+    left, right = base.append("left"), base.append("right")
+    assert left[-1] == "left" and right[-1] == "right"
+    assert list(left)[:-1] == list(right)[:-1] == list(base)
+    grown = left
+    for i in range(100):
+        grown = grown.append(i)
+    assert list(left) == list(base) + ["left"]
+    assert len(grown) == 1157
+
+
+@pytest.mark.parametrize("size", [0, 5, 33, 1057])
+def test_vector_slices(size):
+    expected = list(range(size))
+    vector = PersistentVector(expected)
+    for s in (slice(None), slice(1, -1), slice(None, None, -1), slice(3, 40, 7), slice(-5, None), slice(50, 10, -3)):
+        assert list(vector[s]) == expected[s]
+        assert isinstance(vector[s], PersistentVector)
+
+
+def test_vector_equality():
+    assert PersistentVector([1, 2]) == [1, 2] == PersistentVector([1, 2])
+    assert PersistentVector([1, 2]) != PersistentVector([1, 2, 3])
+    assert PersistentVector(range(40)) == tuple(range(40))
+
+
+def test_map_matches_a_dict():
+    rng = random.Random(0)
+    model, current = {}, PersistentMap()
+    versions = []
+    for step in range(3000):
+        key = rng.randrange(500)
+        if rng.random() < 0.3:
+            model.pop(key, None)
+            current = current.delete(key)
+        else:
+            model[key] = step
+            current = current.set(key, step)
+        if step % 100 == 0:
+            versions.append((current, dict(model)))
+
+        assert len(current) == len(model)
+
+    for version, snapshot in versions:
+        # same entries, in the same (insertion) order
+        assert version.items() == list(snapshot.items())
+        assert list(version) == list(snapshot)
+        assert all(version[key] == value for key, value in snapshot.items())
+
+
+def test_map_updates_leave_the_original_alone():
+    original = PersistentMap({"a": 1, "b": 2})
+    changed = original.set("a", 10).set("c", 3).delete("b")
+    assert dict(original.items()) == {"a": 1, "b": 2}
+    assert changed.items() == [("a", 10), ("c", 3)]
+    assert original.update({"d": 4}).items() == [("a", 1), ("b", 2), ("d", 4)]
+    assert len(original) == 2
+    # setting the same value or deleting a missing key changes nothing
+    assert original.set("a", original["a"]) is original
+    assert original.delete("missing") is original
+
+
+def test_map_orders_like_a_dict():
+    m = PersistentMap([("a", 1), ("b", 2), ("c", 3)])
+    # replacing keeps the position, deleting and adding again moves it to the end
+    assert list(m.set("a", 0)) == ["a", "b", "c"]
+    assert list(m.delete("a").set("a", 0)) == ["b", "c", "a"]
+
+
+@pytest.mark.parametrize(
+    "hashes",
+    [
+        [7, 7, 7],  # full collisions
+        [1, 1 + 32, 1 + 32 * 32, 1 + 32 * 32 * 32],  # share the first levels only
+        [5, 5, 5 + 32, 5 + 32],  # a collision node that has to be pushed down a level
+        [2**63 - 1, -1, -(2**63), 0],  # negative hashes are masked
+    ],
+)
+def test_map_hash_collisions(hashes):
+    keys = [Colliding(f"k{i}", h) for i, h in enumerate(hashes)]
+    m = PersistentMap()
+    for i, key in enumerate(keys):
+        m = m.set(key, i)
+    assert len(m) == len(keys)
+    assert [m[key] for key in keys] == list(range(len(keys)))
+    assert list(m) == keys
+    with pytest.raises(KeyError):
+        m[Colliding("missing", hashes[0])]
+
+    # removing them one at a time, in every position, collapses the nodes back
+    for drop in keys:
+        smaller = m.delete(drop)
+        assert len(smaller) == len(keys) - 1
+        assert drop not in smaller
+        assert [smaller[key] for key in keys if key is not drop] == [i for i, key in enumerate(keys) if key is not drop]
+    assert len(m) == len(keys)
+
+    empty = m
+    for key in keys:
+        empty = empty.delete(key)
+    assert len(empty) == 0 and list(empty) == []
+    assert empty.set(keys[0], "again")[keys[0]] == "again"
+
+
+def test_map_bulk_updates_dont_touch_shared_nodes():
+    base = PersistentMap((i, i) for i in range(2000))
+    updated = base.update((i, -i) for i in range(0, 2000, 3))
+    assert all(base[i] == i for i in range(2000))
+    assert all(updated[i] == (-i if i % 3 == 0 else i) for i in range(2000))
+    assert base.update({}).items() == base.items()
@@ -0,0 +1,83 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.parser_models import FunctionCallExp
+from src.specialize import Specializer
+
+FORMAT = """tag fmt {
+    let out = name
+    if style == "short" {
+        out = name
+    } else if style == "tag" {
+        out = "@" + name
+    } else {
+        out = name + " (" + style + ")"
+    }
+    return out + suffix
+}
+"""
+
+
+def run(source: str, **options) -> Interpreter:
+    interpreter = Interpreter(source, get_default_scope(), memo_size=0, **options)
+    interpreter.results = list(interpreter.evaluate())
+    return interpreter
+
+
+@pytest.mark.parametrize("stackless", [False, True])
+@pytest.mark.parametrize(
+    "source, specialized_bodies",
+    [
+        (FORMAT + 'let s = ""\nloop 40 times {\n s = s + {fmt name="bob" style="tag" suffix="!"}\n}\n'
+        '[s, {fmt name="x" style="long" suffix=""}]', 1),
+        # parameters that get reassigned are left alone
+        ("tag f {\n p = p + 1\n return p\n}\nlet t = 0\nloop 40 times {\n t = t + {f p=1}\n}\nt", 0),
+        # loops declare their own index
+        ("tag f {\n let a = 0\n loop 3 times {\n a = a + index\n }\n return a + index\n}\n"
+        "let t = 0\nloop 40 times {\n t = t + {f index=9}\n}\nt", 1),
+        # folds that would fail are left for the runtime
+        ("tag f {\n return 1 / d\n}\nlet t = 0\nloop 40 times {\n t = t + {f d=2}\n}\nt", 1),
+        ("tag f {\n return -n * 2 ^ k\n}\nlet t = 0\nloop 40 times {\n t = t + {f n=3 k=2}\n}\nt", 1),
+    ],
+)
+def test_same_results_as_without_specialization(source, specialized_bodies, stackless):
+    specialized = run(source, stackless=stackless)
+    plain = run(source, stackless=stackless, specialize_size=0)
+    assert specialized.results == plain.results
+    assert specialized.specializer.misses == specialized_bodies
+
+
+def test_errors_in_folded_code_are_still_raised():
+    source = "tag f {\n return 1 / d\n}\nloop 40 times {\n let x = {f d=0}\n}"
+    with pytest.raises(ZeroDivisionError):
+        run(source)
+
+
+def test_call_sites_that_run_once_are_not_specialized():
+    source = FORMAT + "\n".join(f'{{fmt name="n{i}" style="tag" suffix=""}}' for i in range(50))
+    interpreter = run(source)
+    assert interpreter.specializer.stats()["misses"] == 0
+    assert interpreter.specializer.stats()["size"] == 0
+
+
+def test_hot_call_sites_are_specialized_once():
+    source = FORMAT + 'loop 100 times {\n let x = {fmt name="bob" style="short" suffix=""}\n}'
+    stats = run(source).specializer.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 100 - stats["threshold"] - 1
+
+
+def test_folding_does_not_touch_shared_strings_or_the_run():
+    interpreter = run('tag f {\n return p + "x"\n}')
+    function = interpreter.global_scope.get_var("f")
+    call = Interpreter.compile('{f p="a"}')[0].body[0]
+    literal = call.arguments[-1].value
+    stats = interpreter.stats.as_dict()
+
+    specializer = Specializer(threshold=0)
+    specialized = specializer.specialize(function, call, {"__args": None, "p": literal})
+    assert specialized.returns.value == "ax"
+    # the literal wasn't turned into the start of a rope, and the run's accounting didn't move
+    assert literal._pieces is None
+    assert interpreter.stats.as_dict() == stats
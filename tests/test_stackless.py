@@ -0,0 +1,60 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.exceptions import InterpreterException
+from src.builtin_models import BuiltInFunction, Function, Number
+
+
+def run(source: str, **options) -> list:
+    options.setdefault("memo_size", 0)
+    return list(Interpreter(source, get_default_scope(), stackless=True, **options).evaluate())
+
+
+def test_tail_recursion_runs_past_the_call_depth():
+    source = (
+        "tag done {\n return n\n}\n"
+        "tag count {\n let next = done\n if n > 0 {\n next = count\n }\n return {next n=n-1}\n}\n"
+        "{count n=5000}"
+    )
+    assert run(source, max_call_depth=100)[-1].value == -1
+
+
+def test_recursion_in_a_return_expression_counts_towards_the_call_depth():
+    source = "tag f {\n return {f n=n+1} + 1\n}\n{f n=0}"
+    with pytest.raises(InterpreterException, match="call depth"):
+        run(source, max_call_depth=100)
+
+
+def test_non_tail_recursion_within_the_call_depth():
+    source = (
+        "tag sum_to {\n let rest = 0\n if n > 0 {\n rest = {sum_to n=n-1}\n }\n return n + rest\n}\n"
+        "{sum_to n=500}"
+    )
+    assert run(source, max_call_depth=1000)[-1].value == 125250
+
+
+@pytest.mark.parametrize("stackless", [False, True], ids=["recursive", "stackless"])
+@pytest.mark.parametrize(
+    "source",
+    [
+        # opted out
+        "tag f {\n return n + 1\n}\n{impure f}\n{f n=1}\n{f n=1}",
+        # impure, sends a message
+        'tag f {\n send "hi" to "chan"\n return n + 1\n}\n{f n=1}\n{f n=1}',
+        # a tag's result can't be memoized
+        "tag f {\n tag g {\n return 1\n }\n return g\n}\n{f}\n{f}",
+    ],
+)
+def test_calls_that_cant_be_memoized_leave_the_memo_empty(source, stackless):
+    interpreter = Interpreter(source, get_default_scope(), stackless=stackless)
+    list(interpreter.evaluate())
+    assert interpreter.memo_stats()[0]["size"] == 0
+
+
+@pytest.mark.parametrize("stackless", [False, True], ids=["recursive", "stackless"])
+def test_tags_built_by_builtins_have_no_memo(stackless):
+    scope = get_default_scope()
+    scope.declare_var("make", BuiltInFunction(lambda args: Function(None, [], [], Number(1), None)))
+    interpreter = Interpreter("let made = {make}\n{made}", scope, stackless=stackless)
+    assert list(interpreter.evaluate())[-1] == Number(1)
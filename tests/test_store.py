@@ -0,0 +1,43 @@
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.builtin_models import Number
+from src.exceptions import InterpreterException
+from src.store import GuildStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GuildStore(tmp_path / "store.db", guild=1, flush_interval=None)
+    yield store
+    store.close()
+
+
+def run(source: str, store: GuildStore) -> Interpreter:
+    scope = store.bind(get_default_scope(), {"counter": Number(0), "saved": Number(0)})
+    interpreter = Interpreter(source, scope, store=store)
+    interpreter.results = list(interpreter.evaluate())
+    store.unbind(scope)
+    return interpreter
+
+
+def test_changed_variables_are_stored(store):
+    run("counter = counter + 1", store)
+    run("counter = counter + 1", store)
+    assert store.load(["counter"])["counter"] == Number(2)
+
+
+def test_storing_a_tag_keeps_the_result(store):
+    interpreter = run("saved = 5\ncounter = tag {\n return 1\n}\n7", store)
+    assert interpreter.results[-1] == Number(7)
+    assert "counter" in store.rejected
+    assert any("counter" in str(diagnostic) for diagnostic in interpreter.diagnostics)
+    # everything else is still written, the rejected one keeps its old value
+    assert store.load(["saved"])["saved"] == Number(5)
+    assert "counter" not in store.load(["counter"])
+
+
+def test_storing_a_tag_keeps_the_error(store):
+    with pytest.raises(InterpreterException, match="missing"):
+        run("counter = tag {\n return 1\n}\nmissing", store)
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from src.interpreter import Interpreter
+from src.__main__ import get_default_scope
+from src.builtin_models import Number
+from src.output import MemorySink, OutputChannel
+from src.store import GuildStore
+
+SOURCE = 'let total = 0\nloop 200 times {\n total = total + index\n {print index}\n send "s" to "chan"\n}\ntotal'
+
+
+def interpreter(sink=None, **options) -> Interpreter:
+    return Interpreter(SOURCE, get_default_scope(), OutputChannel(sink, flush_interval=None), **options)
+
+
+def test_everything_comes_out_in_order():
+    events = list(interpreter().stream(maxsize=2))
+    prints = [event.value for event in events if event.kind == "print"]
+    assert prints == [f"Number(value={i})" for i in range(200)]
+    results = [event.value for event in events if event.kind == "result"]
+    assert results[-1] == Number(19900)
+    sends = [event for event in events if event.kind == "send"]
+    assert sends and all(event.destination == "chan" for event in sends)
+
+
+def test_errors_reach_the_consumer():
+    stream = Interpreter("missing", get_default_scope()).stream()
+    try:
+        list(stream)
+    except Exception as e:
+        assert "missing" in str(e)
+    else:
+        raise AssertionError("the error wasn't raised")
+
+
+def test_nothing_is_produced_after_cancel():
+    sink = MemorySink()
+    ip = interpreter(sink)
+    stream = ip.stream(maxsize=1)
+    events = iter(stream)
+    for _ in range(3):
+        next(events)
+    stream.cancel()
+    stream._thread.join(timeout=5)
+
+    assert not stream._thread.is_alive()
+    assert list(stream) == []
+    # the sends still buffered when the script stopped are dropped, not delivered anywhere
+    assert sink.messages == []
+    assert ip.output.sink is sink
+
+
+def test_cancel_still_writes_the_store(tmp_path):
+    store = GuildStore(tmp_path / "store.db", guild=1, flush_interval=None)
+    scope = store.bind(get_default_scope(), {"seen": Number(0)})
+    source = "seen = 1\nloop 200 times {\n {print index}\n}"
+    stream = Interpreter(source, scope, store=store).stream(maxsize=1)
+    next(iter(stream))
+    stream.cancel()
+    stream._thread.join(timeout=5)
+    assert store.load(["seen"])["seen"] == Number(1)
+    store.close()
+
+
+def test_async_iteration():
+    async def collect():
+        return [event async for event in interpreter().stream(maxsize=4)]
+
+    events = asyncio.run(collect())
+    assert [event.value for event in events if event.kind == "result"][-1] == Number(19900)
+
+
+@pytest.mark.parametrize("stackless", [False, True])
+def test_cancelling_an_async_consumer_stops_the_script(stackless):
+    # runs for a long while without printing anything, so only the loop check can stop it
+    source = "let total = 0\nloop 10000000 times {\n total = total + index\n}\ntotal"
+    ip = Interpreter(source, get_default_scope(), stackless=stackless)
+    stream = ip.stream()
+
+    async def consume():
+        return [event async for event in stream]
+
+    async def cancel_midway():
+        try:
+            await asyncio.wait_for(consume(), 0.1)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    start = time.perf_counter()
+    # asyncio.run only returns once the worker thread waiting on the queue has let go
+    assert asyncio.run(cancel_midway())
+    stream._thread.join(timeout=5)
+    assert not stream._thread.is_alive()
+    assert time.perf_counter() - start < 5
+    assert ip.cancelled is None